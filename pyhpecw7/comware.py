@@ -12,13 +12,16 @@ from ncclient.operations.rpc import RPCError
 import ncclient.transport.errors as NcTransErrors
 import ncclient.operations.errors as NcOpErrors
 from pyhpecw7.features.facts import Facts
+from pyhpecw7.features.running_config import RunningConfig
 import time
+import random
 import socket
 from lxml import etree
 from pyhpecw7.utils.xml.namespaces import NETCONFBASE_C
 from pyhpecw7.errors import NCTimeoutError, ConnectionClosedError, NCError,\
     ConnectionAuthenticationError, ConnectionSSHError, ConnectionUknownHostError,\
-    ConnectionError, LockConflictError, UnlockConflictError
+    ConnectionError, LockConflictError, UnlockConflictError,\
+    ConnectionRebootTimeoutError, ConnectionRebootVerifyError
 
 
 class HPCOM7(object):
@@ -48,6 +51,11 @@ class HPCOM7(object):
            to build this attribute.  Keys are user defined to make it
            possible to recall/view the specified object if more than one
            are being prepared to send.
+        config_version: Integer incremented every time configuration
+           is pushed to the device (edit_config, cli_config, rollback
+           and actions that modify the device).  Used to know when
+           cached views of the configuration, such as
+           ``running_config``, are stale.
     """
     def __init__(self, **kvargs):
         self.host = kvargs.get('host')
@@ -56,8 +64,10 @@ class HPCOM7(object):
         self.port = kvargs.get('port') or 830
         self.timeout = kvargs.get('timeout') or 30
         self.staged = []
+        self.config_version = 0
 
         self._locked = False
+        self._running_config = None
 
     def open(self,
              hostkey_verify=False,
@@ -126,6 +136,16 @@ class HPCOM7(object):
                 return dict(facts.facts)
         return None
 
+    @property
+    def running_config(self):
+        """A ``pyhpecw7.features.running_config.RunningConfig``
+        snapshot of the device's current configuration, shared by
+        all features using this device.
+        """
+        if self._running_config is None:
+            self._running_config = RunningConfig(self)
+        return self._running_config
+
     @property
     def connected(self):
         """``True`` if the NETCONF session to the device is open
@@ -189,6 +209,13 @@ class HPCOM7(object):
     def execute(self, run_cmd_func, args=[], kwargs={}):
         """Safely execute the supplied function with args and kwargs.
 
+        Note:
+            If the NETCONF lock is already held by this session, e.g.
+            when ``run_cmd_func`` itself calls ``edit_config`` and
+            ``cli_config``, the lock is reused rather than requested
+            again, so every RPC made by ``run_cmd_func`` runs in
+            one locked transaction.
+
         Args:
             run_cmd_func(executable): Function to be run.
 
@@ -203,8 +230,10 @@ class HPCOM7(object):
         if self.connected is not True:
             raise ConnectionClosedError(self)
 
+        owns_lock = not self._locked
         try:
-            self.lock()
+            if owns_lock:
+                self.lock()
             rsp = run_cmd_func(*args, **kwargs)
         except RPCError as e:
             raise NCError(e)
@@ -213,7 +242,8 @@ class HPCOM7(object):
         except NcTransErrors.TransportError:
             raise ConnectionClosedError(self)
         finally:
-            self.unlock()
+            if owns_lock:
+                self.unlock()
 
         return rsp
 
@@ -228,11 +258,23 @@ class HPCOM7(object):
                 Only used for 'edit_config' API calls.
                 Defaults to 'running'.
 
+        Note:
+            The NETCONF lock is held across the whole staging area,
+            so the staged objects are pushed as one transaction.
+
         Returns:
             A list of responses received from the device.
             Responses with CLI information are extracted from the XML
             response.
         """
+        rsps = self.execute(self._execute_staged, [target])
+
+        del self.staged[:]
+        return rsps
+
+    def _execute_staged(self, target):
+        """Push every object in the staging area, in order.
+        """
         rsps = []
         for command in self.staged:
             cfg_type = command['cfg_type']
@@ -254,7 +296,6 @@ class HPCOM7(object):
 
             rsps.append(run_cmd_func(*args, **kwargs))
 
-        del self.staged[:]
         return rsps
 
     def lock(self, target='running'):
@@ -303,6 +344,7 @@ class HPCOM7(object):
         Returns:
             The etree.Element returned from ncclient.manager.edit_config
         """
+        self.config_version += 1
         rsp = self.execute(self.connection.edit_config, kwargs=dict(target=target, config=config))
         return rsp
 
@@ -320,15 +362,21 @@ class HPCOM7(object):
         rsp = self.execute(self.connection.get, [get_tuple])
         return rsp
 
-    def action(self, element):
+    def action(self, element, modifies_config=True):
         """Wrapper for ncclient.manger.action
 
         Args:
             element: etree.Element sent to ncclient.manager.action
+            modifies_config (bool): OPTIONAL - whether the action can
+                change the device, e.g. its configuration or files.
+                Read-only actions such as ping or md5sum should pass
+                ``False`` so cached views aren't dropped.
 
         Returns:
             The etree.Element returned from ncclient.manager.action
         """
+        if modifies_config:
+            self.config_version += 1
         rsp = self.execute(self.connection.action, [element])
         return rsp
 
@@ -353,6 +401,7 @@ class HPCOM7(object):
         Returns:
             The etree.Element returned from ncclient.manager.rollback
         """
+        self.config_version += 1
         rsp = self.execute(self.connection.rollback, [filename])
         return rsp
 
@@ -382,13 +431,22 @@ class HPCOM7(object):
             raw text CLI output
 
         """
+        self.config_version += 1
         rsp = self.execute(self.connection.cli_config, [command])
         xml_obj = etree.fromstring(rsp.xml)
         return self._extract_config(xml_obj)
 
-    def reboot(self):
+    def reboot(self, wait=False, timeout=900, expected_os=None, **probe):
         """Attempt an immediate reboot of the device.
 
+        Args:
+            wait (bool): OPTIONAL - wait for the device to come back
+                and reopen the NETCONF session. See ``wait_for_reboot``.
+            timeout (int): OPTIONAL - seconds to wait for the device
+                to come back. Only used if ``wait`` is ``True``.
+            expected_os (str): OPTIONAL - OS version the device must
+                report in ``facts['os']`` once it is back.
+            probe: OPTIONAL - passed to ``wait_for_reboot``
         """
         try:
             self.connection.async_mode = True
@@ -398,6 +456,113 @@ class HPCOM7(object):
         finally:
             self.connection.async_mode = False
 
+        if wait:
+            self.wait_for_reboot(timeout=timeout, expected_os=expected_os,
+                                 **probe)
+
+    def _port_open(self, probe_timeout):
+        """Return ``True`` if the NETCONF port accepts TCP connections.
+        """
+        try:
+            sock = socket.create_connection(
+                (self.host, self.port), probe_timeout)
+        except (socket.error, socket.timeout):
+            return False
+
+        sock.close()
+        return True
+
+    def _backoff(self, attempt, initial, maximum, deadline):
+        """Sleep for an exponentially growing, jittered interval
+        that never passes ``deadline``.
+        """
+        interval = min(maximum, initial * 2 ** attempt)
+        interval *= random.uniform(0.5, 1.0)
+        time.sleep(max(0, min(interval, deadline - time.time())))
+
+    def wait_for_reboot(self, timeout=900, expected_os=None, initial=1,
+                        maximum=30, probe_timeout=2, down_timeout=120):
+        """Wait for a rebooting device to come back, then reopen the
+        NETCONF session.
+
+        The NETCONF port is probed with plain TCP connections, which
+        are much cheaper than NETCONF sessions, with exponential backoff
+        and jitter so many devices rebooting at once don't probe in
+        lockstep. The port is first polled until it stops accepting
+        connections, so a device that hasn't gone down yet isn't
+        mistaken for one that is back.
+
+        Args:
+            timeout (int): OPTIONAL - seconds to wait for the device
+                to come back. Defaults to 900.
+            expected_os (str): OPTIONAL - OS version the device must
+                report in ``facts['os']`` once it is back.
+            initial (float): OPTIONAL - first probe interval in seconds.
+            maximum (float): OPTIONAL - longest probe interval in seconds.
+            probe_timeout (float): OPTIONAL - seconds each TCP probe
+                waits for a connection.
+            down_timeout (int): OPTIONAL - seconds to wait for the port
+                to close before assuming the device went down unnoticed.
+
+        Returns:
+            The new NETCONF connection.
+
+        Raises:
+            ConnectionAuthenticationError: if the device is back but
+                rejects the credentials.
+            ConnectionRebootTimeoutError: if the device isn't back
+                within ``timeout`` seconds.
+            ConnectionRebootVerifyError: if the device reports an OS
+                other than ``expected_os``.
+        """
+        start = time.time()
+        deadline = start + timeout
+
+        try:
+            self.connection.close_session()
+        except Exception:
+            pass
+
+        down_deadline = min(deadline, start + down_timeout)
+        attempt = 0
+        while time.time() < down_deadline\
+                and self._port_open(probe_timeout):
+            self._backoff(attempt, initial, maximum, down_deadline)
+            attempt += 1
+
+        attempt = 0
+        while True:
+            if self._port_open(probe_timeout):
+                try:
+                    self.open()
+                    break
+                except ConnectionAuthenticationError:
+                    raise
+                except ConnectionError:
+                    # the port accepts connections before NETCONF is up
+                    pass
+
+            if time.time() >= deadline:
+                raise ConnectionRebootTimeoutError(
+                    self, msg='The device did not come back within '
+                    '{0} seconds.'.format(timeout))
+
+            self._backoff(attempt, initial, maximum, deadline)
+            attempt += 1
+
+        # anything cached before the reboot describes the old image
+        self._running_config = None
+        self.config_version += 1
+
+        if expected_os is not None:
+            os_version = (self.facts or {}).get('os')
+            if os_version != expected_os:
+                raise ConnectionRebootVerifyError(
+                    self, msg='Expected OS {0}, found {1}.'.format(
+                        expected_os, os_version))
+
+        return self.connection
+
     def _strip_return(self, text):
         """Strip excess return characters from text.
         """
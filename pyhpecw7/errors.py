@@ -143,3 +143,15 @@ class ConnectionClosedError(ConnectionError):
     """When there's a connection closed error.
     """
     pass
+
+
+class ConnectionRebootTimeoutError(ConnectionError):
+    """When the device doesn't come back after a reboot in time.
+    """
+    pass
+
+
+class ConnectionRebootVerifyError(ConnectionError):
+    """When the device comes back after a reboot with an unexpected OS.
+    """
+    pass
@@ -2,7 +2,8 @@
 """
 import os
 import time
-from pyhpecw7.features.errors import InvalidConfigFile
+from pyhpecw7.features.errors import InvalidConfigFile, FileNotReadableError
+from pyhpecw7.utils.config_tree import parse_config, diff_config
 from ncclient.operations.rpc import RPCError
 
 
@@ -79,6 +80,30 @@ class Config(object):
 
         return self._diffs, self._original__diffs
 
+    def compare_config_local(self):
+        """Compare the local copy of the new config file to the
+        existing current running config.
+
+        The file does not need to be on the switch. It is read from
+        ``filename`` on the local machine and compared, section by
+        section, with the device's running config snapshot.
+
+        Returns:
+            A list of dictionaries, one per changed section, each with
+            ``section``, ``add`` and ``remove`` keys.  See
+            ``pyhpecw7.utils.config_tree.diff_config``.
+
+        Raises:
+            FileNotReadableError: if the local file can't be read.
+        """
+        try:
+            with open(self.filename) as config_file:
+                candidate = parse_config(config_file.read())
+        except IOError:
+            raise FileNotReadableError(self.filename)
+
+        return diff_config(self.device.running_config.tree, candidate)
+
 #    def activate_replacement_config(self):
 #        """Activate replacement config on host device
 #
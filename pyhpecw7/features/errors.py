@@ -249,8 +249,16 @@ class FileNotEnoughSpaceError(FileError):
 
 
 class FileTransferError(FileError):
+    def __init__(self, src=None, dst=None, error=None):
+        super(FileTransferError, self).__init__(src, dst)
+        self.error = error
+
     def __repr__(self):
-        return 'There was an error while the file was in transit.'
+        if self.error is None:
+            return 'There was an error while the file was in transit.'
+
+        return 'There was an error while the file was in transit: '\
+            '{0!r}'.format(self.error)
 
     __str__ = __repr__
 
@@ -317,3 +325,24 @@ class IRFMemberDoesntExistError(IRFError):
             ' does not exist.'
 
     __str__ = __repr__
+
+##################################
+#       UPGRADE ERRORS           #
+##################################
+
+
+class UpgradeError(FeatureError):
+    pass
+
+
+class UpgradeHealthError(UpgradeError):
+
+    def __init__(self, baseline, health):
+        self.baseline = baseline
+        self.health = health
+
+    def __repr__(self):
+        return 'The device is not healthy after its reboot.\n' +\
+            'Before: {0}\nAfter: {1}'.format(self.baseline, self.health)
+
+    __str__ = __repr__
@@ -5,14 +5,50 @@ from lxml import etree
 from pyhpecw7.utils.xml.lib import *
 from pyhpecw7.features.errors import FileNotEnoughSpaceError,\
     FileNotReadableError, FileRemoteDirDoesNotExist, FileTransferError, FileHashMismatchError
+from pyhpecw7.features.filesystem import FileSystem, FileSystemInventory
 from pyhpecw7.errors import NCError
+from pyhpecw7.utils.md5cache import file_md5, remember
 
 import paramiko
 import hashlib
+import json
+import socket
+import time
 import re
 import os
 
 
+class _HashingReader(object):
+    """Wraps a local file so every block read for the transfer
+    is also added to an md5 digest and reported to ``progress``.
+    """
+    def __init__(self, fileobj, size, progress=None):
+        self._fileobj = fileobj
+        self.size = size
+        self.sent = 0
+        self.md5 = hashlib.md5()
+        self._progress = progress
+        self._start = time.time()
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        self.md5.update(data)
+        self.sent += len(data)
+
+        if self._progress:
+            elapsed = time.time() - self._start
+            rate = self.sent / elapsed if elapsed > 0 else 0.0
+            self._progress(self.sent, self.size, rate)
+
+        return data
+
+    def tell(self):
+        return self._fileobj.tell()
+
+    def hexdigest(self):
+        return self.md5.hexdigest()
+
+
 class FileCopy(object):
     """This class is used to copy local files to a ``HPCOM7`` device.
 
@@ -40,6 +76,14 @@ class FileCopy(object):
             and 'flash:/' will be prepended.
         port (int): OPTIONAL - The SSH port over which
             the SCP connection is made. Defaults to 22.
+        filesystem (FileSystem): OPTIONAL - a shared
+            ``pyhpecw7.features.filesystem.FileSystem`` used for remote
+            md5 sums and directory checks, so results are batched and
+            cached across ``FileCopy`` objects.
+        state_dir (str): OPTIONAL - directory for the local md5
+            sidecar and SFTP progress files, e.g. when the source
+            file is on a read-only or shared image store. Defaults
+            to the directory of the source file.
 
     Attributes:
         device (HPCOM7): connected instance of
@@ -51,17 +95,14 @@ class FileCopy(object):
         remote_dir_exists (bool): Whether there remote
             directory exists.
     """
-    def __init__(self, device, src, dst=None, port=22):
+    def __init__(self, device, src, dst=None, port=22, filesystem=None,
+                 state_dir=None):
         self.device = device
         self.src = src
-        self.dst = dst or os.path.basename(src)
-
-        if self.dst.find(':/') < 0:
-            self._remote_dir = 'flash:/'
-            self.dst = self._remote_dir + self.dst
-        else:
-            self._remote_dir = '/'.join(
-                self.dst.split('/')[:-1]) + '/'
+        self.filesystem = filesystem
+        self.state_dir = state_dir
+        self.dst = self.remote_path(src, dst)
+        self._remote_dir = '/'.join(self.dst.split('/')[:-1]) + '/'
 
         if self._remote_dir[-2:] == ':/':
             self.remote_dir_exists = True
@@ -70,6 +111,16 @@ class FileCopy(object):
 
         self.port = port
 
+    @staticmethod
+    def remote_path(src, dst=None):
+        """Return the full path of the remote file for ``src``
+        and ``dst``, as described in the class Args.
+        """
+        dst = dst or os.path.basename(src)
+        if dst.find(':/') < 0:
+            dst = 'flash:/' + dst
+        return dst
+
     def _get_flash_size(self):
         """Return the available space in the remote directory.
         """
@@ -143,6 +194,9 @@ class FileCopy(object):
         """Return the md5 sum of the remote file,
         if it exists.
         """
+        if self.filesystem is not None:
+            return self.filesystem.get_md5(self.dst)
+
         E = action_element_maker()
         top = E.top(
             E.FileSystem(
@@ -157,8 +211,7 @@ class FileCopy(object):
             )
         )
 
-
-        nc_get_reply = self.device.action(top)
+        nc_get_reply = self.device.action(top, modifies_config=False)
         reply_ele = etree.fromstring(nc_get_reply.xml)
         md5sum = find_in_action('md5sum', reply_ele)
 
@@ -168,18 +221,18 @@ class FileCopy(object):
     def _get_local_md5(self, blocksize=2**20):
         """Get the md5 sum of the local file,
         if it exists.
+
+        The digest is cached by ``pyhpecw7.utils.md5cache``, so the
+        file is only read again if it changed.
         """
-        m = hashlib.md5()
-        with open(self.src, "rb") as f:
-            buf = f.read(blocksize)
-            while buf:
-                m.update(buf)
-                buf = f.read(blocksize)
-        return m.hexdigest()
+        return file_md5(self.src, blocksize, cache_dir=self.state_dir)
 
     def _remote_dir_exists(self):
         """Check to see if the remote directory exists.
         """
+        if self.filesystem is not None:
+            return self.filesystem.is_dir(self._remote_dir)
+
         E = data_element_maker()
         top = E.top(
             E.FileSystem(
@@ -228,14 +281,64 @@ class FileCopy(object):
         reply_ele = etree.fromstring(nc_get_reply.xml)
 
         self.remote_dir_exists = True
+        self._invalidate(self._remote_dir)
+
+    def _invalidate(self, path):
+        """Drop cached ``filesystem`` results for a path that changed.
+        """
+        if self.filesystem is not None:
+            self.filesystem.invalidate(path)
+
+    def _netconf_transport(self):
+        """Return the SSH transport of the device's NETCONF session,
+        else ``None``.
+        """
+        try:
+            return self.device.connection._session._transport
+        except AttributeError:
+            return None
+
+    def _get_transport(self, hostname, username, password, reuse_transport):
+        """Return the SSH transport for the SCP channel.
+
+        The NETCONF session's transport is used if ``reuse_transport``
+        is set and it connects to the same host, port and user,
+        otherwise a new SSH connection is made.
+        """
+        if reuse_transport and self.port == self.device.port\
+                and hostname == self.device.host\
+                and username == self.device.username:
+            transport = self._netconf_transport()
+            if transport is not None and transport.is_active():
+                return transport
+
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        ssh.connect(
+            hostname=hostname,
+            username=username,
+            password=password,
+            port=self.port,
+            allow_agent=False,
+            look_for_keys=False)
 
-    def transfer_file(self, hostname=None, username=None, password=None):
+        return ssh.get_transport()
+
+    def transfer_file(self, hostname=None, username=None, password=None,
+                      progress=None, reuse_transport=False,
+                      window_size=None, max_packet_size=None,
+                      safety_checks=True):
         """Transfer the file to the remote device over SCP.
 
         Note:
             If any arguments are omitted, the corresponding attributes
             of the ``self.device`` will be used.
 
+        Note:
+            The local md5 sum used to verify the transfer is computed
+            from the same blocks that are sent, so the local file is
+            only read once.
+
         Args:
             hostname (str): OPTIONAL - The name or
                 IP address of the remote device.
@@ -243,6 +346,22 @@ class FileCopy(object):
                 for the remote device.
             password (str): OPTIONAL - The SSH password
                 for the remote device.
+            progress (callable): OPTIONAL - called after every block
+                is sent with the bytes sent so far, the file size
+                in bytes, and the average rate in bytes/sec.
+            reuse_transport (bool): OPTIONAL - open the SCP channel on
+                the SSH transport of the device's NETCONF session,
+                saving a second SSH handshake.  Only used if ``port``,
+                the host and the username match the NETCONF session,
+                otherwise a new SSH connection is made.
+            window_size (int): OPTIONAL - SSH window size in bytes
+                for the SCP channel.
+            max_packet_size (int): OPTIONAL - maximum SSH packet size
+                in bytes for the SCP channel.
+            safety_checks (bool): OPTIONAL - whether to check the
+                local file, remote directory and free space before
+                transferring.  Only skip them if the caller already
+                did, e.g. ``FleetCopy``.
 
         Raises:
             FileTransferError: if an error occurs during the file transfer.
@@ -252,32 +371,340 @@ class FileCopy(object):
             FileNotEnoughSpaceError: if there isn't enough space on the device.
             FileRemoteDirDoesNotExist: if the remote directory doesn't exist.
         """
-        self._safety_checks()
+        if safety_checks:
+            self._safety_checks()
 
         hostname = hostname or self.device.host
         username = username or self.device.username
         password = password or self.device.password
 
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(
-            hostname=hostname,
-            username=username,
-            password=password,
-            port=self.port,
-            allow_agent=False,
-            look_for_keys=False)
+        transport = self._get_transport(
+            hostname, username, password, reuse_transport)
 
-        scp = SCPClient(ssh.get_transport())
+        scp = None
         try:
-            scp.put(self.src, self.dst)
-        except:
-            raise FileTransferError
+            scp = SCPClient(transport)
+            if window_size or max_packet_size:
+                # SCPClient only opens its own channel if it doesn't have one
+                scp.channel = transport.open_session(
+                    window_size=window_size, max_packet_size=max_packet_size)
+
+            with open(self.src, 'rb') as src_file:
+                reader = _HashingReader(
+                    src_file, os.path.getsize(self.src), progress)
+                try:
+                    scp.putfo(reader, self.dst, size=reader.size)
+                except Exception as e:
+                    raise FileTransferError(self.src, self.dst, e)
+        finally:
+            if scp is not None:
+                scp.close()
+            if transport is not self._netconf_transport():
+                transport.close()
 
-        scp.close()
+        self._invalidate(self.dst)
 
-        src_hash = self._get_local_md5()
+        src_hash = reader.hexdigest()
+        remember(self.src, src_hash, cache_dir=self.state_dir)
         dst_hash = self._get_remote_md5()
 
         if src_hash != dst_hash:
             raise FileHashMismatchError(self.src, self.dst, src_hash, dst_hash)
+
+    def _sftp_path(self):
+        """Return ``dst`` as an SFTP path, i.e. relative to the root
+        of the file system without the 'flash:' style prefix.
+        """
+        return '/' + self.dst.split(':/', 1)[-1].lstrip('/')
+
+    def _progress_path(self):
+        path = '{0}.{1}.progress'.format(self.src, self.device.host)
+        if self.state_dir is None:
+            return path
+        return os.path.join(self.state_dir, os.path.basename(path))
+
+    def _read_progress(self, src_hash):
+        """Return the last confirmed offset of an earlier SFTP transfer
+        of the same local file to the same destination, else 0.
+        """
+        record = getattr(self, '_progress_record', None)
+        if record is None:
+            try:
+                with open(self._progress_path()) as progress_file:
+                    record = json.load(progress_file)
+            except (IOError, OSError, ValueError):
+                return 0
+
+        if record.get('dst') == self.dst and record.get('md5') == src_hash:
+            return record.get('offset', 0)
+        return 0
+
+    def _write_progress(self, src_hash, offset):
+        self._progress_record = dict(dst=self.dst, md5=src_hash, offset=offset)
+        try:
+            if self.state_dir is not None and not os.path.isdir(self.state_dir):
+                os.makedirs(self.state_dir)
+            with open(self._progress_path(), 'w') as progress_file:
+                json.dump(self._progress_record, progress_file)
+        except (IOError, OSError):
+            pass
+
+    def _clear_progress(self):
+        self._progress_record = None
+        try:
+            os.remove(self._progress_path())
+        except OSError:
+            pass
+
+    def _resume_offset(self, sftp, src_hash, size, verify_size):
+        """Return the offset to resume an SFTP transfer from.
+
+        The recorded offset is only trusted if the remote file is at
+        least that long and its last ``verify_size`` bytes before the
+        offset match the local file, otherwise the transfer restarts.
+        """
+        offset = self._read_progress(src_hash)
+        if not offset:
+            return 0
+
+        try:
+            remote_size = sftp.stat(self._sftp_path()).st_size
+        except IOError:
+            return 0
+
+        if remote_size > size:
+            return 0
+
+        offset = min(offset, remote_size)
+        start = max(0, offset - verify_size)
+
+        remote_file = sftp.open(self._sftp_path(), 'rb')
+        try:
+            remote_file.seek(start)
+            remote_tail = remote_file.read(offset - start)
+        finally:
+            remote_file.close()
+
+        with open(self.src, 'rb') as src_file:
+            src_file.seek(start)
+            local_tail = src_file.read(offset - start)
+
+        if remote_tail != local_tail:
+            return 0
+        return offset
+
+    def _sftp_send(self, transport, src_hash, size, chunk_size,
+                   checkpoint_size, progress):
+        """Send the file over one SFTP session, resuming if possible.
+        """
+        sftp = paramiko.SFTPClient.from_transport(transport)
+        try:
+            offset = self._resume_offset(sftp, src_hash, size, chunk_size)
+            start_offset = offset
+            start = time.time()
+
+            remote_file = sftp.open(
+                self._sftp_path(), 'r+b' if offset else 'wb')
+            try:
+                remote_file.set_pipelined(True)
+                remote_file.seek(offset)
+                unconfirmed = 0
+
+                with open(self.src, 'rb') as src_file:
+                    src_file.seek(offset)
+                    data = src_file.read(chunk_size)
+                    while data:
+                        remote_file.write(data)
+                        offset += len(data)
+                        unconfirmed += len(data)
+
+                        if unconfirmed >= checkpoint_size:
+                            # stat is answered after the pipelined writes
+                            self._write_progress(
+                                src_hash, remote_file.stat().st_size)
+                            unconfirmed = 0
+
+                        if progress:
+                            elapsed = time.time() - start
+                            rate = (offset - start_offset) / elapsed\
+                                if elapsed > 0 else 0.0
+                            progress(offset, size, rate)
+
+                        data = src_file.read(chunk_size)
+            finally:
+                remote_file.close()
+        finally:
+            sftp.close()
+
+    def transfer_file_sftp(self, hostname=None, username=None, password=None,
+                           progress=None, reuse_transport=False,
+                           chunk_size=2**18, checkpoint_size=2**23,
+                           retries=3, safety_checks=True):
+        """Transfer the file to the remote device over SFTP,
+        resuming after failures.
+
+        The file is written in pipelined chunks. Every
+        ``checkpoint_size`` bytes the size confirmed by the device is
+        recorded in memory and in a ``<src>.<host>.progress`` file
+        (in ``state_dir`` if set), so
+        a failed transfer, or a later call after the process was
+        restarted, continues from the last confirmed offset instead of
+        starting over. Before resuming, the last ``chunk_size`` bytes
+        already on the device are compared with the local file.
+
+        Note:
+            SFTP must be enabled on the device.
+
+        Args:
+            hostname (str): OPTIONAL - The name or
+                IP address of the remote device.
+            username (str): OPTIONAL - The SSH username
+                for the remote device.
+            password (str): OPTIONAL - The SSH password
+                for the remote device.
+            progress (callable): OPTIONAL - called after every chunk
+                with the bytes sent so far, the file size in bytes,
+                and the average rate in bytes/sec.
+            reuse_transport (bool): OPTIONAL - see ``transfer_file``.
+            chunk_size (int): OPTIONAL - bytes per SFTP write.
+            checkpoint_size (int): OPTIONAL - bytes between
+                recorded offsets.
+            retries (int): OPTIONAL - how many times a failed
+                transfer is resumed before giving up.
+            safety_checks (bool): OPTIONAL - see ``transfer_file``.
+
+        Raises:
+            FileTransferError: if the transfer still fails after
+                ``retries`` resumes.
+            FileHashMismatchError: if the source and
+                destination hashes don't match.
+            FileNotReadableError: if the local file doesn't exist or isn't readable.
+            FileNotEnoughSpaceError: if there isn't enough space on the device.
+            FileRemoteDirDoesNotExist: if the remote directory doesn't exist.
+        """
+        if safety_checks:
+            self._safety_checks()
+
+        hostname = hostname or self.device.host
+        username = username or self.device.username
+        password = password or self.device.password
+
+        size = os.path.getsize(self.src)
+        src_hash = self._get_local_md5()
+
+        for attempt in range(retries + 1):
+            transport = None
+            try:
+                transport = self._get_transport(
+                    hostname, username, password, reuse_transport)
+                self._sftp_send(transport, src_hash, size, chunk_size,
+                                checkpoint_size, progress)
+                break
+            except (EnvironmentError, EOFError, socket.error,
+                    paramiko.SSHException) as e:
+                if attempt == retries:
+                    raise FileTransferError(self.src, self.dst, e)
+            finally:
+                if transport is not None\
+                        and transport is not self._netconf_transport():
+                    transport.close()
+
+        self._clear_progress()
+        self._invalidate(self.dst)
+
+        dst_hash = self._get_remote_md5()
+        if src_hash != dst_hash:
+            raise FileHashMismatchError(self.src, self.dst, src_hash, dst_hash)
+
+    def _replica_path(self, filesystem):
+        """Return ``dst`` on another file system,
+        e.g. 'slot2#flash:/images/a.bin' for 'flash:/images/a.bin'.
+        """
+        return '{0}/{1}'.format(
+            filesystem, self.dst.split(':/', 1)[-1].lstrip('/'))
+
+    def replicate(self, filesystems=None):
+        """Copy the transferred file from ``dst`` to the flash of the
+        other IRF members on the device itself, so the file only
+        crosses the management network once.
+
+        Members that already have a file with the same md5 sum are
+        skipped, missing directories are created, and all copies are
+        issued in one action request. Every copy is then verified with
+        one batched md5 request.
+
+        Note:
+            Call ``transfer_file`` or ``transfer_file_sftp`` first.
+
+        Args:
+            filesystems (list): OPTIONAL - file systems to copy to,
+                e.g. ['slot2#flash:', 'slot3#flash:']. Defaults to the
+                flash of every other IRF member, as reported by
+                ``filesystem.FileSystemInventory``.
+
+        Returns:
+            A dictionary of replica path to ``True`` if it was copied,
+            or ``False`` if it was already there.
+
+        Raises:
+            FileHashMismatchError: if a copy's hash doesn't match
+                the source file.
+        """
+        if filesystems is None:
+            filesystems = sorted(
+                name for name in FileSystemInventory(self.device).get_config()
+                if '#' in name and name.endswith('flash:'))
+
+        paths = [self._replica_path(name) for name in filesystems]
+        if not paths:
+            return {}
+
+        filesystem = self.filesystem or FileSystem(self.device)
+        src_hash = self._get_local_md5()
+
+        existing = filesystem.get_md5s(paths)
+        copies = [path for path in paths if existing[path] != src_hash]
+
+        E = action_element_maker()
+        if copies:
+            if self._remote_dir[-2:] != ':/':
+                dirs = filesystem.is_dirs(
+                    [path.rsplit('/', 1)[0] for path in copies])
+                missing = sorted(d for d, is_dir in dirs.items() if not is_dir)
+                if missing:
+                    self.device.action(E.top(
+                        E.FileSystem(
+                            E.Files(*[
+                                E.File(
+                                    E.SrcName(path),
+                                    E.Operations(
+                                        E.MkDir()
+                                    )
+                                ) for path in missing]
+                            )
+                        )
+                    ))
+
+            self.device.action(E.top(
+                E.FileSystem(
+                    E.Files(*[
+                        E.File(
+                            E.SrcName(self.dst),
+                            E.Operations(
+                                E.Copy(
+                                    E.DstName(path)
+                                )
+                            )
+                        ) for path in copies]
+                    )
+                )
+            ))
+
+            filesystem.invalidate()
+            copied = filesystem.get_md5s(copies)
+            for path in copies:
+                if copied[path] != src_hash:
+                    raise FileHashMismatchError(
+                        self.src, path, src_hash, copied[path])
+
+        return dict((path, path in copies) for path in paths)
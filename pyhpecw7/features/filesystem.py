@@ -0,0 +1,383 @@
+"""Query files and directories on HPCOM7 devices in bulk.
+"""
+import re
+from datetime import datetime
+from multiprocessing.pool import ThreadPool
+from lxml import etree
+from pyhpecw7.utils.xml.lib import *
+from pyhpecw7.features.install_os import InstallOs
+from pyhpecw7.errors import NCError
+
+_REQUEST_INDEX = re.compile(r'/File\[(\d+)\]')
+_DIR_HEADER = re.compile(r'^Directory of (\S+)')
+_DIR_ENTRY = re.compile(
+    r'^\s*\d+\s+([d-])\S*\s+(\d+|-)\s+'
+    r'(\w{3}\s+\d{1,2}\s+\d{4}\s+\d{2}:\d{2}:\d{2})\s+(\S+)\s*$')
+_DIR_TOTAL = re.compile(r'([\d,]+)\s+KB total\s+\(([\d,]+)\s+KB free\)')
+
+
+class FileSystem(object):
+    """This class is used to get md5 sums and directory information
+    for many files with one NETCONF request, and cache the results.
+
+    Cached results are dropped when the device's ``config_version``
+    changes (i.e. after any action or configuration that could have
+    changed the file system), or when ``invalidate`` is called,
+    e.g. by ``file_copy.FileCopy`` after a transfer.
+
+    Args:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+
+    Attributes:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+    """
+    def __init__(self, device):
+        self.device = device
+        self._md5s = {}
+        self._dirs = {}
+        self._version = None
+
+    def _check_version(self):
+        version = getattr(self.device, 'config_version', None)
+        if version != self._version:
+            self._md5s.clear()
+            self._dirs.clear()
+            self._version = version
+
+    def invalidate(self, path=None):
+        """Drop cached results for ``path``, or for every path.
+
+        Args:
+            path (str): OPTIONAL - full path of a file or directory
+        """
+        if path is None:
+            self._md5s.clear()
+            self._dirs.clear()
+        else:
+            self._md5s.pop(path, None)
+            self._dirs.pop(path.rstrip('/'), None)
+
+    def _request_md5s(self, paths):
+        E = action_element_maker()
+        top = E.top(
+            E.FileSystem(
+                E.Files(*[
+                    E.File(
+                        E.SrcName(path),
+                        E.Operations(
+                            E.md5sum()
+                        )
+                    ) for path in paths]
+                )
+            )
+        )
+
+        nc_get_reply = self.device.action(top, modifies_config=False)
+        reply_ele = etree.fromstring(nc_get_reply.xml)
+
+        md5s = dict((path, None) for path in paths)
+        for result in findall_in_action('action-result', reply_ele):
+            request_path = find_in_action('request-path', result)
+            md5sum = find_in_action('md5sum', result)
+            if request_path is None or md5sum is None:
+                continue
+
+            match = _REQUEST_INDEX.search(request_path.text)
+            index = int(match.group(1)) - 1 if match else -1
+            if 0 <= index < len(paths):
+                md5s[paths[index]] = md5sum.text.strip()
+
+        return md5s
+
+    def get_md5s(self, paths):
+        """Get the md5 sums of remote files with one action request.
+
+        If the request fails, e.g. because one of the files doesn't
+        exist, each file is requested on its own so only the failing
+        files are missing from the result.
+
+        Args:
+            paths (list): full paths of remote files,
+                e.g. ['flash:/boot.bin', 'slot2#flash:/boot.bin']
+
+        Returns:
+            A dictionary of path to md5 sum (str), or ``None`` if the
+            md5 sum couldn't be retrieved.
+        """
+        self._check_version()
+        missing = [path for path in paths if path not in self._md5s]
+
+        if missing:
+            try:
+                md5s = self._request_md5s(missing)
+            except NCError:
+                md5s = {}
+                for path in missing:
+                    try:
+                        md5s.update(self._request_md5s([path]))
+                    except NCError:
+                        md5s[path] = None
+
+            self._md5s.update(md5s)
+
+        return dict((path, self._md5s.get(path)) for path in paths)
+
+    def get_md5(self, path):
+        """Get the md5 sum of one remote file.
+
+        Returns:
+            The md5 sum as a string, else ``None``.
+        """
+        return self.get_md5s([path])[path]
+
+    def _request_dirs(self, paths):
+        E = data_element_maker()
+        top = E.top(
+            E.FileSystem(
+                E.Files(*[
+                    E.File(
+                        E.Name(path),
+                        E.IsDirectory()
+                    ) for path in paths]
+                )
+            )
+        )
+
+        nc_get_reply = self.device.get(('subtree', top))
+        reply_ele = etree.fromstring(nc_get_reply.xml)
+
+        # the device reports 'flash:' as e.g. 'slot1#flash:'
+        exact = {}
+        unprefixed = {}
+        for file_ele in findall_in_data('File', reply_ele):
+            name = find_in_data('Name', file_ele)
+            is_dir = find_in_data('IsDirectory', file_ele)
+            if name is None:
+                continue
+
+            value = is_dir is not None and is_dir.text == 'true'
+            exact[name.text] = value
+            unprefixed.setdefault(name.text.split('#', 1)[-1], value)
+
+        dirs = {}
+        for path in paths:
+            if path in exact:
+                dirs[path] = exact[path]
+            else:
+                dirs[path] = unprefixed.get(path, False)
+
+        return dirs
+
+    def is_dirs(self, paths):
+        """Check whether remote directories exist with one get request.
+
+        Args:
+            paths (list): full paths of remote directories,
+                e.g. ['flash:/images', 'slot2#flash:/images']
+
+        Returns:
+            A dictionary of path to ``True`` if the path exists and is a
+            directory, else ``False``.
+        """
+        self._check_version()
+        paths = [path.rstrip('/') for path in paths]
+        missing = [path for path in paths if path not in self._dirs]
+
+        if missing:
+            self._dirs.update(self._request_dirs(missing))
+
+        return dict((path, self._dirs[path]) for path in paths)
+
+    def is_dir(self, path):
+        """Check whether one remote directory exists.
+        """
+        return self.is_dirs([path])[path.rstrip('/')]
+
+
+class FileSystemInventory(object):
+    """This class is used to get the files and free space of every
+    storage medium on every IRF member with one CLI request, and to
+    plan which images to delete to make room for a new one.
+
+    The inventory is cached until the device's ``config_version``
+    changes or ``invalidate`` is called.
+
+    Args:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+
+    Attributes:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+    """
+    def __init__(self, device):
+        self.device = device
+        self._inventory = None
+        self._version = None
+
+    def invalidate(self):
+        """Drop the cached inventory.
+        """
+        self._inventory = None
+
+    def _parse(self, text):
+        inventory = {}
+        current = None
+        for line in text.splitlines():
+            header = _DIR_HEADER.match(line)
+            if header:
+                current = dict(files=[], total=0, free=0)
+                inventory[header.group(1)] = current
+                continue
+
+            if current is None:
+                continue
+
+            entry = _DIR_ENTRY.match(line)
+            if entry:
+                is_dir = entry.group(1) == 'd'
+                current['files'].append(dict(
+                    name=entry.group(4),
+                    is_dir=is_dir,
+                    size=0 if is_dir else int(entry.group(2)),
+                    modified=datetime.strptime(
+                        ' '.join(entry.group(3).split()),
+                        '%b %d %Y %H:%M:%S')))
+                continue
+
+            total = _DIR_TOTAL.search(line)
+            if total:
+                # KB as reported by 'dir', same as FileCopy._get_flash_size
+                current['total'] = int(total.group(1).replace(',', '')) * 1000
+                current['free'] = int(total.group(2).replace(',', '')) * 1000
+
+        return inventory
+
+    def get_config(self):
+        """Get the files and free space of every file system.
+
+        Returns:
+            A dictionary keyed by file system name, e.g. 'flash:' or
+            'slot2#flash:'. Values are dictionaries with the following
+            k/v pairs:
+                :total (int): size of the file system in bytes
+                :free (int): free space in bytes
+                :files (list): dictionaries with ``name`` (str),
+                    ``size`` (int, bytes), ``is_dir`` (bool) and
+                    ``modified`` (datetime) keys for each file in
+                    the root directory
+        """
+        version = getattr(self.device, 'config_version', None)
+        if self._inventory is None or version != self._version:
+            text = self.device.cli_display('dir /all-filesystems')
+            self._inventory = self._parse(text or '')
+            self._version = version
+
+        return self._inventory
+
+    def _protected_images(self):
+        """Names of the current and startup boot/system images.
+        """
+        protected = set()
+        for images in InstallOs(self.device).get_config().values():
+            protected.update(images.values())
+        return protected
+
+    def plan(self, size, filesystems=None, keep=()):
+        """Plan which images to delete to make room for a new image.
+
+        Only '.bin' and '.ipe' files are candidates for deletion,
+        oldest first. Images that are running or set as startup
+        images (see ``InstallOs.get_config``), and files in ``keep``,
+        are never deleted.
+
+        Args:
+            size (int): size of the new image in bytes
+            filesystems (list): OPTIONAL - names of the file systems
+                that need room, e.g. ['flash:', 'slot2#flash:'].
+                Defaults to every file system whose name ends in 'flash:',
+                i.e. the flash of every IRF member.
+            keep (list): OPTIONAL - file names that must not be deleted
+
+        Returns:
+            A dictionary keyed by file system name. Values are
+            dictionaries with the following k/v pairs:
+                :free (int): free space in bytes
+                :needed (int): bytes that must be freed, 0 if none
+                :delete (list): full paths of the files to delete
+                :enough (bool): whether deleting ``delete`` makes
+                    enough room
+        """
+        inventory = self.get_config()
+        if filesystems is None:
+            filesystems = sorted(name for name in inventory
+                                 if name.endswith('flash:'))
+
+        protected = None
+        plans = {}
+        for name in filesystems:
+            fs = inventory.get(name, dict(files=[], total=0, free=0))
+            needed = max(0, size - fs['free'])
+            plan = dict(free=fs['free'], needed=needed, delete=[],
+                        enough=needed == 0)
+            plans[name] = plan
+            if plan['enough']:
+                continue
+
+            if protected is None:
+                protected = self._protected_images()
+
+            candidates = sorted(
+                (f for f in fs['files']
+                 if not f['is_dir']
+                 and f['name'].lower().endswith(('.bin', '.ipe'))
+                 and f['name'] not in protected
+                 and f['name'] not in keep),
+                key=lambda f: f['modified'])
+
+            freed = 0
+            for candidate in candidates:
+                plan['delete'].append(
+                    '{0}/{1}'.format(name, candidate['name']))
+                freed += candidate['size']
+                if freed >= needed:
+                    plan['enough'] = True
+                    break
+
+        return plans
+
+    @staticmethod
+    def plan_many(devices, size, workers=8, **kwargs):
+        """Plan space for a new image on many devices in parallel.
+
+        Args:
+            devices (list): connected ``pyhpecw7.comware.HPCOM7`` objects
+            size (int): size of the new image in bytes
+            workers (int): OPTIONAL - maximum number of devices
+                queried at once. Defaults to 8.
+            kwargs: OPTIONAL - passed to ``plan``
+
+        Returns:
+            A dictionary keyed by device host. Values are the result
+            of ``plan``, or the exception raised for that device.
+        """
+        def _plan(device):
+            try:
+                return FileSystemInventory(device).plan(size, **kwargs)
+            except Exception as e:
+                return e
+
+        if not devices:
+            return {}
+
+        pool = ThreadPool(max(1, min(workers, len(devices))))
+        try:
+            results = pool.map(_plan, devices)
+        finally:
+            pool.close()
+            pool.join()
+
+        return dict((device.host, result)
+                    for device, result in zip(devices, results))
@@ -0,0 +1,212 @@
+"""Distribute a file to many HPCOM7 devices in parallel.
+"""
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from pyhpecw7.features.file_copy import FileCopy
+
+
+class TokenBucket(object):
+    """A thread-safe token bucket used to cap transfer bandwidth.
+
+    Args:
+        rate (int): bytes per second
+        burst (int): OPTIONAL - bucket size in bytes.
+            Defaults to one second worth of tokens.
+
+    Attributes:
+        rate (int): bytes per second
+        burst (int): bucket size in bytes
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        """Take ``amount`` tokens, sleeping until they are available.
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                # allow blocks bigger than the bucket once it is full
+                if self._tokens >= min(amount, self.burst):
+                    self._tokens -= amount
+                    return
+                wait = (min(amount, self.burst) - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class FleetCopy(object):
+    """This class is used to copy one local file, usually an image
+    for ``install_os.InstallOs``, to many ``HPCOM7`` devices at once.
+
+    Devices are checked in parallel first: devices that already have
+    a file with the same md5 sum are skipped, and devices without
+    enough free space are reported before anything is transferred.
+    The remaining devices are then transferred by a bounded pool of
+    worker threads, with optional global and per-site bandwidth caps.
+
+    Note:
+        Every device must have its own connected ``HPCOM7`` object.
+        The same requirements as ``FileCopy`` apply.
+
+    Args:
+        devices (list): connected ``pyhpecw7.comware.HPCOM7`` objects.
+        src (str): Full path to local file to be copied.
+        dst (str): OPTIONAL - Full path or filename of remote file.
+            See ``FileCopy``.
+        port (int): OPTIONAL - The SSH port over which
+            the SCP connection is made. Defaults to 22.
+        workers (int): OPTIONAL - maximum number of devices
+            checked or transferred at once. Defaults to 8.
+        max_rate (int): OPTIONAL - global bandwidth cap in bytes/sec.
+        sites (dict): OPTIONAL - device host to site name.
+        site_rates (dict): OPTIONAL - site name to bandwidth
+            cap in bytes/sec.
+        state_dir (str): OPTIONAL - local state directory.
+            See ``FileCopy``.
+
+    Attributes:
+        devices (list): connected ``pyhpecw7.comware.HPCOM7`` objects.
+        src (str): Full path to local file to be copied.
+        results (dict): device host to a dictionary with the
+            following k/v pairs, updated as the copy progresses:
+                :status (str): 'pending', 'skipped', 'ready',
+                    'no_space', 'transferring', 'done' or 'failed'
+                :sent (int): bytes sent
+                :size (int): file size in bytes
+                :rate (float): average transfer rate in bytes/sec
+                :error (str): error message if failed, else ``None``
+    """
+    def __init__(self, devices, src, dst=None, port=22, workers=8,
+                 max_rate=None, sites=None, site_rates=None, state_dir=None):
+        self.devices = devices
+        self.src = src
+        self.dst = dst
+        self.port = port
+        self.workers = workers
+        self.sites = sites or {}
+        self.state_dir = state_dir
+
+        self._global_bucket = TokenBucket(max_rate) if max_rate else None
+        self._site_buckets = dict(
+            (site, TokenBucket(rate))
+            for site, rate in (site_rates or {}).items())
+
+        self.size = os.path.getsize(src)
+        self.results = dict(
+            (device.host, dict(status='pending', sent=0, size=self.size,
+                               rate=0.0, error=None))
+            for device in devices)
+
+    def _map(self, func, devices):
+        pool = ThreadPool(max(1, min(self.workers, len(devices))))
+        try:
+            return pool.map(func, devices)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _fail(self, device, error):
+        result = self.results[device.host]
+        result['status'] = 'failed'
+        result['error'] = str(error)
+
+    def _check(self, device):
+        """Check one device for an existing copy and free space.
+        """
+        result = self.results[device.host]
+        try:
+            file_copy = FileCopy(device, self.src, dst=self.dst,
+                                 port=self.port, state_dir=self.state_dir)
+            if not file_copy.remote_dir_exists:
+                file_copy.create_remote_dir()
+
+            if file_copy.file_already_exists():
+                result['status'] = 'skipped'
+            elif file_copy._get_flash_size() < self.size:
+                result['status'] = 'no_space'
+            else:
+                result['status'] = 'ready'
+        except Exception as e:
+            self._fail(device, e)
+
+    def check(self):
+        """Check every device in parallel. Missing remote
+        directories are created.
+
+        Returns:
+            ``results``, with each device's status set to 'skipped',
+            'ready', 'no_space' or 'failed'.
+        """
+        self._map(self._check, self.devices)
+        return self.results
+
+    def _throttle(self, device, sent):
+        bucket = self._site_buckets.get(self.sites.get(device.host))
+        if bucket is not None:
+            bucket.consume(sent)
+        if self._global_bucket is not None:
+            self._global_bucket.consume(sent)
+
+    def _transfer(self, device, progress, transfer_kwargs):
+        """Transfer the file to one device.
+        """
+        result = self.results[device.host]
+        result['status'] = 'transferring'
+        last = [0]
+
+        def _progress(sent, size, rate):
+            self._throttle(device, sent - last[0])
+            last[0] = sent
+            result['sent'] = sent
+            result['rate'] = rate
+            if progress:
+                progress(device.host, sent, size, rate)
+
+        try:
+            file_copy = FileCopy(device, self.src, dst=self.dst,
+                                 port=self.port, state_dir=self.state_dir)
+            file_copy.transfer_file(progress=_progress, safety_checks=False,
+                                    **transfer_kwargs)
+            result['status'] = 'done'
+        except Exception as e:
+            self._fail(device, e)
+
+    def transfer(self, progress=None, **transfer_kwargs):
+        """Check every device that hasn't been checked yet,
+        then transfer the file to every 'ready' device in parallel.
+
+        Args:
+            progress (callable): OPTIONAL - called after every block
+                is sent with the device host, bytes sent, file size
+                and average rate in bytes/sec.
+            transfer_kwargs: OPTIONAL - passed to
+                ``FileCopy.transfer_file``, e.g. ``reuse_transport``
+
+        Returns:
+            ``results``. Transferred devices have their status
+            set to 'done', or 'failed' with an error message.
+        """
+        pending = [device for device in self.devices
+                   if self.results[device.host]['status'] == 'pending']
+        if pending:
+            self._map(self._check, pending)
+
+        ready = [device for device in self.devices
+                 if self.results[device.host]['status'] == 'ready']
+        if ready:
+            self._map(lambda device: self._transfer(
+                device, progress, transfer_kwargs), ready)
+
+        return self.results
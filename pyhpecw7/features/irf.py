@@ -364,9 +364,8 @@ class IrfMember(object):
                 }
         """
         mad_ex_ifaces = []
-        raw_rsp = self.device.cli_display(
-            'display current | inc "mad exclude interface"')
-        lines = raw_rsp.split('\n')[1:-1]
+        lines = self.device.running_config.find_global(
+            'mad exclude interface')
 
         for line in lines:
             mad_ex_ifaces.append(line.split()[-1])
@@ -1,10 +1,37 @@
 """Ping another device from HPCOM7 devices.
 """
+import array
+import collections
+import io
+import itertools
+import threading
+from multiprocessing.pool import ThreadPool
 from lxml import etree
 from pyhpecw7.features.errors import InvalidIPAddress
 from pyhpecw7.utils.validate import valid_ip_network
 from pyhpecw7.utils.xml.lib import *
 
+_KEYS = {
+    'PayloadLength': 'payload_length',
+    'TotalTransmitPacket': 'packets_tx',
+    'TotalReceivePacket': 'packets_rx',
+    'LossRate': 'loss_rate',
+    'Host': 'host',
+    'SrcAddr': 'source'
+}
+
+_TIME_KEYS = {
+    'MinReplyTime': 'min',
+    'MaxReplyTime': 'max',
+    'AvgReplyTime': 'avg'
+}
+
+
+def _ms(microseconds):
+    """Reply times are reported in microseconds.
+    """
+    return str(int(microseconds) // 1000)
+
 
 class Ping(object):
     """Ping another device from an HPCOM7 device.
@@ -34,10 +61,16 @@ class Ping(object):
         detail (bool): set to true if you want to see per ping
             (ICMP echo request) response details
         response (dict): see ``_ping``
+        rtts (array.array): reply time in microseconds of each
+            ICMP echo reply, in the order they were received
 
     """
 
     def __init__(self, device, host, vrf='', v6=False, detail=False):
+        self._setup(device, host, vrf, v6, detail)
+        self.response = self._ping()
+
+    def _setup(self, device, host, vrf, v6, detail):
         self.device = device
         self.host = host
         self.vrf = vrf or ''
@@ -48,7 +81,14 @@ class Ping(object):
         self.v4tags = ['Ping', 'IPv4Ping', 'PingTest']
         self.v6tags = ['Ping', 'IPv6Ping', 'PingTest']
 
-        self.response = self._ping()
+    @classmethod
+    def _prepare(cls, device, host, vrf='', v6=False, detail=False):
+        """Return a ``Ping`` that hasn't been sent yet.
+        """
+        ping = cls.__new__(cls)
+        ping._setup(device, host, vrf, v6, detail)
+        ping.response = None
+        return ping
 
     def _ping(self):
         """Builds XML object for VLAN configuration and sends to staging
@@ -60,6 +100,8 @@ class Ping(object):
                 :max (str): represents max response time in milliseconds
                 :min (str): represents min response time in milliseconds
                 :avg (str): represents avg response time in milliseconds
+                :avg_us (str): represents avg response time in
+                    microseconds, as reported by the device
                 :packets_tx (str): number of packets sent
                 :packets_rx (str): number of packets received
                 :host (str): target host being "pinged"
@@ -68,6 +110,12 @@ class Ping(object):
                     detail for each icmp request including icmp seq #
                     and reply time.
 
+        """
+        rsp = self.device.action(self._request(), modifies_config=False)
+        return self._build_response(rsp)
+
+    def _request(self):
+        """Build the ping action element.
         """
         if '.' in self.host or ':' in self.host:
             self.param_check(host=self.host)
@@ -96,53 +144,176 @@ class Ping(object):
                 )
             )
 
-        rsp = self.device.action(top)
-        return self._build_response(rsp)
+        return top
 
     def _build_response(self, response):
         """Builds dictionary from XML response coming from device
+
+        The reply is parsed in one streaming pass, so large repeat
+        counts cost time linear in the number of echo replies, and
+        each echo reply is discarded once its time is recorded in
+        ``rtts``.
         """
         as_string = response.xml
-        as_xml = etree.fromstring(as_string)
-
-        key_map = {
-            'payload_length': 'PayloadLength',
-            'packets_tx': 'TotalTransmitPacket',
-            'packets_rx': 'TotalReceivePacket',
-            'loss_rate': 'LossRate',
-            'min': 'MinReplyTime',
-            'max': 'MaxReplyTime',
-            'avg': 'AvgReplyTime',
-            'host': 'Host',
-            'source': 'SrcAddr'
-        }
-
-        def _get_time(time):
-            return str(int(find_in_action('ReplyTime', time).text) / 1000)
+        if not isinstance(as_string, bytes):
+            as_string = as_string.encode('utf-8')
 
         ping_response = {}
-        for new_key, xml_tag in key_map.iteritems():
-            value = ''
-            if new_key in ['min', 'avg', 'max']:
-                value = _get_time(as_xml)
-            else:
-                get_obj = find_in_action(xml_tag, as_xml)
-                if get_obj is not None:
-                    value = get_obj.text
-            if value:
-                ping_response[new_key] = value
-            if self.detail:
-                five_replies = findall_in_action('EchoReply', as_xml)
-                replies = []
-                for reply in five_replies:
-                    icmp_seq = find_in_action('IcmpSequence', reply).text
-                    reply_time = _get_time(reply)
-                    temp = dict(icmp_seq=icmp_seq, reply_time=reply_time)
-                    replies.append(temp)
-                ping_response['detailed_response'] = replies
+        replies = []
+        self.rtts = array.array('l')
+        icmp_seq = None
+
+        for _, ele in etree.iterparse(io.BytesIO(as_string)):
+            tag = etree.QName(ele).localname
+            if tag == 'IcmpSequence':
+                icmp_seq = ele.text
+            elif tag == 'ReplyTime':
+                self.rtts.append(int(ele.text))
+                if self.detail:
+                    replies.append(dict(icmp_seq=icmp_seq,
+                                        reply_time=_ms(ele.text)))
+            elif tag == 'EchoReply':
+                ele.clear()
+            elif tag in _TIME_KEYS:
+                ping_response[_TIME_KEYS[tag]] = _ms(ele.text)
+                if tag == 'AvgReplyTime':
+                    ping_response['avg_us'] = str(int(ele.text))
+            elif tag in _KEYS and ele.text:
+                ping_response[_KEYS[tag]] = ele.text
+
+        if self.detail:
+            ping_response['detailed_response'] = replies
 
         return ping_response
 
+    @staticmethod
+    def _open_session(device):
+        """Open another NETCONF session to the same device.
+        """
+        session = type(device)(host=device.host, username=device.username,
+                               password=device.password, port=device.port,
+                               timeout=device.timeout)
+        session.open()
+        return session
+
+    @staticmethod
+    def _pipeline(device, targets, vrf, v6, detail, concurrency, done):
+        """Ping ``targets`` over one session, keeping up to
+        ``concurrency`` ping actions in flight.
+        """
+        connection = device.connection
+        pending = collections.deque()
+        targets = iter(targets)
+
+        connection.async_mode = True
+        try:
+            while True:
+                while len(pending) < concurrency:
+                    host = next(targets, None)
+                    if host is None:
+                        break
+
+                    ping = Ping._prepare(device, host, vrf, v6, detail)
+                    try:
+                        if connection.async_mode:
+                            pending.append(
+                                (ping, connection.action(ping._request())))
+                        else:
+                            ping.response = ping._ping()
+                            done(host, ping.response)
+                    except UserWarning:
+                        # the session doesn't support pipelining
+                        connection.async_mode = False
+                        targets = itertools.chain([host], targets)
+                    except Exception as e:
+                        done(host, dict(host=host, error=str(e)))
+
+                if not pending:
+                    break
+
+                ping, rpc = pending.popleft()
+                if not rpc.event.wait(device.timeout):
+                    done(ping.host, dict(host=ping.host,
+                                         error='The NETCONF RPC timed out.'))
+                elif rpc.error is not None or not rpc.reply.ok:
+                    done(ping.host, dict(host=ping.host,
+                                         error=str(rpc.error or rpc.reply.error)))
+                else:
+                    ping.response = ping._build_response(rpc.reply)
+                    done(ping.host, ping.response)
+        finally:
+            connection.async_mode = False
+
+    @staticmethod
+    def many(device, targets, vrf='', v6=False, detail=False,
+             concurrency=8, sessions=1, callback=None):
+        """Ping many targets from one device concurrently.
+
+        Ping actions are pipelined over the NETCONF session, so up to
+        ``concurrency`` of them are in flight at once instead of
+        waiting for each reply before sending the next request. With
+        ``sessions`` greater than 1, extra NETCONF sessions are opened
+        and the targets are split between them, so the device can run
+        pings in parallel.
+
+        Note:
+            The session is switched to ncclient's asynchronous mode
+            while the pings run, so ``device`` must not be used by
+            other threads at the same time.
+
+        Args:
+            device (HPCOM7): connected instance of a
+                ``pyhpecw7.comware.HPCOM7`` object.
+            targets (list): IP addresses or names to ping
+            vrf (str): OPTIONAL - source VRF on the switch
+            v6 (bool): OPTIONAL - set to true if the targets are v6
+            detail (bool): OPTIONAL - include per ping response details
+            concurrency (int): OPTIONAL - ping actions in flight per
+                session. Defaults to 8.
+            sessions (int): OPTIONAL - NETCONF sessions to use.
+                Defaults to 1, i.e. only the session of ``device``.
+            callback (callable): OPTIONAL - called with the target
+                and its response as soon as each ping completes.
+
+        Returns:
+            A dictionary of target to its response, see ``_ping``.
+            Targets that failed have a response with ``host`` and
+            ``error`` (str) keys instead.
+        """
+        targets = list(targets)
+        results = {}
+        lock = threading.Lock()
+
+        def _done(host, response):
+            with lock:
+                results[host] = response
+                if callback:
+                    callback(host, response)
+
+        devices = [device]
+        try:
+            for _ in range(1, min(sessions, len(targets))):
+                devices.append(Ping._open_session(device))
+
+            chunks = [targets[i::len(devices)] for i in range(len(devices))]
+            if len(devices) == 1:
+                Ping._pipeline(device, targets, vrf, v6, detail,
+                               concurrency, _done)
+            else:
+                pool = ThreadPool(len(devices))
+                try:
+                    pool.map(lambda args: Ping._pipeline(
+                        args[0], args[1], vrf, v6, detail, concurrency, _done),
+                        zip(devices, chunks))
+                finally:
+                    pool.close()
+                    pool.join()
+        finally:
+            for session in devices[1:]:
+                session.close()
+
+        return results
+
     def param_check(self, **kvargs):
         """Basic param validation for v4 and v6 addresses
         """
@@ -0,0 +1,194 @@
+"""Check reachability between many HPCOM7 devices and targets.
+"""
+import array
+import base64
+import json
+import math
+from multiprocessing.pool import ThreadPool
+
+from pyhpecw7.features.ping import Ping
+
+NAN = float('nan')
+
+
+class PingMatrix(object):
+    """This class is used to ping every target from every source
+    device and keep the packet loss and average round trip time of
+    each pair in compact arrays.
+
+    Sources are pinged from in parallel by a bounded pool of worker
+    threads, and every source pings its targets with ``Ping.many``.
+    A 100 x 1,000 matrix takes under a megabyte of memory.
+
+    Note:
+        Every source must have its own connected ``HPCOM7`` object,
+        unless it's listed more than once with different VRFs, in
+        which case the VRFs are pinged from one after the other.
+
+    Args:
+        sources (list): connected ``pyhpecw7.comware.HPCOM7`` objects,
+            or tuples of (``HPCOM7``, vrf) to ping from a VRF.
+        targets (list): unique IP addresses or names to ping.
+        workers (int): OPTIONAL - maximum number of devices
+            pinging at once. Defaults to 8.
+        ping_kwargs: OPTIONAL - passed to ``Ping.many``,
+            e.g. ``concurrency`` or ``sessions``
+
+    Attributes:
+        sources (list): labels of the sources, the device host,
+            followed by '/<vrf>' for a VRF.
+        targets (list): the targets.
+        loss (array.array): packet loss in percent of each pair,
+            row by row, i.e. ``loss[source_index * len(targets) +
+            target_index]``. NaN until the pair is pinged.
+        rtt (array.array): average round trip time in milliseconds
+            of each pair, indexed like ``loss``. NaN if unknown.
+        errors (dict): (source, target) to the error message of
+            pairs whose ping failed.
+    """
+    def __init__(self, sources, targets, workers=8, **ping_kwargs):
+        self._sources = [source if isinstance(source, tuple)
+                         else (source, '') for source in sources]
+        self.sources = [self._label(device, vrf)
+                        for device, vrf in self._sources]
+        self.targets = list(targets)
+        self.workers = workers
+        self.ping_kwargs = ping_kwargs
+
+        size = len(self.sources) * len(self.targets)
+        self.loss = array.array('f', [NAN]) * size
+        self.rtt = array.array('f', [NAN]) * size
+        self.errors = {}
+
+        self._target_index = dict(
+            (target, index) for index, target in enumerate(self.targets))
+
+    def _label(self, device, vrf):
+        if vrf:
+            return '{0}/{1}'.format(device.host, vrf)
+        return device.host
+
+    def _record(self, row, target, response):
+        index = row * len(self.targets) + self._target_index[target]
+        if 'error' in response:
+            self.loss[index] = 100.0
+            self.rtt[index] = NAN
+            self.errors[(self.sources[row], target)] = response['error']
+            return
+
+        self.loss[index] = float(response.get('loss_rate', 100))
+        # 'avg' is truncated to whole milliseconds
+        self.rtt[index] = float(response['avg_us']) / 1000\
+            if 'avg_us' in response else NAN
+
+    def _ping_device(self, rows):
+        """Ping every target from the sources in ``rows``,
+        which all share one device.
+        """
+        for row in rows:
+            device, vrf = self._sources[row]
+            try:
+                Ping.many(device, self.targets, vrf=vrf,
+                          callback=lambda target, response: self._record(
+                              row, target, response),
+                          **self.ping_kwargs)
+            except Exception as e:
+                for target in self.targets:
+                    self._record(row, target, dict(error=str(e)))
+
+    def run(self):
+        """Ping every target from every source.
+
+        Returns:
+            ``self``, with ``loss``, ``rtt`` and ``errors`` filled in.
+        """
+        rows_by_device = {}
+        for row, (device, vrf) in enumerate(self._sources):
+            rows_by_device.setdefault(id(device), []).append(row)
+        groups = sorted(rows_by_device.values())
+
+        if groups:
+            pool = ThreadPool(max(1, min(self.workers, len(groups))))
+            try:
+                pool.map(self._ping_device, groups)
+            finally:
+                pool.close()
+                pool.join()
+
+        return self
+
+    def get(self, source, target):
+        """Get the result of one pair.
+
+        Returns:
+            A tuple of (loss in percent, average RTT in milliseconds).
+        """
+        index = self.sources.index(source) * len(self.targets)\
+            + self._target_index[target]
+        return self.loss[index], self.rtt[index]
+
+    def failed(self, max_loss=0):
+        """Get the pairs that lost more than ``max_loss`` percent
+        of their packets, or weren't pinged.
+
+        Returns:
+            A list of (source, target, loss) tuples.
+        """
+        failed = []
+        width = len(self.targets)
+        for index, loss in enumerate(self.loss):
+            if math.isnan(loss) or loss > max_loss:
+                failed.append((self.sources[index // width],
+                               self.targets[index % width], loss))
+        return failed
+
+    def worst_rtt(self):
+        """Get the target with the highest average RTT of each source.
+
+        Returns:
+            A dictionary of source to a (target, rtt) tuple, or
+            ``None`` if no target replied.
+        """
+        worst = {}
+        width = len(self.targets)
+        for row, source in enumerate(self.sources):
+            slowest = None
+            for column in range(width):
+                rtt = self.rtt[row * width + column]
+                if not math.isnan(rtt) and (slowest is None or rtt > slowest[1]):
+                    slowest = (self.targets[column], rtt)
+            worst[source] = slowest
+        return worst
+
+    def save(self, path):
+        """Save the matrix to ``path`` as JSON, with the arrays
+        stored as base64 encoded binary.
+        """
+        with open(path, 'w') as matrix_file:
+            json.dump(dict(sources=self.sources,
+                           targets=self.targets,
+                           loss=base64.b64encode(self.loss.tostring()),
+                           rtt=base64.b64encode(self.rtt.tostring()),
+                           errors=[[source, target, error] for
+                                   (source, target), error in
+                                   sorted(self.errors.items())]),
+                      matrix_file)
+
+    @classmethod
+    def load(cls, path):
+        """Load a matrix saved with ``save``.
+
+        The loaded matrix can be queried, but not run.
+        """
+        with open(path) as matrix_file:
+            saved = json.load(matrix_file)
+
+        matrix = cls([], saved['targets'])
+        matrix.sources = saved['sources']
+        matrix.loss = array.array('f')
+        matrix.loss.fromstring(base64.b64decode(saved['loss']))
+        matrix.rtt = array.array('f')
+        matrix.rtt.fromstring(base64.b64decode(saved['rtt']))
+        matrix.errors = dict(((source, target), error)
+                             for source, target, error in saved['errors'])
+        return matrix
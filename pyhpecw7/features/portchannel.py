@@ -1,10 +1,10 @@
 """Manage portchannels on HPCOM7 devices.
 """
-from pyhpecw7.features.errors import InvalidPortType, AggregationGroupError
+from pyhpecw7.features.errors import InvalidPortType, AggregationGroupError,\
+    InterfaceAbsentError
 from pyhpecw7.utils.xml.lib import *
 from pyhpecw7.features.interface import Interface
-import base64
-import binascii
+from pyhpecw7.utils.bitmap import bitmap_to_indexes, indexes_to_bitmap
 
 
 class Portchannel(object):
@@ -29,6 +29,43 @@ class Portchannel(object):
             in ``build_config``.
 
     """
+    # The maps below are used to map XML tags to dictionary keys
+    # (and vice versa) as well as map values coming from the switch
+    # into more user friendly values
+    PORTCHANNEL = dict(
+        groupid='GroupId',
+        mode='LinkMode',
+        pc_index='IfIndex',
+        members='MemberList',
+        lacp_edge='LacpEdgeEnable'
+        )
+    R_PORTCHANNEL = dict(reversed(item) for item in PORTCHANNEL.iteritems())
+    value_map = {
+        'LinkMode': {
+            '1': 'static',
+            '2': 'dynamic'
+            },
+        'LacpEdgeEnable': {
+            'true': 'enabled',
+            'false': 'disabled'
+            }
+    }
+    R_value_map = reverse_value_map(R_PORTCHANNEL, value_map)
+    LACP = dict(
+        groupid='GroupId',
+        intf_index='IfIndex',
+        enabled='LacpEnable',
+        lacp_mode='LacpMode',
+        )
+    R_LACP = dict(reversed(item) for item in LACP.iteritems())
+    lacp_value_map = {
+        'LacpMode': {
+            '1': 'active',
+            '2': 'passive'
+        }
+    }
+    R_lacp_value_map = reverse_value_map(R_LACP, lacp_value_map)
+
     def __init__(self, device, groupid, pc_type):
         self.device = device
         self.groupid = groupid
@@ -40,6 +77,7 @@ class Portchannel(object):
         self._xgroupid = self._pc_group_mapping()
         self.members_to_remove = []
         self.desired_lacp_mode = ''
+        self.raw_config = []
 
         self._members_map_index_key = {}
         self._members_map_interface_key = {}
@@ -49,46 +87,6 @@ class Portchannel(object):
         self.pc_tags = ['LAGG', 'LAGGGroups', 'LAGGGroup']
         self.member_tags = ['LAGG', 'LAGGMembers', 'LAGGMember']
 
-        # The rest of the attributes listed below are all used to map
-        # XML tags to dictionary keys (and vice versa) as well as
-        # map values coming from the switch into more user friendly values
-        self.PORTCHANNEL = dict(
-            groupid='GroupId',
-            mode='LinkMode',
-            pc_index='IfIndex',
-            members='MemberList',
-            lacp_edge='LacpEdgeEnable'
-            )
-        self.R_PORTCHANNEL = dict(reversed(
-            item) for item in self.PORTCHANNEL.iteritems())
-        self.value_map = {
-            'LinkMode': {
-                '1': 'static',
-                '2': 'dynamic'
-                },
-            'LacpEdgeEnable': {
-                'true': 'enabled',
-                'false': 'disabled'
-                }
-        }
-        self.R_value_map = reverse_value_map(
-            self.R_PORTCHANNEL, self.value_map)
-        self.LACP = dict(
-            groupid='GroupId',
-            intf_index='IfIndex',
-            enabled='LacpEnable',
-            lacp_mode='LacpMode',
-            )
-        self.R_LACP = dict(reversed(item) for item in self.LACP.iteritems())
-        self.lacp_value_map = {
-            'LacpMode': {
-                '1': 'active',
-                '2': 'passive'
-            }
-        }
-        self.R_lacp_value_map = reverse_value_map(
-            self.R_LACP, self.lacp_value_map)
-
     def get_portchannels(self):
         """Get a list of portchannel groups that exist on the switch
 
@@ -290,54 +288,38 @@ class Portchannel(object):
 
         """
 
-        hex_value = base64.b64decode(bitmap).encode('hex')
-        h_size = len(hex_value) * 4
-        binary_value = (bin(int(hex_value, 16))[2:]).zfill(h_size)
-        members_by_index = []
-        for index, bit in enumerate(binary_value):
-            port = index + 1
-            if bit == '1':
-                members_by_index.append(port)
+        members_by_index = self._get_indexes_from_bitmap(bitmap)
         members_by_name = []
         for index in members_by_index:
             members_by_name.append(self.get_interface_from_index(str(index)))
 
         return members_by_index, members_by_name
 
-#    def _get_bitmap_from_members(self, members):
-#        """Return bitmap given a list of interface names
-#           Not used, but kept, just in case :)
-#        """
-#        index_list = []
-#        for member in members:
-#            index = self.get_index_from_interface(member)
-#            index_list.append(int(index))
-#
-#        index_list.sort()
-#        binary = ''
-#        start = 1
-#        for finish in index_list:
-#            for num in range(start, finish):
-#                binary += '0'
-#            binary += '1'
-#            start = finish + 1
-#
-#        lenbinary = len(binary)
-#        start = 8
-#        while (start % lenbinary) == start:
-#            start += 8
-#        newfill = start - len(binary)
-#        binary += newfill * '0'
-#
-#        # chr only goes up to 255!!! fixed in py3!!! ugh
-#        # bitmap = base64.b64encode(chr(int(binary, 2)))
-#        hexa = hex(int(binary, 2))[2:]
-#        if len(hexa) % 2 != 0:
-#            hexa += '0'
-#        converted_to_ascii = binascii.a2b_hex(hexa)
-#        bitmap = base64.b64encode(converted_to_ascii)
-#
-#        return bitmap
+    @staticmethod
+    def _get_indexes_from_bitmap(bitmap):
+        """Return list of IfIndexes (as integers) from bitmap encoded as base64
+
+            Args:
+                bitmap (str): memberlist as base64 as retrieved via NETCONF
+
+            Returns:
+                This returns a list of IfIndexes in ascending order.
+
+        """
+        return list(bitmap_to_indexes(bitmap))
+
+    def _get_bitmap_from_members(self, members):
+        """Return bitmap encoded as base64 given a list of interface names
+
+            Args:
+                members (list): interface names
+
+            Returns:
+                This returns the memberlist as base64 as used via NETCONF.
+
+        """
+        return indexes_to_bitmap(
+            self.get_index_from_interface(member) for member in members)
 
     def get_interface_from_index(self, index):
         """Return interface name based on a given ifindex
@@ -380,13 +362,10 @@ class Portchannel(object):
         elif self.pc_type == 'routed':
             self.fulltype = 'Route-Aggregation'
 
-        text = self.device.cli_display(
-            'display current-configuration interface {0} {1}'.format(
-                self.fulltype, self.groupid))
-
-        text_as_list = text.split('\n')
+        section = self.device.running_config.interface(
+            '{0}{1}'.format(self.fulltype, self.groupid))
 
-        self.raw_config = text_as_list
+        self.raw_config = section.to_lines() if section is not None else []
 
     def get_selected_port_min(self):
         """Get selected port min configuration
@@ -526,6 +505,9 @@ class Portchannel(object):
                 selected-port maximum
             lacp_to_change (list): OPTIONAL - list of interfaces that need
                 have their lacp mode changed
+            members_as_bitmap (bool): OPTIONAL - write ``members`` as a
+                single ``MemberList`` bitmap on the ``LAGGGroup`` instead
+                of one ``LAGGMember`` per member.
 
         Note:
             ``desired_lacp_mode`` needs to be set for the members in
@@ -533,6 +515,12 @@ class Portchannel(object):
 
             ``members_to_remove`` can be set to remove members during the
             build process.  This should also be a list of interface names.
+            It can't be combined with ``members_as_bitmap`` since the
+            bitmap is the complete member list.
+
+        Raises:
+            ValueError: if ``members_as_bitmap`` is set along with
+                ``members_to_remove``.
 
         Returns:
             True if stage=True and successfully staged
@@ -568,12 +556,25 @@ class Portchannel(object):
         if 'members' in portchannel.keys():
             portchannel.pop('members')
 
+        group_params = config_params(portchannel, self.PORTCHANNEL, value_map=self.R_value_map, fill_in=False)
+
+        members_as_bitmap = portchannel.get('members_as_bitmap')
+        if state == 'present' and members_as_bitmap and self.members_to_remove:
+            raise ValueError('members_to_remove can not be used with '
+                             'members_as_bitmap, leave the members out '
+                             'of the members list instead.')
+
+        if state == 'present' and members_as_bitmap and members_desired_list:
+            group_params.append(E.MemberList(
+                self._get_bitmap_from_members(members_desired_list)))
+            members_desired_list = []
+
         config = EC.config(
             E.top(
                 E.LAGG(
                     E.LAGGGroups(
                         E.LAGGGroup(
-                            *config_params(portchannel, self.PORTCHANNEL, value_map=self.R_value_map, fill_in=False)
+                            *group_params
                         )
                     )
                 ),
@@ -582,9 +583,10 @@ class Portchannel(object):
         )
 
         lacp_to_change = portchannel.get('lacp_to_change')
+        members_to_remove = self.members_to_remove
 
         if state == 'present':
-            if members_desired_list or self.members_to_remove or \
+            if members_desired_list or members_to_remove or \
                     lacp_to_change:
                 lagg = find_in_config('LAGG', config)
                 members = E.LAGGMembers()
@@ -594,7 +596,7 @@ class Portchannel(object):
                     members.append(self._add_lagg_member(each))
                 # now remove any members not in the desired members list
                 # and set in the remove list
-                for each in self.members_to_remove:
+                for each in members_to_remove:
                     members.append(self._add_lagg_member(each, remove=True))
                 if lacp_to_change:
                     for each in lacp_to_change:
@@ -629,6 +631,160 @@ class Portchannel(object):
         else:
             return [c1, c2]
 
+    @staticmethod
+    def build_many(device, portchannels, stage=False):
+        """Stage or execute one config object for many portchannels
+
+        Membership changes are computed against a single
+        ``PortchannelInventory`` read and sent as one ``LAGG``
+        edit-config covering every group.  Selected-port min/max
+        commands are sent in the same locked transaction.
+
+        Args:
+            device (HPCOM7): connected instance of a
+                ``pyhpecw7.comware.HPCOM7`` object.
+            portchannels (list): list of dicts, one per portchannel.
+                See Keyword Args for the keys of each dict.
+            stage (bool): whether to stage the commands or execute
+                immediately
+
+        Keyword Args:
+            groupid (str): REQUIRED - group # of the RAGG/BAGG interface
+            pc_type (str): REQUIRED - must be "bridged" or "routed"
+            members (list): OPTIONAL - complete list of desired members
+                by interface name.  Current members not in the list are
+                removed.  Leave out to keep the current members.
+            mode (str): OPTIONAL - "static" or "dynamic"
+            lacp_edge (str): OPTIONAL - "enabled" or "disabled"
+            min_ports (str): OPTIONAL - number that represents
+                selected-port minimum
+            max_ports (str): OPTIONAL - number that represents
+                selected-port maximum
+
+        Note:
+            An interface can only move from one group to another in
+            the same call, i.e. when the ``members`` of its current
+            group are also given and no longer include it.  It is then
+            only added to its new group, never removed first.
+
+        Raises:
+            InterfaceAbsentError: if a member interface does not exist.
+            AggregationGroupError: when an interface is already
+                a member of a different portchannel that isn't
+                giving it up in the same call.
+
+        Returns:
+            True if stage=True and successfully staged
+            List of etree.Element XML responses if immediate execution
+            ``None`` if nothing needs to change
+        """
+        inventory = PortchannelInventory(device)
+        existing = inventory.get_config()
+
+        index_by_name = dict(
+            (name.lower(), index) for index, name in inventory.iface_map.items())
+
+        def _index(interface):
+            index = index_by_name.get(interface.lower())
+            if not index:
+                index = Interface(device, interface).iface_index
+                if not index:
+                    raise InterfaceAbsentError(interface)
+                index_by_name[interface.lower()] = index
+            return index
+
+        E = config_element_maker()
+        EC = nc_element_maker()
+
+        group_eles = []
+        adds = []
+        removes = []
+        commands = []
+        for params in portchannels:
+            pc = Portchannel(device, params['groupid'], params['pc_type'])
+            if pc.pc_type == 'routed':
+                pc.fulltype = 'Route-Aggregation'
+            else:
+                pc.fulltype = 'Bridge-Aggregation'
+            current = existing.get(pc.fulltype + pc.groupid, {})
+
+            group_params = dict(groupid=pc._xgroupid)
+            for key in ('mode', 'lacp_edge'):
+                if params.get(key) and params[key] != current.get(key):
+                    group_params[key] = params[key]
+            if not current or len(group_params) > 1:
+                group_eles.append(E.LAGGGroup(
+                    *config_params(group_params, pc.PORTCHANNEL,
+                                   value_map=pc.R_value_map, fill_in=False)))
+
+            if params.get('members') is not None:
+                current_indexes = set(
+                    _index(name) for name in current.get('members', []))
+                desired_names = dict(
+                    (_index(name), name) for name in params['members'])
+                for index in sorted(set(desired_names) - current_indexes, key=int):
+                    adds.append((index, pc._xgroupid, desired_names[index]))
+                for index in sorted(current_indexes - set(desired_names), key=int):
+                    removes.append(index)
+
+            min_max = {}
+            for key in ('min_ports', 'max_ports'):
+                if params.get(key) and params[key] != current.get(key):
+                    min_max[key] = params[key]
+            commands.extend(pc._get_min_max_cmds(**min_max))
+
+        group_by_index = dict(
+            (index_by_name.get(name.lower(), name), group)
+            for name, group in inventory.member_groups.items())
+        for index, group, name in adds:
+            existing_group = group_by_index.get(index)
+            if existing_group and existing_group != group\
+                    and index not in removes:
+                raise AggregationGroupError(name)
+
+        added = set(index for index, group, name in adds)
+        member_eles = [E.LAGGMember(E.IfIndex(index), E.GroupId(group))
+                       for index, group, name in adds]
+        member_eles.extend(E.LAGGMember(E.IfIndex(index), E.GroupId('0'))
+                           for index in removes if index not in added)
+
+        if not (group_eles or member_eles or commands):
+            return None
+
+        config = None
+        if group_eles or member_eles:
+            lagg = E.LAGG()
+            if group_eles:
+                lagg.append(E.LAGGGroups(*group_eles))
+            if member_eles:
+                lagg.append(E.LAGGMembers(*member_eles))
+
+            config = EC.config(
+                E.top(
+                    lagg,
+                    **operation_kwarg('merge')
+                )
+            )
+
+        if stage:
+            c1 = True
+            c2 = True
+            if config is not None:
+                c1 = device.stage_config(config, 'edit_config')
+            if commands:
+                c2 = device.stage_config(commands, 'cli_config')
+            return c1 and c2
+
+        def _push():
+            rsps = []
+            if config is not None:
+                rsps.append(device.edit_config(config))
+            if commands:
+                rsps.append(device.cli_config(commands))
+            return rsps
+
+        return device.execute(_push)
+
     def param_check(self, **portchannel):
         """Param validation for portchannel
 
@@ -662,3 +818,170 @@ class Portchannel(object):
                 if existing_group:
                     if existing_group != self._xgroupid:
                         raise AggregationGroupError(each)
+
+
+class PortchannelInventory(object):
+    """This class is used to collect data for every portchannel on the
+    switch in a single pass.
+
+    ``Portchannel.get_config`` works on one group and needs several NETCONF
+    and CLI round trips per member.  This class fetches ``LAGGGroups``,
+    ``LAGGMembers`` and the interface name table in one get, and reads
+    selected-port min/max for all aggregates from one config dump.
+
+    Args:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+
+    Attributes:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+        iface_map (dict): IfIndex (str) to interface name for every
+            interface on the switch.  Populated by ``get_config``.
+        member_groups (dict): interface name to INTERNAL group ID for every
+            port that is a member of any portchannel.  Populated by
+            ``get_config``.
+
+    """
+    def __init__(self, device):
+        self.device = device
+        self.iface_map = {}
+        self.member_groups = {}
+
+    def _get_lagg_data(self):
+        """Get every LAGG group, every LAGG member and the
+        IfIndex to interface name table in a single get.
+        """
+        E = data_element_maker()
+        top = E.top(
+            E.LAGG(
+                E.LAGGGroups(
+                    E.LAGGGroup(
+                        E.IfIndex(),
+                        E.GroupId(),
+                        E.LinkMode(),
+                        E.MemberList(),
+                        E.LacpEdgeEnable()
+                    )
+                ),
+                E.LAGGMembers(
+                    E.LAGGMember(
+                        E.IfIndex(),
+                        E.GroupId(),
+                        E.LacpMode()
+                    )
+                )
+            ),
+            E.Ifmgr(
+                E.Interfaces(
+                    E.Interface(
+                        E.IfIndex(),
+                        E.Name()
+                    )
+                )
+            )
+        )
+
+        nc_get_reply = self.device.get(('subtree', top))
+        return nc_get_reply.data_ele
+
+    def _get_min_max_by_interface(self):
+        """Get selected-port min/max for every aggregate interface
+        from the device's running configuration snapshot.
+
+        Returns:
+            Dictionary keyed by aggregate interface name.  Values are
+            dictionaries with ``min_ports`` and ``max_ports`` keys.
+        """
+        running_config = self.device.running_config
+        sections = running_config.interfaces('Bridge-Aggregation') \
+            + running_config.interfaces('Route-Aggregation')
+
+        min_max = {}
+        for section in sections:
+            current = min_max.setdefault(
+                section.text.split()[1], dict(min_ports=None, max_ports=None))
+            for key, find in (('min_ports', 'link-aggregation selected-port minimum'),
+                              ('max_ports', 'link-aggregation selected-port maximum')):
+                line = section.find(find)
+                if line is not None:
+                    current[key] = line.text.split(find)[-1].strip()
+
+        return min_max
+
+    def get_config(self):
+        """Get current configuration for every portchannel on the switch
+
+        Returns:
+            This returns a dictionary keyed by the aggregate interface
+            name, e.g. 'Bridge-Aggregation100'.  Each value is a
+            dictionary with the same k/v pairs as
+            ``Portchannel.get_config`` plus:
+
+                :pc_type (str): "bridged" or "routed"
+
+            It returns an empty dictionary if no portchannels exist.
+
+        """
+        data_ele = self._get_lagg_data()
+
+        self.iface_map = {}
+        for iface in findall_in_data('Interface', data_ele):
+            index = find_in_data('IfIndex', iface)
+            name = find_in_data('Name', iface)
+            if index is not None and name is not None:
+                self.iface_map[index.text] = name.text
+
+        lacp_modes = {}
+        self.member_groups = {}
+        for member in findall_in_data('LAGGMember', data_ele):
+            member_dict = data_elem_to_dict(
+                member, dict(index='IfIndex', group='GroupId',
+                             lacp_mode='LacpMode'),
+                value_map=Portchannel.lacp_value_map)
+            index = member_dict.get('index')
+            lacp_modes[index] = member_dict.get('lacp_mode')
+            if member_dict.get('group', '0') != '0':
+                name = self.iface_map.get(index, index)
+                self.member_groups[name] = member_dict.get('group')
+
+        min_max = self._get_min_max_by_interface()
+
+        portchannels = {}
+        for group in findall_in_data('LAGGGroup', data_ele):
+            return_pc = data_elem_to_dict(
+                group, Portchannel.PORTCHANNEL,
+                value_map=Portchannel.value_map)
+
+            return_pc['nc_groupid'] = return_pc['groupid']
+            nc_groupid = int(return_pc['nc_groupid'])
+            if nc_groupid > 16384:
+                return_pc['pc_type'] = 'routed'
+                return_pc['groupid'] = str(nc_groupid - 16384)
+                fulltype = 'Route-Aggregation'
+            else:
+                return_pc['pc_type'] = 'bridged'
+                return_pc['groupid'] = str(nc_groupid)
+                fulltype = 'Bridge-Aggregation'
+
+            members_by_name = []
+            lacp_modes_by_interface = []
+            if return_pc.get('members'):
+                for index in bitmap_to_indexes(return_pc.get('members')):
+                    index = str(index)
+                    name = self.iface_map.get(index, index)
+                    members_by_name.append(name)
+                    lacp_modes_by_interface.append(
+                        dict(interface=name,
+                             lacp_mode=lacp_modes.get(index)))
+
+            return_pc['members'] = members_by_name
+            return_pc['lacp_modes_by_interface'] = lacp_modes_by_interface
+
+            name = fulltype + return_pc['groupid']
+            return_pc.update(
+                min_max.get(name, dict(min_ports=None, max_ports=None)))
+
+            portchannels[name] = return_pc
+
+        return portchannels
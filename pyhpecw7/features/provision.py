@@ -0,0 +1,198 @@
+"""Provision full configurations on HPCOM7 devices.
+"""
+import os
+import re
+import tempfile
+
+from pyhpecw7.features.config import Config
+from pyhpecw7.features.file_copy import FileCopy
+from pyhpecw7.utils.config_tree import parse_config, diff_config
+
+
+def _natural_key(text):
+    return [int(part) if part.isdigit() else part.lower()
+            for part in re.split(r'(\d+)', text)]
+
+
+class Provision(object):
+    """This class is used to render a complete configuration from a
+    declarative model, copy it to the device in one transfer, and
+    activate it with the save/rollback/save sequence of ``Config.build``.
+
+    This is much faster than building a new switch with one
+    ``edit_config`` or ``cli_config`` call per feature.
+
+    Note:
+        Activating the file replaces the whole running configuration,
+        so the model must describe the complete configuration,
+        including management access.
+
+    Note:
+        The same requirements as ``FileCopy`` apply, i.e. SCP must
+        be enabled on the device.
+
+    Args:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+        model (dict): the declarative model. See Keyword Args.
+        filename (str): OPTIONAL - name of the configuration file on
+            the device's flash. Defaults to 'provision.cfg'.
+        local_dir (str): OPTIONAL - local directory where the rendered
+            file is written as ``filename``. Defaults to the system
+            temp directory, where the file is named after the device
+            host and ``filename``, so devices provisioned at the same
+            time don't overwrite each other's file.
+        port (int): OPTIONAL - SSH port used for the file transfer.
+            Defaults to 22.
+
+    Keyword Args:
+        sysname (str): OPTIONAL - device name
+        globals (list): OPTIONAL - global commands, e.g. 'lldp global enable'
+        vlans (dict): OPTIONAL - VLAN ID to a dictionary with
+            OPTIONAL ``name`` and ``descr`` keys
+        interfaces (dict): OPTIONAL - full interface name to a dictionary
+            with OPTIONAL ``description``, ``admin`` ('up' or 'down')
+            and ``commands`` (list of interface commands) keys
+        sections (list): OPTIONAL - tuples of (header, list of commands)
+            for any other section, e.g. ('line vty 0 63',
+            ['authentication-mode scheme']), rendered in order
+
+    Attributes:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+        model (dict): the declarative model.
+        filename (str): name of the configuration file on the device.
+        local_path (str): full path of the rendered local file.
+        port (int): SSH port used for the file transfer.
+    """
+    def __init__(self, device, model, filename='provision.cfg',
+                 local_dir=None, port=22):
+        self.device = device
+        self.model = model
+        self.filename = filename
+        if local_dir:
+            self.local_path = os.path.join(local_dir, filename)
+        else:
+            self.local_path = os.path.join(
+                tempfile.gettempdir(), '{0}-{1}'.format(
+                    re.sub(r'[^\w.-]', '_', device.host), filename))
+        self.port = port
+
+    def render(self):
+        """Render the model as Comware configuration text.
+
+        VLANs are rendered in numerical order and interfaces in
+        natural order, so the same model always renders to the same
+        text and an unchanged file is never transferred twice.
+
+        Returns:
+            The configuration text as a string.
+        """
+        model = self.model
+        blocks = []
+
+        if model.get('sysname'):
+            blocks.append([' sysname {0}'.format(model['sysname'])])
+
+        if model.get('globals'):
+            blocks.append([' ' + command for command in model['globals']])
+
+        vlans = model.get('vlans', {})
+        for vlanid in sorted(vlans, key=int):
+            vlan = vlans[vlanid] or {}
+            lines = ['vlan {0}'.format(vlanid)]
+            if vlan.get('name'):
+                lines.append(' name {0}'.format(vlan['name']))
+            if vlan.get('descr'):
+                lines.append(' description {0}'.format(vlan['descr']))
+            blocks.append(lines)
+
+        interfaces = model.get('interfaces', {})
+        for name in sorted(interfaces, key=_natural_key):
+            iface = interfaces[name] or {}
+            lines = ['interface {0}'.format(name)]
+            if iface.get('description'):
+                lines.append(' description {0}'.format(iface['description']))
+            lines.extend(' ' + command for command in iface.get('commands', []))
+            if iface.get('admin') == 'down':
+                lines.append(' shutdown')
+            blocks.append(lines)
+
+        for header, commands in model.get('sections', []):
+            blocks.append([header] + [' ' + command for command in commands])
+
+        text = []
+        for lines in blocks:
+            text.append('#')
+            text.extend(lines)
+        text.extend(['#', 'return'])
+
+        return '\n'.join(text) + '\n'
+
+    def write(self):
+        """Render the model and write it to ``local_path``.
+
+        Returns:
+            The rendered configuration text.
+        """
+        text = self.render()
+        with open(self.local_path, 'w') as config_file:
+            config_file.write(text)
+
+        return text
+
+    def compare(self, text=None):
+        """Compare the rendered model with the running configuration.
+
+        Args:
+            text (str): OPTIONAL - already rendered configuration text
+
+        Returns:
+            A list of section diffs.
+            See ``pyhpecw7.utils.config_tree.diff_config``.
+        """
+        if text is None:
+            text = self.render()
+        return diff_config(self.device.running_config.tree, parse_config(text))
+
+    def build(self, stage=False, hostname=None, username=None, password=None):
+        """Render, transfer and activate the configuration.
+
+        The rendered file is only transferred if the device doesn't
+        already have a file with the same name and md5 sum, and
+        nothing is transferred or activated if the running
+        configuration already matches the model.
+
+        Args:
+            stage (bool): whether to stage the activation or execute
+                immediately.  The file transfer always happens
+                immediately.
+            hostname (str): OPTIONAL - SSH host, see ``FileCopy.transfer_file``
+            username (str): OPTIONAL - SSH username
+            password (str): OPTIONAL - SSH password
+
+        Returns:
+            A dictionary with the following k/v pairs:
+                :diffs (list): section diffs that the build applies
+                :transferred (bool): whether the file was transferred
+                :responses: the return value of ``Config.build``, or
+                    ``None`` if nothing changed
+        """
+        text = self.write()
+        diffs = self.compare(text)
+        summary = dict(diffs=diffs, transferred=False, responses=None)
+
+        if not diffs:
+            return summary
+
+        file_copy = FileCopy(self.device, self.local_path,
+                             dst=self.filename, port=self.port)
+        if not file_copy.file_already_exists():
+            file_copy.transfer_file(hostname=hostname, username=username,
+                                    password=password)
+            summary['transferred'] = True
+
+        summary['responses'] = Config(
+            self.device, self.local_path).build(stage=stage)
+
+        return summary
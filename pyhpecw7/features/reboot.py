@@ -31,10 +31,18 @@ class Reboot(object):
             time (str): OPTIONAL - must be in HH:MM format
             date (str): OPTIONAL - must be in MM/DD/YYYY format
             delay (str): OPTIONAL - number representing delay in minutes
+            wait (bool): OPTIONAL - for an immediate reboot that isn't
+                staged, wait for the device to come back and reopen the
+                NETCONF session. See ``HPCOM7.wait_for_reboot``.
+            wait_timeout (int): OPTIONAL - seconds to wait for the device
+                to come back. Defaults to 900.
+            expected_os (str): OPTIONAL - OS version the device must
+                report once it is back
 
         Returns:
             True if stage=True and successfully staged
             etree.Element XML response if immediate execution
+            The new NETCONF connection if waiting for the reboot
         """
 
         reb2 = reboot.get('reboot')
@@ -55,6 +63,12 @@ class Reboot(object):
                 commands = ['reboot force']
                 # will exit/fail, NETCONF connection will not be closed
 
+        if reboot.get('wait') and not stage and commands == ['reboot force']:
+            self.device.reboot()
+            return self.device.wait_for_reboot(
+                timeout=reboot.get('wait_timeout') or 900,
+                expected_os=reboot.get('expected_os'))
+
         if stage:
             return self.device.stage_config(commands, 'cli_display')
         else:
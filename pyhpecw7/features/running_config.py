@@ -0,0 +1,95 @@
+"""Read the current running configuration of HPCOM7 devices.
+"""
+from pyhpecw7.utils.config_tree import parse_config
+
+
+class RunningConfig(object):
+    """This class keeps a parsed snapshot of the running configuration
+    so features can answer CLI configuration queries from memory
+    instead of issuing one ``display current-configuration`` per query.
+
+    The snapshot is fetched the first time it is used and fetched
+    again whenever the device's ``config_version`` has changed,
+    i.e. after any configuration has been pushed through the device.
+
+    Args:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+
+    Attributes:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+    """
+    def __init__(self, device):
+        self.device = device
+        self._tree = None
+        self._version = None
+
+    @property
+    def tree(self):
+        """The parsed running configuration as a
+        ``pyhpecw7.utils.config_tree.ConfigTree``.
+        """
+        if self._tree is None \
+                or self._version != getattr(self.device, 'config_version', None):
+            self.refresh()
+        return self._tree
+
+    def refresh(self):
+        """Fetch and parse the running configuration from the device.
+        """
+        self._version = getattr(self.device, 'config_version', None)
+        text = self.device.cli_display('display current-configuration')
+        self._tree = parse_config(text or '')
+
+    def invalidate(self):
+        """Drop the snapshot so it is fetched again on next use.
+        """
+        self._tree = None
+
+    def section(self, header):
+        """Get a top level configuration section.
+
+        Args:
+            header (str): section header, e.g. 'vlan 10'
+
+        Returns:
+            A ``ConfigLine`` for the section, else ``None``.
+        """
+        return self.tree.section(header)
+
+    def interface(self, name):
+        """Get the configuration section of an interface.
+
+        Args:
+            name (str): interface name, which may be abbreviated,
+                e.g. 'vlan100' or 'Tunnel 5'
+
+        Returns:
+            A ``ConfigLine`` for the interface section, else ``None``.
+        """
+        return self.tree.interface(name)
+
+    def interfaces(self, if_type=''):
+        """Get the configuration sections of all interfaces
+        whose full name starts with ``if_type``.
+
+        Args:
+            if_type (str): e.g. 'Bridge-Aggregation'
+
+        Returns:
+            A list of ``ConfigLine`` objects.
+        """
+        return self.tree.interfaces(if_type)
+
+    def find_global(self, prefix):
+        """Get global configuration commands.
+
+        Args:
+            prefix (str): start of the command,
+                e.g. 'mad exclude interface'
+
+        Returns:
+            A list of the matching commands as strings.
+        """
+        return [line.text for line in self.tree.find_global(prefix)]
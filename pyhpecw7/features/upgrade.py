@@ -0,0 +1,308 @@
+"""Upgrade the software of many HPCOM7 devices in waves.
+"""
+import json
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from pyhpecw7.features.file_copy import FileCopy
+from pyhpecw7.features.fleet_copy import FleetCopy
+from pyhpecw7.features.install_os import InstallOs
+from pyhpecw7.features.neighbor import Neighbors
+from pyhpecw7.features.errors import UpgradeHealthError
+from pyhpecw7.utils.xml.lib import *
+
+
+class Upgrade(object):
+    """This class is used to upgrade a fleet of ``HPCOM7`` devices.
+
+    Images are first copied to every device in parallel with
+    ``fleet_copy.FleetCopy``. Devices are then upgraded in waves:
+    every device in a wave has its startup image set with
+    ``install_os.InstallOs``, is rebooted, and must come back healthy
+    before the next wave starts. Two devices of the same redundancy
+    group, e.g. a VRRP pair, are never in the same wave, and the
+    upgrade stops at the first wave with a failed device.
+
+    Progress is saved to an optional checkpoint file after every step,
+    so a new ``Upgrade`` with the same checkpoint resumes where the
+    last one stopped: staged images aren't checked or copied again and
+    upgraded devices are skipped.
+
+    Note:
+        Every device must have its own connected ``HPCOM7`` object.
+        The same requirements as ``FileCopy`` apply.
+
+    Args:
+        devices (list): connected ``pyhpecw7.comware.HPCOM7`` objects.
+        ipe (str): REQUIRED unless ``boot`` and ``system`` are given
+            - Full path to the local IPE file.
+        boot (str): OPTIONAL - Full path to the local boot .bin file.
+        system (str): OPTIONAL - Full path to the local system .bin file.
+        expected_os (str): OPTIONAL - OS version every device must
+            report in ``facts['os']`` after its reboot.
+        groups (list): OPTIONAL - redundancy groups, each a list of
+            device hosts that must not be rebooted at the same time.
+        wave_size (int): OPTIONAL - maximum number of devices
+            rebooted at once. Defaults to 1.
+        checkpoint (str): OPTIONAL - path of the JSON checkpoint file.
+        workers (int): OPTIONAL - maximum number of devices
+            staged at once. Defaults to 8.
+        reboot_timeout (int): OPTIONAL - seconds to wait for a device
+            to come back after its reboot. Defaults to 900.
+        health_timeout (int): OPTIONAL - seconds to wait for a device
+            to be healthy after it is back. Defaults to 600.
+        copy_kwargs: OPTIONAL - passed to ``FleetCopy``,
+            e.g. ``port``, ``max_rate`` or ``dst``. ``dst`` is
+            only valid with ``ipe``.
+
+    Attributes:
+        devices (list): connected ``pyhpecw7.comware.HPCOM7`` objects.
+        results (dict): device host to a dictionary with the
+            following k/v pairs, updated and checkpointed as the
+            upgrade progresses:
+                :status (str): 'pending', 'staged', 'boot_set',
+                    'upgraded' or 'failed'
+                :baseline (dict): health before the reboot,
+                    see ``health``
+                :error (str): error message if failed, else ``None``
+
+    Raises:
+        ValueError: if ``dst`` is given with ``boot`` and ``system``.
+    """
+    def __init__(self, devices, ipe=None, boot=None, system=None,
+                 expected_os=None, groups=None, wave_size=1,
+                 checkpoint=None, workers=8, reboot_timeout=900,
+                 health_timeout=600, **copy_kwargs):
+        if copy_kwargs.get('dst') and not ipe:
+            raise ValueError('dst can only be used with an ipe image')
+
+        self.devices = devices
+        self.images = [ipe] if ipe else [boot, system]
+        self.os_type = 'ipe' if ipe else 'bootsys'
+        self.expected_os = expected_os
+        self.groups = groups or []
+        self.wave_size = max(1, wave_size)
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.reboot_timeout = reboot_timeout
+        self.health_timeout = health_timeout
+        self.copy_kwargs = copy_kwargs
+
+        self._lock = threading.Lock()
+        self.results = dict(
+            (device.host, dict(status='pending', baseline=None, error=None))
+            for device in devices)
+        self._load()
+
+    def _load(self):
+        if not self.checkpoint:
+            return
+
+        try:
+            with open(self.checkpoint) as checkpoint_file:
+                saved = json.load(checkpoint_file)
+        except (IOError, OSError, ValueError):
+            return
+
+        # only trust progress made with the same images
+        if saved.get('images') != self.images:
+            return
+
+        for host, result in saved.get('results', {}).items():
+            if host in self.results and result.get('status') != 'failed':
+                self.results[host].update(result)
+
+    def _save(self):
+        if not self.checkpoint:
+            return
+
+        tmp = self.checkpoint + '.tmp'
+        with open(tmp, 'w') as checkpoint_file:
+            json.dump(dict(images=self.images, results=self.results),
+                      checkpoint_file)
+        os.rename(tmp, self.checkpoint)
+
+    def _set(self, host, **result):
+        with self._lock:
+            self.results[host].update(result)
+            self._save()
+
+    def _map(self, func, devices):
+        pool = ThreadPool(max(1, min(self.workers, len(devices))))
+        try:
+            return pool.map(func, devices)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _remote_image(self, image):
+        return FileCopy.remote_path(image, self.copy_kwargs.get('dst'))
+
+    def stage(self):
+        """Copy the images to every device that isn't staged yet.
+
+        Returns:
+            ``results``, with each device's status set to 'staged',
+            or 'failed' with an error message.
+        """
+        pending = [device for device in self.devices
+                   if self.results[device.host]['status'] == 'pending']
+
+        for image in self.images:
+            if not pending:
+                break
+
+            copy_results = FleetCopy(pending, image, workers=self.workers,
+                                     **self.copy_kwargs).transfer()
+            for device in pending:
+                copy_result = copy_results[device.host]
+                if copy_result['status'] not in ('done', 'skipped'):
+                    self._set(device.host, status='failed',
+                              error=copy_result['error']
+                              or copy_result['status'])
+
+            pending = [device for device in pending
+                       if self.results[device.host]['status'] == 'pending']
+
+        for device in pending:
+            self._set(device.host, status='staged')
+
+        return self.results
+
+    def waves(self):
+        """Split the devices into reboot waves.
+
+        Devices are placed in order into the first wave that has room
+        and no device of the same redundancy group. Devices that
+        failed are left out.
+
+        Returns:
+            A list of waves, each a list of ``HPCOM7`` objects.
+        """
+        group_of = {}
+        for index, group in enumerate(self.groups):
+            for host in group:
+                group_of[host] = index
+
+        waves = []
+        for device in self.devices:
+            if self.results[device.host]['status'] == 'failed':
+                continue
+
+            group = group_of.get(device.host)
+            for wave in waves:
+                if len(wave) < self.wave_size and (
+                        group is None or group not in
+                        [group_of.get(other.host) for other in wave]):
+                    wave.append(device)
+                    break
+            else:
+                waves.append([device])
+
+        return waves
+
+    def health(self, device):
+        """Get the health of a device.
+
+        Returns:
+            A dictionary with the following k/v pairs:
+                :os (str): the OS version from ``facts``
+                :neighbors (int): number of LLDP neighbors
+                :interfaces_up (int): number of interfaces
+                    that are operationally up
+        """
+        E = data_element_maker()
+        top = E.top(
+            E.Ifmgr(
+                E.Interfaces(
+                    E.Interface(
+                        E.OperStatus()
+                    )
+                )
+            )
+        )
+
+        nc_get_reply = device.get(('subtree', top))
+        interfaces_up = len([
+            status for status in findall_in_data(
+                'OperStatus', nc_get_reply.data_ele)
+            if status.text == '1'])
+
+        return dict(os=(device.facts or {}).get('os'),
+                    neighbors=len(Neighbors(device).lldp),
+                    interfaces_up=interfaces_up)
+
+    def _wait_healthy(self, device, baseline):
+        """Wait until the device is at least as healthy as before
+        its reboot.
+
+        Raises:
+            UpgradeHealthError: if it isn't within ``health_timeout``.
+        """
+        deadline = time.time() + self.health_timeout
+        while True:
+            health = self.health(device)
+            if health['neighbors'] >= baseline['neighbors']\
+                    and health['interfaces_up'] >= baseline['interfaces_up']:
+                return
+
+            if time.time() >= deadline:
+                raise UpgradeHealthError(baseline, health)
+            time.sleep(10)
+
+    def _upgrade(self, device):
+        """Set the startup image of one device, reboot it and wait
+        until it is healthy.
+        """
+        host = device.host
+        try:
+            result = self.results[host]
+            if result['status'] == 'staged':
+                baseline = self.health(device)
+                images = [self._remote_image(image) for image in self.images]
+                if self.os_type == 'ipe':
+                    InstallOs(device).build('ipe', ipe=images[0])
+                else:
+                    InstallOs(device).build('bootsys', boot=images[0],
+                                            system=images[1])
+                self._set(host, status='boot_set', baseline=baseline)
+
+            # a device that already runs the new OS was rebooted
+            # before the last run stopped
+            rebooted = self.expected_os is not None\
+                and device.connected\
+                and (device.facts or {}).get('os') == self.expected_os
+            if not rebooted:
+                device.reboot(wait=True, timeout=self.reboot_timeout,
+                              expected_os=self.expected_os)
+
+            self._wait_healthy(device, result['baseline'])
+            self._set(host, status='upgraded')
+        except Exception as e:
+            self._set(host, status='failed', error=str(e))
+
+    def run(self):
+        """Stage the images, then upgrade the devices wave by wave.
+
+        Devices that fail staging are not upgraded, the others are.
+
+        Returns:
+            ``results``. Devices of waves after a failed wave keep
+            their 'staged' status.
+        """
+        self.stage()
+
+        for wave in self.waves():
+            todo = [device for device in wave
+                    if self.results[device.host]['status']
+                    in ('staged', 'boot_set')]
+            if todo:
+                self._map(self._upgrade, todo)
+
+            if any(self.results[device.host]['status'] == 'failed'
+                   for device in wave):
+                break
+
+        return self.results
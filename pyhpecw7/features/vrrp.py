@@ -3,6 +3,53 @@
 from pyhpecw7.utils.templates import cli
 
 
+def _parse_auth(command):
+    """Returns the auth settings of a
+    'vrrp vrid N authentication-mode ...' command as a dictionary,
+    else an empty dictionary.
+    """
+    auth_vars = command.split('authentication-mode')[-1].split()
+    if len(auth_vars) == 3:
+        return dict(auth_mode=auth_vars[0], key_type=auth_vars[1],
+                    key=auth_vars[2])
+    return {}
+
+
+def _build_commands(vrid, **kvargs):
+    """Returns the commands, without the interface context, to
+    configure a VRRP group. See ``VRRP.build`` for the Keyword Args.
+    """
+    commands = []
+
+    CMDS = {
+        'priority': 'vrrp vrid {0} priority {1}',
+        'preempt': 'vrrp vrid {0} preempt-mode',
+        'vip': 'vrrp vrid {0} virtual-ip {1}',
+        'auth': 'vrrp vrid {0} authentication-mode {1} {2} {3}',
+    }
+
+    vip = kvargs.get('vip')
+    prio = kvargs.get('priority')
+    preempt = kvargs.get('preempt')
+    auth_mode = kvargs.get('auth_mode')
+    key_type = kvargs.get('key_type')
+    key = kvargs.get('key')
+
+    if vip:
+        commands.append((CMDS.get('vip')).format(vrid, vip))
+    if prio:
+        commands.append((CMDS.get('priority')).format(vrid, prio))
+    if preempt == 'yes':
+        commands.append(CMDS.get('preempt').format(vrid))
+    elif preempt == 'no':
+        commands.append('undo ' + CMDS.get('preempt').format(vrid))
+    if auth_mode:
+        commands.append((CMDS.get('auth')).format(vrid, auth_mode,
+                                                  key_type, key))
+
+    return commands
+
+
 class VRRP(object):
     """This class is used to collect data or configure a VRRP group on a
         given interface.
@@ -65,21 +112,13 @@ class VRRP(object):
 
         """
         auth = {}
-        commands = 'display current-configuration interface' \
-                   + ' {0} | inc "vrid {1} auth"'.format(self.interface,
-                                                         self.vrid)
-        rsp = self.device.cli_display(commands)
-        by_line = rsp.split('\n')
-        for each in by_line[1:]:
-            if 'authentication-mode' in each:
-                auth = each.split('authentication-mode')[-1].strip()
-                auth_vars = auth.split(' ')
-                if len(auth_vars) == 3:
-                    auth_mode = auth_vars[0]
-                    key_type = auth_vars[1]
-                    key = auth_vars[2]
-                    auth = dict(auth_mode=auth_mode, key_type=key_type,
-                                key=key)
+        section = self.device.running_config.interface(self.interface)
+        if section is None:
+            return auth
+
+        for each in section.find_all('vrrp vrid {0} authentication-mode'.format(
+                self.vrid)):
+            auth = _parse_auth(each.text) or auth
         return auth
 
     def _apply_value_maps(self, existing):
@@ -151,6 +190,98 @@ class VRRP(object):
         else:
             return self.device.cli_config(commands)
 
+    @staticmethod
+    def build_many(device, groups, max_commands=None, stage=False):
+        """Stage or execute commands for many VRRP groups
+
+        Groups are grouped by interface, so every interface is entered
+        once, and all commands are sent with one ``cli_config``, or
+        one per chunk of at most ``max_commands`` commands.  An
+        interface whose commands span two chunks is entered again at
+        the start of the next chunk.
+
+        Args:
+            device (HPCOM7): connected instance of a
+                ``pyhpecw7.comware.HPCOM7`` object.
+            groups (list): list of dicts, one per VRRP group.
+                See Keyword Args for the keys of each dict.
+            max_commands (int): OPTIONAL - maximum number of commands,
+                including interface commands, per ``cli_config``.
+                Defaults to sending every command at once.
+            stage (bool): whether to stage the commands or execute
+                immediately
+
+        Keyword Args:
+            interface (str): REQUIRED - name of the Layer 3 interface
+            vrid (str): REQUIRED - virtual router ID (group number)
+            state (str): OPTIONAL - "present", "absent", "shutdown"
+                or "undoshutdown". Defaults to "present".
+            kvargs: OPTIONAL - see ``build`` when ``state``
+                is "present"
+
+        Returns:
+            A list with one of the following per chunk:
+                True if stage=True and successfully staged
+                CLI response string if immediate execution
+            ``None`` if there are no commands to send
+        """
+        interfaces = []
+        commands_by_interface = {}
+        for params in groups:
+            params = dict(params)
+            interface = params.pop('interface')
+            vrid = params.pop('vrid')
+            state = params.pop('state', 'present')
+
+            if state == 'absent':
+                commands = ['undo vrrp vrid {0}'.format(vrid)]
+            elif state == 'shutdown':
+                commands = ['vrrp vrid {0} shutdown'.format(vrid)]
+            elif state == 'undoshutdown':
+                commands = ['undo vrrp vrid {0} shutdown'.format(vrid)]
+            else:
+                commands = _build_commands(vrid, **params)
+
+            if not commands:
+                continue
+
+            key = interface.lower()
+            if key not in commands_by_interface:
+                interfaces.append(interface)
+                commands_by_interface[key] = []
+            commands_by_interface[key].extend(commands)
+
+        if not interfaces:
+            return None
+
+        # room for an interface command and at least one command
+        limit = max(2, max_commands) if max_commands else None
+
+        chunks = []
+        chunk = []
+        for interface in interfaces:
+            in_context = False
+            for command in commands_by_interface[interface.lower()]:
+                if limit and len(chunk) + (1 if in_context else 2) > limit:
+                    chunks.append(chunk)
+                    chunk = []
+                    in_context = False
+                if not in_context:
+                    chunk.append('interface {0}'.format(interface))
+                    in_context = True
+                chunk.append(command)
+        chunks.append(chunk)
+
+        responses = []
+        for chunk in chunks:
+            chunk.append('\n')
+            if stage:
+                responses.append(device.stage_config(chunk, 'cli_config'))
+            else:
+                responses.append(device.cli_config(chunk))
+
+        return responses
+
     def get_config(self):
         """Get the config of a given vrid on a given interface
 
@@ -202,33 +333,7 @@ class VRRP(object):
             True if stage=True and successfully staged
             CLI response if immediate execution
         """
-        commands = []
-
-        CMDS = {
-            'priority': 'vrrp vrid {0} priority {1}',
-            'preempt': 'vrrp vrid {0} preempt-mode',
-            'vip': 'vrrp vrid {0} virtual-ip {1}',
-            'auth': 'vrrp vrid {0} authentication-mode {1} {2} {3}',
-        }
-
-        vip = kvargs.get('vip')
-        prio = kvargs.get('priority')
-        preempt = kvargs.get('preempt')
-        auth_mode = kvargs.get('auth_mode')
-        key_type = kvargs.get('key_type')
-        key = kvargs.get('key')
-
-        if vip:
-            commands.append((CMDS.get('vip')).format(self.vrid, vip))
-        if prio:
-            commands.append((CMDS.get('priority')).format(self.vrid, prio))
-        if preempt == 'yes':
-            commands.append(CMDS.get('preempt').format(self.vrid))
-        elif preempt == 'no':
-            commands.append('undo ' + CMDS.get('preempt').format(self.vrid))
-        if auth_mode:
-            commands.append((CMDS.get('auth')).format(self.vrid, auth_mode,
-                                                      key_type, key))
+        commands = _build_commands(self.vrid, **kvargs)
 
         if commands:
             commands.insert(0, self.intf_command)
@@ -237,3 +342,64 @@ class VRRP(object):
                 return self.device.stage_config(commands, 'cli_config')
             else:
                 return self.device.cli_config(commands)
+
+
+class VRRPInventory(object):
+    """This class is used to get the config of every VRRP group on
+    every interface in a single pass.
+
+    ``VRRP.get_config`` runs two CLI commands for every group.  This
+    class runs ``display vrrp verbose`` once, and joins the auth
+    settings of each group from the device's running configuration
+    snapshot, i.e. one config dump, through an index keyed by
+    (interface, vrid).
+
+    Args:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+
+    Attributes:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+
+    """
+    def __init__(self, device):
+        self.device = device
+
+    def _get_auth_index(self):
+        """Returns a dictionary of (interface, vrid) to the auth
+        settings of every VRRP group with authentication configured.
+        """
+        index = {}
+        for section in self.device.running_config.interfaces():
+            interface = section.text.split()[1]
+            for each in section.find_all('vrrp vrid '):
+                words = each.text.split()
+                if len(words) > 3 and words[3] == 'authentication-mode':
+                    auth = _parse_auth(each.text)
+                    if auth:
+                        index[(interface, words[2])] = auth
+        return index
+
+    def get_config(self):
+        """Get the config of every VRRP group
+
+        Returns:
+            This returns a dictionary keyed by interface name, as the
+            device reports it, e.g. 'Vlan-interface100'.  Each value is
+            a dictionary keyed by VRID, and its values are dictionaries
+            with the same k/v pairs as ``VRRP.get_config``.
+
+        """
+        rsp = self.device.cli_display('display vrrp verbose')
+        auth_index = self._get_auth_index()
+
+        groups = {}
+        for each in cli.get_structured_data('vrrp_verbose.tmpl', rsp or ''):
+            interface = each.pop('interface')
+            if each.get('preempt'):
+                each['preempt'] = each.get('preempt').lower()
+            each.update(auth_index.get((interface, each.get('vrid')), {}))
+            groups.setdefault(interface, {})[each.get('vrid')] = each
+
+        return groups
@@ -4,6 +4,7 @@ from lxml import etree
 from pyhpecw7.utils.xml.lib import *
 from pyhpecw7.utils.templates import cli
 from pyhpecw7.features.interface import Interface
+from pyhpecw7.features.errors import InterfaceAbsentError
 
 
 class Tunnel(object):
@@ -44,17 +45,15 @@ class Tunnel(object):
 
         """
         existing = {}
-        config = self.device.cli_display(
-            'display current-configuration interface Tunnel {0}'.format(
-                self.tunnel))
+        section = self.device.running_config.interface(
+            'Tunnel{0}'.format(self.tunnel))
+        if section is None:
+            return existing
 
-        parsed = cli.get_structured_data('tunnel.tmpl', config)
+        parsed = cli.get_structured_data('tunnel.tmpl', section.to_text())
 
-        if not parsed:
-            existing = {}  # i.e, does not exist
-        else:
-            if len(parsed) == 1:  # which it should!
-                existing = parsed[0]
+        if len(parsed) == 1:  # which it should!
+            existing = parsed[0]
 
         return existing
 
@@ -65,16 +64,9 @@ class Tunnel(object):
             String that is the global source IP address on the switch
         """
         address = None
-        config = self.device.cli_display(
-            'display current-configuration | inc "tunnel global source"')
-        config_list = config.split('\n')
-        if len(config_list) == 2:
-            return None
-        else:
-            for each in config_list:
-                if 'tunnel global' in each:
-                    address = each.split(
-                        'tunnel global source-address')[-1].strip()
+        find = 'tunnel global source-address'
+        for each in self.device.running_config.find_global(find):
+            address = each.split(find)[-1].strip()
         return address
 
     def build(self, stage=False, **kvargs):
@@ -101,6 +93,72 @@ class Tunnel(object):
         """
         return self._build_config(state='absent', stage=stage)
 
+    @staticmethod
+    def build_many(device, tunnels, global_src=None, stage=False):
+        """Stage or execute one CLI command batch for many tunnels
+
+        The desired tunnels are compared with a single
+        ``TunnelInventory`` read, and only commands for tunnels that
+        need to be created, updated or removed are sent.
+
+        Args:
+            device (HPCOM7): connected instance of a
+                ``pyhpecw7.comware.HPCOM7`` object.
+            tunnels (list): list of dicts, one per tunnel.
+                See Keyword Args for the keys of each dict.
+            global_src (str): OPTIONAL - global src IP addr for tunnels
+            stage (bool): whether to stage the commands or execute
+                immediately
+
+        Keyword Args:
+            tunnel (str): REQUIRED - Tunnel ID
+            state (str): OPTIONAL - "present" or "absent".
+                Defaults to "present".
+            src (str): OPTIONAL - source IP addr of tunnel
+            dest (str): OPTIONAL - destination IP addr of tunnel
+
+        Returns:
+            True if stage=True and successfully staged
+            CLI response strings if immediate execution
+            ``None`` if nothing needs to change
+        """
+        existing = TunnelInventory(device).get_config()
+
+        commands = []
+        if global_src and global_src != Tunnel(device, None).get_global_source():
+            commands.append('tunnel global source-address {0}'.format(global_src))
+
+        # removals are system view commands, so send them before
+        # entering any interface view
+        for params in tunnels:
+            tunnel = str(params['tunnel'])
+            if params.get('state') == 'absent' and tunnel in existing:
+                commands.append('undo interface tunnel {0}'.format(tunnel))
+
+        for params in tunnels:
+            tunnel = str(params['tunnel'])
+            if params.get('state', 'present') != 'present':
+                continue
+
+            current = existing.get(tunnel)
+            changes = []
+            for key, command in (('src', 'source'), ('dest', 'destination')):
+                if params.get(key) and (current is None
+                                        or current.get(key) != params[key]):
+                    changes.append('{0} {1}'.format(command, params[key]))
+
+            if changes or current is None:
+                commands.append('interface tunnel {0} mode vxlan'.format(tunnel))
+                commands.extend(changes)
+
+        if not commands:
+            return None
+
+        if stage:
+            return device.stage_config(commands, 'cli_config')
+        else:
+            return device.cli_config(commands)
+
     def _build_config(self, state, stage=False, **kvargs):
         """Build CLI commands to configure/create VXLAN tunnel interfaces
 
@@ -143,6 +201,57 @@ class Tunnel(object):
                 self.device.cli_config(commands)
 
 
+class TunnelInventory(object):
+    """This class is used to get the configuration of every tunnel
+    interface on the switch in a single pass.
+
+    ``Tunnel.get_config`` parses one tunnel at a time.  This class
+    reads every ``interface Tunnel`` section from the device's
+    running configuration snapshot, i.e. one config dump, and parses
+    them in one pass.
+
+    Args:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+
+    Attributes:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+
+    """
+    def __init__(self, device):
+        self.device = device
+
+    def get_config(self):
+        """Get running config for every tunnel interface
+
+        Returns:
+            This returns a dictionary keyed by tunnel ID.  Each value is
+            a dictionary with the same k/v pairs as ``Tunnel.get_config``:
+                src (str): source IP addr of tunnel
+                dest (str): destination IP addr of tunnel
+                mode (str): mode of tunnel
+
+            Values that aren't configured are empty strings.
+
+        """
+        tunnels = {}
+        for section in self.device.running_config.interfaces('Tunnel'):
+            words = section.text.split()
+            tunnel = words[1][len('Tunnel'):]
+            mode = words[3] if len(words) > 3 and words[2] == 'mode' else ''
+
+            existing = dict(mode=mode, src='', dest='')
+            for key, find in (('src', 'source '), ('dest', 'destination ')):
+                line = section.find(find)
+                if line is not None:
+                    existing[key] = line.text.split(find)[-1].strip()
+
+            tunnels[tunnel] = existing
+
+        return tunnels
+
+
 class Vxlan(object):
     """This class is used to get data and configure VXLAN/VSI mappings.
 
@@ -159,26 +268,28 @@ class Vxlan(object):
         vsi (str): name of the VSI
 
     """
+    # mapping of dictionary keys to XML tags
+    VSI = {
+        'vsi': 'VsiName',
+        'descr': 'Description',
+    }
+
+    # mapping of dictionary keys to XML tags
+    VXLAN = {
+        'vxlan': 'VxlanID',
+        'vsi': 'VsiName',
+    }
+    # mapping of dictionary keys to XML tags
+    TUNNELS = {
+        'tunnel': 'TunnelID',
+        'vxlan': 'VxlanID'
+    }
+
     def __init__(self, device, vxlan, vsi=None):
 
         self.device = device
         self.vxlan = vxlan
         self.vsi = vsi
-        self.VSI = {
-            'vsi': 'VsiName',
-            'descr': 'Description',
-        }
-
-        # mapping of dictionary keys to XML tags
-        self.VXLAN = {
-            'vxlan': 'VxlanID',
-            'vsi': 'VsiName',
-        }
-        # mapping of dictionary keys to XML tags
-        self.TUNNELS = {
-            'tunnel': 'TunnelID',
-            'vxlan': 'VxlanID'
-        }
 
     def get_config(self):
         """Get associated VSI for a given VXLAN ID along with configured
@@ -339,6 +450,90 @@ class Vxlan(object):
         else:
             return [rmv, add]
 
+    @staticmethod
+    def build_many(device, vxlans, stage=False):
+        """Stage or execute one config object for many VXLAN/VSI mappings
+
+        The desired mappings are compared with a single
+        ``VxlanInventory`` read, and only missing VSIs, missing or
+        changed VXLANs and tunnel changes are sent, as one edit-config
+        covering every VXLAN.  Tunnels to remove carry their own
+        delete operation inside the same document.
+
+        Args:
+            device (HPCOM7): connected instance of a
+                ``pyhpecw7.comware.HPCOM7`` object.
+            vxlans (list): list of dicts, one per VXLAN.
+                See Keyword Args for the keys of each dict.
+            stage (bool): whether to stage the commands or execute
+                immediately
+
+        Keyword Args:
+            vxlan (str): REQUIRED - VXLAN ID
+            vsi (str): REQUIRED - name of the VSI
+            tunnels (list): OPTIONAL - complete list of desired tunnel
+                IDs.  Current tunnels not in the list are removed.
+                Leave out to keep the current tunnels.
+
+        Returns:
+            True if stage=True and successfully staged
+            etree.Element XML response if immediate execution
+            ``None`` if nothing needs to change
+        """
+        inventory = VxlanInventory(device)
+        existing = inventory.get_config()
+
+        E = config_element_maker()
+        EC = nc_element_maker()
+
+        vsi_eles = []
+        vxlan_eles = []
+        tunnel_eles = []
+        new_vsis = set()
+        for params in vxlans:
+            vxlan = str(params['vxlan'])
+            vsi = params['vsi']
+            current = existing.get(vxlan, {})
+
+            if vsi not in inventory.vsis and vsi not in new_vsis:
+                new_vsis.add(vsi)
+                vsi_eles.append(E.VSI(E.VsiName(vsi)))
+
+            if current.get('vsi') != vsi:
+                vxlan_eles.append(E.Vxlan(E.VxlanID(vxlan), E.VsiName(vsi)))
+
+            if params.get('tunnels') is not None:
+                current_tunnels = set(current.get('tunnels', []))
+                desired_tunnels = set(str(t) for t in params['tunnels'])
+                for tunnel in sorted(desired_tunnels - current_tunnels, key=int):
+                    tunnel_eles.append(
+                        E.Tunnel(E.TunnelID(tunnel), E.VxlanID(vxlan)))
+                for tunnel in sorted(current_tunnels - desired_tunnels, key=int):
+                    tunnel_eles.append(
+                        E.Tunnel(E.TunnelID(tunnel), E.VxlanID(vxlan),
+                                 **operation_kwarg('delete')))
+
+        if not (vsi_eles or vxlan_eles or tunnel_eles):
+            return None
+
+        top = E.top(**operation_kwarg('merge'))
+        if vsi_eles:
+            top.append(E.L2VPN(E.VSIs(*vsi_eles)))
+        if vxlan_eles or tunnel_eles:
+            vxlan_ele = E.VXLAN()
+            if vxlan_eles:
+                vxlan_ele.append(E.VXLANs(*vxlan_eles))
+            if tunnel_eles:
+                vxlan_ele.append(E.Tunnels(*tunnel_eles))
+            top.append(vxlan_ele)
+
+        config = EC.config(top)
+
+        if stage:
+            return device.stage_config(config, 'edit_config')
+        else:
+            return device.edit_config(config)
+
     def create(self, stage=False):
         """Stage or execute a config for creating a VSI
 
@@ -449,6 +644,54 @@ class L2EthService(object):
         vsi (str): name of the VSI being mapped to the instance
 
     """
+    # the next few attributes map dictionary keys to XML tags
+    # and maps XML values to more user friendly values
+    AC_KEY_MAP = {
+        'vsi': 'VsiName',
+        'index': 'IfIndex',
+        'instance': 'SrvID',
+        'access_mode': 'AccessMode',
+    }
+    AC_VALUE_MAP = {
+        'AccessMode': {
+            '1': 'vlan',
+            '2': 'ethernet'
+        }
+    }
+    RV_KEY_MAP = {
+        'index': 'IfIndex',
+        'instance': 'SrvID',
+        'encap': 'Encap',
+        'vlanid': 'SVlanRange',
+        'cvid': 'CVlanRange'
+    }
+    RV_VALUE_MAP = {
+        'Encap': {
+            '1': 'default',
+            '2': 'untagged',
+            '3': 'tagged',
+            '4': 's-vid',
+            '5': 'only-tagged',
+            '6': 'SvlanIdCvlanId',
+            '7': 'CvlanId',
+            '8': 'CvlanList',
+            '9': 'SvlanIdCvlanList',
+            '10': 'SvlanIdCvlanAll',
+            '11': 'SvlanList',
+            '12': 'SvlanListOnlyTagged',
+        }
+    }
+
+    """
+    supported value definition when using Ansible
+    encapsulation default - 1
+    encapsulation s-vid VLAN_ID - 4, but adds SVlanRange key as VLAN_ID
+    encapsulation s-vid VLAN_ID only-tagged - 5,
+             but adds SVlanRange key as VLAN_ID
+    encapsulation tagged - 3
+    encapsulation untagged - 2
+    """
+
     def __init__(self, device, interface, instance, vsi):
 
         self.device = device
@@ -456,54 +699,6 @@ class L2EthService(object):
         self.vsi = vsi
         self.instance = instance
 
-        # the next few attributes map dictionary keys to XML tags
-        # and maps XML values to more user friendly values
-        self.AC_KEY_MAP = {
-            'vsi': 'VsiName',
-            'index': 'IfIndex',
-            'instance': 'SrvID',
-            'access_mode': 'AccessMode',
-        }
-        self.AC_VALUE_MAP = {
-            'AccessMode': {
-                '1': 'vlan',
-                '2': 'ethernet'
-            }
-        }
-        self.RV_KEY_MAP = {
-            'index': 'IfIndex',
-            'instance': 'SrvID',
-            'encap': 'Encap',
-            'vlanid': 'SVlanRange',
-            'cvid': 'CVlanRange'
-        }
-        self.RV_VALUE_MAP = {
-            'Encap': {
-                '1': 'default',
-                '2': 'untagged',
-                '3': 'tagged',
-                '4': 's-vid',
-                '5': 'only-tagged',
-                '6': 'SvlanIdCvlanId',
-                '7': 'CvlanId',
-                '8': 'CvlanList',
-                '9': 'SvlanIdCvlanList',
-                '10': 'SvlanIdCvlanAll',
-                '11': 'SvlanList',
-                '12': 'SvlanListOnlyTagged',
-            }
-        }
-
-        """
-        supported value definition when using Ansible
-        encapsulation default - 1
-        encapsulation s-vid VLAN_ID - 4, but adds SVlanRange key as VLAN_ID
-        encapsulation s-vid VLAN_ID only-tagged - 5,
-                 but adds SVlanRange key as VLAN_ID
-        encapsulation tagged - 3
-        encapsulation untagged - 2
-        """
-
     def get_config(self):
         """Get config of a service instance on a given interface for a
             given VSI
@@ -646,26 +841,7 @@ class L2EthService(object):
 
         encap_eles = []
         if operation == 'merge':
-
-            REVERSE_RV_KEY_MAP = dict(reversed(
-                item) for item in self.RV_KEY_MAP.iteritems())
-
-            REVERSE_RV_VALUE_MAP = reverse_value_map(
-                REVERSE_RV_KEY_MAP, self.RV_VALUE_MAP)
-
-            encap = kvargs.get('encap')
-            vlanid = kvargs.get('vlanid')
-            if encap:
-                if encap in ['default', 'tagged', 'untagged']:
-                    value = REVERSE_RV_VALUE_MAP.get('encap').get(
-                        kvargs.get('encap'))
-                    encap_eles.append(EC.Encap(value))
-                elif encap in ['s-vid', 'only-tagged']:
-                    encap_eles.append(EC.SVlanRange(vlanid))
-                    if encap == 's-vid':
-                        encap_eles.append(EC.Encap('4'))
-                    elif encap == 'only-tagged':
-                        encap_eles.append(EC.Encap('5'))
+            encap_eles = self._encap_eles(EC, **kvargs)
 
         self.jindex = self._index_from_interface(self.interface) # minor hack for now
 
@@ -689,6 +865,38 @@ class L2EthService(object):
         else:
             self.device.edit_config(config)
 
+    @classmethod
+    def _encap_eles(cls, EC, **kvargs):
+        """Returns the encap elements of an SRV (service instance)
+
+        Keyword Args:
+            encap (str): 'default', 'tagged', 'untagged', 'only-tagged',
+                's-vid'
+            vlanid (str): REQUIRED if encap is set to only-tagged or s-vid
+        """
+        REVERSE_RV_KEY_MAP = dict(reversed(
+            item) for item in cls.RV_KEY_MAP.iteritems())
+
+        REVERSE_RV_VALUE_MAP = reverse_value_map(
+            REVERSE_RV_KEY_MAP, cls.RV_VALUE_MAP)
+
+        encap_eles = []
+        encap = kvargs.get('encap')
+        vlanid = kvargs.get('vlanid')
+        if encap:
+            if encap in ['default', 'tagged', 'untagged']:
+                value = REVERSE_RV_VALUE_MAP.get('encap').get(
+                    kvargs.get('encap'))
+                encap_eles.append(EC.Encap(value))
+            elif encap in ['s-vid', 'only-tagged']:
+                encap_eles.append(EC.SVlanRange(vlanid))
+                if encap == 's-vid':
+                    encap_eles.append(EC.Encap('4'))
+                elif encap == 'only-tagged':
+                    encap_eles.append(EC.Encap('5'))
+
+        return encap_eles
+
     def remove(self, stage=False):
         """Stage or execute object to remove service instance configuration
 
@@ -716,6 +924,132 @@ class L2EthService(object):
         """
         return self._build_config(state='present', stage=stage, **kvargs)
 
+    @staticmethod
+    def build_many(device, services, stage=False):
+        """Stage or execute one config object for many service instances
+
+        Interface indexes and the current service instances come from
+        a single ``VxlanInventory`` read, and the encaps and xconnects
+        of every service instance that needs to change are sent as one
+        edit-config.  Service instances to remove carry their own
+        delete operation inside the same document.
+
+        Args:
+            device (HPCOM7): connected instance of a
+                ``pyhpecw7.comware.HPCOM7`` object.
+            services (list): list of dicts, one per service instance.
+                See Keyword Args for the keys of each dict.
+            stage (bool): whether to stage the commands or execute
+                immediately
+
+        Keyword Args:
+            interface (str): REQUIRED - name of a Layer 2 interface
+            instance (str): REQUIRED - service instance ID
+            state (str): OPTIONAL - "present" or "absent".
+                Defaults to "present".
+            vsi (str): REQUIRED if present - name of VSI
+            encap (str): REQUIRED if present - ['default', 'untagged',
+                'tagged', 's-vid', 'only-tagged']
+            vlanid (str): REQUIRED when ``encap`` set to
+               "only-tagged" or "s-vid"
+            access_mode (str): OPTIONAL - "vlan" or "ethernet".
+                Defaults to "vlan".
+
+        Raises:
+            InterfaceAbsentError: if an interface does not exist.
+            ValueError: if ``access_mode`` isn't "vlan" or "ethernet".
+
+        Returns:
+            True if stage=True and successfully staged
+            etree.Element XML response if immediate execution
+            ``None`` if nothing needs to change
+        """
+        inventory = VxlanInventory(device)
+        inventory.get_config()
+
+        index_by_name = dict(
+            (name.lower(), index) for index, name in inventory.iface_map.items())
+        existing = dict(
+            ((srv['index'], srv.get('instance')), srv)
+            for srvs in inventory.services.values() for srv in srvs)
+
+        def _index(interface):
+            index = index_by_name.get(interface.lower())
+            if not index:
+                # abbreviated names, e.g. 'fo1/0/2'
+                index = Interface(device, interface).iface_index
+                if not index:
+                    raise InterfaceAbsentError(interface)
+                index_by_name[interface.lower()] = index
+            return index
+
+        E = config_element_maker()
+        EC = nc_element_maker()
+
+        MAP = {
+            'vlan': '1',
+            'ethernet': '2'
+        }
+
+        srv_eles = []
+        ac_eles = []
+        for params in services:
+            index = _index(params['interface'])
+            instance = str(params['instance'])
+            current = existing.get((index, instance))
+
+            if params.get('state') == 'absent':
+                if current is not None:
+                    srv_eles.append(E.SRV(E.SrvID(instance), E.IfIndex(index),
+                                          **operation_kwarg('delete')))
+                continue
+
+            encap = params.get('encap')
+            vlanid = params.get('vlanid')
+            # the device only reports a VLAN ID for these encaps
+            if encap in ['s-vid', 'only-tagged'] and vlanid is not None:
+                vlanid = str(vlanid)
+            else:
+                vlanid = None
+            access_mode = params.get('access_mode') or 'vlan'
+            if access_mode not in MAP:
+                raise ValueError('access_mode must be "vlan" or "ethernet", '
+                                 'not {0!r}'.format(access_mode))
+
+            if current is not None\
+                    and current.get('encap') == encap\
+                    and current.get('vlanid') == vlanid\
+                    and current.get('vsi') == params.get('vsi')\
+                    and current.get('access_mode') == access_mode:
+                continue
+
+            srv_eles.append(E.SRV(E.SrvID(instance), E.IfIndex(index),
+                                  *L2EthService._encap_eles(
+                                      E, encap=encap, vlanid=vlanid)))
+            ac_eles.append(E.AC(E.SrvID(instance), E.IfIndex(index),
+                                E.VsiName(params.get('vsi')),
+                                E.AccessMode(MAP.get(access_mode))))
+
+        if not srv_eles:
+            return None
+
+        # xconnects need to come AFTER their encaps
+        l2vpn = E.L2VPN(E.SRVs(*srv_eles))
+        if ac_eles:
+            l2vpn.append(E.ACs(*ac_eles))
+
+        config = EC.config(
+            E.top(
+                l2vpn,
+                **operation_kwarg('merge')
+            )
+        )
+
+        if stage:
+            return device.stage_config(config, 'edit_config')
+        else:
+            return device.edit_config(config)
+
     def _build_config(self, state, stage=False, **kvargs):
         """Stage or execute service instance (and xconn) config object for an interface
 
@@ -805,3 +1139,166 @@ class L2EthService(object):
             interface_name = find_in_data('Name', nc_get_reply.data_ele).text
 
         return interface_name
+
+
+class VxlanInventory(object):
+    """This class is used to collect every VXLAN, VSI, tunnel and
+    Ethernet service instance on the switch in a single pass.
+
+    ``Vxlan.get_config`` and ``L2EthService.get_config`` need several
+    NETCONF round trips per VXLAN or service instance.  This class
+    fetches ``VXLAN/VXLANs``, ``VXLAN/Tunnels``, ``L2VPN/VSIs``, the
+    ``L2VPN`` service instance and AC tables and the interface name
+    table in one get, and indexes them.
+
+    Args:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+
+    Attributes:
+        device (HPCOM7): connected instance of a ``pyhpecw7.comware.HPCOM7``
+            object.
+        iface_map (dict): IfIndex (str) to interface name for every
+            interface on the switch.  Populated by ``get_config``.
+        vsis (dict): VSI name to a dictionary with ``vsi`` and
+            ``descr`` keys for every VSI, mapped to a VXLAN or not.
+            Populated by ``get_config``.
+        tunnel_vxlans (dict): tunnel ID to a list of the VXLAN IDs
+            mapped to it.  Populated by ``get_config``.
+        services (dict): interface name to a list of dictionaries,
+            one per service instance on the interface, with the same
+            k/v pairs as ``L2EthService.get_config``.  Populated by
+            ``get_config``.
+
+    """
+    def __init__(self, device):
+        self.device = device
+        self.iface_map = {}
+        self.vsis = {}
+        self.tunnel_vxlans = {}
+        self.services = {}
+
+    def _get_data(self):
+        """Get every VXLAN, tunnel mapping, VSI, service instance, AC
+        and the IfIndex to interface name table in a single get.
+        """
+        E = data_element_maker()
+        top = E.top(
+            E.VXLAN(
+                E.VXLANs(
+                    E.Vxlan(
+                        E.VxlanID(),
+                        E.VsiName()
+                    )
+                ),
+                E.Tunnels(
+                    E.Tunnel(
+                        E.TunnelID(),
+                        E.VxlanID()
+                    )
+                )
+            ),
+            E.L2VPN(
+                E.VSIs(
+                    E.VSI(
+                        E.VsiName(),
+                        E.Description()
+                    )
+                ),
+                E.SRVs(
+                    E.SRV(
+                        E.IfIndex(),
+                        E.SrvID(),
+                        E.Encap(),
+                        E.SVlanRange(),
+                        E.CVlanRange()
+                    )
+                ),
+                E.ACs(
+                    E.AC(
+                        E.IfIndex(),
+                        E.SrvID(),
+                        E.VsiName(),
+                        E.AccessMode()
+                    )
+                )
+            ),
+            E.Ifmgr(
+                E.Interfaces(
+                    E.Interface(
+                        E.IfIndex(),
+                        E.Name()
+                    )
+                )
+            )
+        )
+
+        nc_get_reply = self.device.get(('subtree', top))
+        return nc_get_reply.data_ele
+
+    def get_config(self):
+        """Get every VXLAN to VSI mapping on the switch along with
+        the tunnels of each VXLAN.
+
+        Returns:
+            This returns a dictionary keyed by VXLAN ID.  Each value is
+            a dictionary with the same k/v pairs as ``Vxlan.get_config``:
+                :vxlan (str): vxlan id
+                :vsi (str): name of vsi
+                :tunnels (list): tunnel IDs mapped to the VXLAN
+
+            It returns an empty dictionary if no VXLANs exist.
+
+        """
+        data_ele = self._get_data()
+
+        self.iface_map = {}
+        for iface in findall_in_data('Interface', data_ele):
+            index = find_in_data('IfIndex', iface)
+            name = find_in_data('Name', iface)
+            if index is not None and name is not None:
+                self.iface_map[index.text] = name.text
+
+        self.vsis = {}
+        for vsi in findall_in_data('VSI', data_ele):
+            vsi_dict = data_elem_to_dict(vsi, Vxlan.VSI)
+            if vsi_dict.get('vsi'):
+                vsi_dict.setdefault('descr', None)
+                self.vsis[vsi_dict['vsi']] = vsi_dict
+
+        vxlans = {}
+        for vxlan in findall_in_data('Vxlan', data_ele):
+            vxlan_dict = data_elem_to_dict(vxlan, Vxlan.VXLAN)
+            if vxlan_dict.get('vxlan'):
+                vxlan_dict['tunnels'] = []
+                vxlans[vxlan_dict['vxlan']] = vxlan_dict
+
+        self.tunnel_vxlans = {}
+        for tunnel in findall_in_data('Tunnel', data_ele):
+            tunnel_dict = data_elem_to_dict(tunnel, Vxlan.TUNNELS)
+            tunnel_id = tunnel_dict.get('tunnel')
+            vxlan_id = tunnel_dict.get('vxlan')
+            if not tunnel_id or not vxlan_id:
+                continue
+            self.tunnel_vxlans.setdefault(tunnel_id, []).append(vxlan_id)
+            if vxlan_id in vxlans:
+                vxlans[vxlan_id]['tunnels'].append(tunnel_id)
+
+        acs = {}
+        for ac in findall_in_data('AC', data_ele):
+            ac_dict = data_elem_to_dict(
+                ac, L2EthService.AC_KEY_MAP,
+                value_map=L2EthService.AC_VALUE_MAP)
+            acs[(ac_dict.get('index'), ac_dict.get('instance'))] = ac_dict
+
+        self.services = {}
+        for srv in findall_in_data('SRV', data_ele):
+            srv_dict = data_elem_to_dict(
+                srv, L2EthService.RV_KEY_MAP,
+                value_map=L2EthService.RV_VALUE_MAP)
+            index = srv_dict.get('index')
+            srv_dict['interface'] = self.iface_map.get(index, index)
+            srv_dict.update(acs.get((index, srv_dict.get('instance')), {}))
+            self.services.setdefault(srv_dict['interface'], []).append(srv_dict)
+
+        return vxlans
@@ -0,0 +1,99 @@
+"""This module provides functions for working with the
+base64 encoded port bitmaps used by Comware, e.g. the
+``MemberList`` of a ``LAGGGroup``.
+
+Bit N of the bitmap (counting from 1, most significant bit
+of the first byte first) is set when the interface with
+IfIndex N is in the list.
+"""
+import base64
+from array import array
+
+# bit offsets (0-7, MSB first) that are set for every possible byte value
+_BIT_OFFSETS = tuple(
+    tuple(offset for offset in range(8) if byte & (0x80 >> offset))
+    for byte in range(256))
+
+
+def _to_bytes(bitmap):
+    return bytearray(base64.b64decode(bitmap or ''))
+
+
+def _to_base64(data):
+    return str(base64.b64encode(bytes(data)).decode('ascii'))
+
+
+def bitmap_to_indexes(bitmap):
+    """Decode a base64 bitmap into the IfIndexes it contains.
+
+    Args:
+        bitmap (str): base64 bitmap as retrieved via NETCONF
+
+    Returns:
+        An ``array.array`` of IfIndexes (integers) in ascending order.
+    """
+    indexes = array('L')
+    base = 1
+    for byte in _to_bytes(bitmap):
+        if byte:
+            for offset in _BIT_OFFSETS[byte]:
+                indexes.append(base + offset)
+        base += 8
+
+    return indexes
+
+
+def indexes_to_bitmap(indexes, length=0):
+    """Encode IfIndexes into a base64 bitmap.
+
+    Args:
+        indexes (iterable): IfIndexes as integers or strings
+        length (int): OPTIONAL - minimum length of the bitmap in bytes.
+            The bitmap is padded with zero bytes up to this length.
+
+    Returns:
+        The base64 encoded bitmap as a string.
+
+    Raises:
+        ValueError: if an IfIndex is less than 1.
+    """
+    positions = [int(index) - 1 for index in indexes]
+    if positions and min(positions) < 0:
+        raise ValueError('IfIndex values must be 1 or greater')
+
+    size = (max(positions) // 8 + 1) if positions else 0
+    data = bytearray(max(size, length))
+    for position in positions:
+        data[position >> 3] |= 0x80 >> (position & 7)
+
+    return _to_base64(data)
+
+
+def _combine(bitmap1, bitmap2, operator):
+    data1 = _to_bytes(bitmap1)
+    data2 = _to_bytes(bitmap2)
+    size = max(len(data1), len(data2))
+    data1.extend(bytearray(size - len(data1)))
+    data2.extend(bytearray(size - len(data2)))
+
+    return _to_base64(bytearray(
+        operator(byte1, byte2) for byte1, byte2 in zip(data1, data2)))
+
+
+def bitmap_union(bitmap1, bitmap2):
+    """Return a base64 bitmap of the IfIndexes set in either bitmap.
+    """
+    return _combine(bitmap1, bitmap2, lambda x, y: x | y)
+
+
+def bitmap_intersection(bitmap1, bitmap2):
+    """Return a base64 bitmap of the IfIndexes set in both bitmaps.
+    """
+    return _combine(bitmap1, bitmap2, lambda x, y: x & y)
+
+
+def bitmap_difference(bitmap1, bitmap2):
+    """Return a base64 bitmap of the IfIndexes set in
+    ``bitmap1`` but not in ``bitmap2``.
+    """
+    return _combine(bitmap1, bitmap2, lambda x, y: x & ~y & 0xff)
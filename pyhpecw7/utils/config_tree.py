@@ -0,0 +1,309 @@
+"""This module parses Comware configuration text, e.g. the
+output of ``display current-configuration`` or a saved .cfg
+file, into a tree of ``ConfigLine`` objects, and compares
+two trees section by section.
+
+Comware separates top level sections with ``#`` lines and indents
+the commands inside a section by one space per level. Global
+commands are printed with a leading space inside their own ``#``
+blocks, so they end up as children of the root, just like section
+headers such as ``interface Tunnel5 mode vxlan``.
+"""
+import re
+
+_IFACE_RE = re.compile(r'^([A-Za-z][A-Za-z-]*?)\s*(\d[\d/:.]*)$')
+
+
+class ConfigLine(object):
+    """A single configuration line and the lines nested under it.
+
+    Args:
+        text (str): the configuration line, without indentation.
+        parent (ConfigLine): the line this one is nested under.
+
+    Attributes:
+        text (str): the configuration line, without indentation.
+        parent (ConfigLine): the line this one is nested under.
+            ``None`` for the root of the tree.
+        children (list): ``ConfigLine`` objects nested under this line,
+            in configuration order.
+    """
+    __slots__ = ('text', 'parent', 'children')
+
+    def __init__(self, text, parent=None):
+        self.text = text
+        self.parent = parent
+        self.children = []
+
+    def __repr__(self):
+        return '<ConfigLine {0!r}>'.format(self.text)
+
+    def find(self, prefix):
+        """Return the first child starting with ``prefix``, else ``None``.
+        """
+        for child in self.children:
+            if child.text.startswith(prefix):
+                return child
+        return None
+
+    def find_all(self, prefix):
+        """Return a list of all children starting with ``prefix``.
+        """
+        return [child for child in self.children
+                if child.text.startswith(prefix)]
+
+    def walk(self):
+        """Yield every line nested under this one, depth first.
+        """
+        stack = list(reversed(self.children))
+        while stack:
+            line = stack.pop()
+            yield line
+            stack.extend(reversed(line.children))
+
+    def to_lines(self, indent=0):
+        """Return this line and its children as a list of
+        indented strings, the way the switch prints them.
+        """
+        lines = []
+        stack = [(self, indent)]
+        while stack:
+            line, depth = stack.pop()
+            if line.text is not None:
+                lines.append(' ' * depth + line.text)
+                depth += 1
+            stack.extend((child, depth) for child in reversed(line.children))
+        return lines
+
+    def to_text(self):
+        """Return this line and its children as configuration text.
+        """
+        return '\n'.join(self.to_lines()) + '\n'
+
+
+class ConfigTree(ConfigLine):
+    """The root of a parsed configuration.
+
+    Top level sections are indexed by their header text, and
+    ``interface`` sections are also indexed by interface name,
+    so lookups don't have to walk the configuration.
+
+    Attributes:
+        sections (dict): header text to ``ConfigLine`` for every top
+            level line.  Interface headers with extra words, such as
+            ``interface Tunnel5 mode vxlan``, are also indexed by their
+            first two words (``interface Tunnel5``).
+    """
+    __slots__ = ('sections', '_interfaces')
+
+    def __init__(self):
+        super(ConfigTree, self).__init__(None)
+        self.sections = {}
+        self._interfaces = {}
+
+    def _index(self, line):
+        self.sections.setdefault(line.text, line)
+        words = line.text.split()
+        if len(words) > 1 and words[0] == 'interface':
+            self.sections.setdefault('interface ' + words[1], line)
+            match = _IFACE_RE.match(words[1])
+            if match:
+                self._interfaces.setdefault(match.group(2), []).append(
+                    (match.group(1).lower(), line))
+
+    def section(self, header):
+        """Return the top level line for ``header``, else ``None``.
+
+        Args:
+            header (str): the section header,
+                e.g. 'interface Tunnel5' or 'vlan 10'
+        """
+        return self.sections.get(header)
+
+    def interface(self, name):
+        """Return the ``interface`` section for an interface name, else ``None``.
+
+        The name may be abbreviated the same way the CLI allows,
+        e.g. 'vlan100' or 'Fo1/0/1', and may contain a space between
+        the type and the number, e.g. 'Tunnel 5'.
+
+        Args:
+            name (str): the interface name
+        """
+        exact = self.sections.get('interface ' + name)
+        if exact is not None:
+            return exact
+
+        match = _IFACE_RE.match(name.strip())
+        if not match:
+            return None
+
+        if_type = match.group(1).lower()
+        for full_type, line in self._interfaces.get(match.group(2), []):
+            if full_type.startswith(if_type):
+                return line
+        return None
+
+    def interfaces(self, if_type=''):
+        """Return a list of every ``interface`` section whose interface
+        name starts with ``if_type``, in configuration order.
+        """
+        prefix = 'interface ' + if_type
+        return [line for line in self.children
+                if line.text.startswith(prefix)]
+
+    def find_global(self, prefix):
+        """Return a list of top level lines starting with
+        ``prefix`` that have no lines nested under them,
+        e.g. global commands like 'mad exclude interface'.
+        """
+        return [line for line in self.find_all(prefix) if not line.children]
+
+
+def parse_config(text):
+    """Parse Comware configuration text into a ``ConfigTree``.
+
+    The CLI prompt echo (e.g. '<HP1>display current-configuration')
+    and the trailing 'return' are dropped.  The parse is a single pass
+    over the text.
+
+    Args:
+        text (str): configuration text
+
+    Returns:
+        A ``ConfigTree`` whose children are the top level lines.
+    """
+    root = ConfigTree()
+    # stack of (indent, ConfigLine) for the current nesting path
+    stack = [(-1, root)]
+
+    for raw in text.splitlines():
+        stripped = raw.strip()
+        if not stripped:
+            continue
+
+        indent = len(raw) - len(raw.lstrip(' '))
+
+        if stripped.startswith('#'):
+            while stack[-1][0] >= indent:
+                stack.pop()
+            if indent == 0:
+                del stack[1:]
+            continue
+
+        if indent == 0 and (stripped == 'return'
+                            or (stripped.startswith('<') and '>' in stripped)):
+            continue
+
+        while stack[-1][0] >= indent:
+            stack.pop()
+
+        parent = stack[-1][1]
+        line = ConfigLine(stripped, parent)
+        parent.children.append(line)
+        if parent is root:
+            root._index(line)
+        stack.append((indent, line))
+
+    return root
+
+
+def _index_children(node):
+    """Map child text to child, keeping the first of any duplicates.
+    """
+    index = {}
+    for child in node.children:
+        index.setdefault(child.text, child)
+    return index
+
+
+def _diff_children(current, candidate, depth, add, remove):
+    """Append the lines that differ between the children of
+    ``current`` and ``candidate`` to ``add`` and ``remove``.
+    Lines nested deeper than ``depth`` are indented by one space
+    per level and preceded by their parent line for context.
+    """
+    current_index = _index_children(current)
+    candidate_index = _index_children(candidate)
+    pad = ' ' * depth
+
+    for child in candidate.children:
+        match = current_index.get(child.text)
+        if match is None:
+            add.extend(child.to_lines(depth))
+        elif child.children or match.children:
+            sub_add, sub_remove = [], []
+            _diff_children(match, child, depth + 1, sub_add, sub_remove)
+            if sub_add:
+                add.append(pad + child.text)
+                add.extend(sub_add)
+            if sub_remove:
+                remove.append(pad + child.text)
+                remove.extend(sub_remove)
+
+    for child in current.children:
+        if child.text not in candidate_index:
+            remove.append(pad + child.text)
+
+
+def diff_config(current, candidate):
+    """Compare two parsed configurations section by section.
+
+    Top level lines without nested lines, i.e. global commands and
+    empty sections such as 'vlan 2', are compared as one global
+    section.  Every other top level line is compared as its own
+    section, so the same command under two interfaces is reported
+    once per interface.  A section that only exists in ``current``
+    is reported by removing its header from the global section.
+
+    Within a section, lines nested under a sub-section (e.g. an
+    'address-family') are indented by one space and follow the
+    sub-section line.  A sub-section line with no indented lines
+    after it in ``remove`` means the whole sub-section is removed.
+
+    The comparison is linear in the size of the configurations.
+    Lines are matched by text, so a line that only moved within its
+    section is not reported.
+
+    Args:
+        current (ConfigTree): the existing configuration, e.g.
+            from ``RunningConfig.tree``
+        candidate (ConfigTree): the desired configuration
+
+    Returns:
+        A list of dictionaries, in candidate configuration order,
+        for every section that differs. Each has the keys:
+            :section (str): section header, or ``None`` for global
+                commands
+            :add (list): lines in ``candidate`` but not in ``current``
+            :remove (list): lines in ``current`` but not in ``candidate``
+    """
+    current_index = _index_children(current)
+    candidate_index = _index_children(candidate)
+
+    global_diff = dict(section=None, add=[], remove=[])
+    diffs = [global_diff]
+
+    for child in candidate.children:
+        match = current_index.get(child.text)
+        if match is None and not child.children:
+            global_diff['add'].append(child.text)
+        elif match is None:
+            add = []
+            for line in child.children:
+                add.extend(line.to_lines())
+            diffs.append(dict(section=child.text, add=add, remove=[]))
+        elif child.children or match.children:
+            add, remove = [], []
+            _diff_children(match, child, 0, add, remove)
+            if add or remove:
+                diffs.append(dict(section=child.text, add=add, remove=remove))
+
+    for child in current.children:
+        if child.text not in candidate_index:
+            global_diff['remove'].append(child.text)
+
+    if not global_diff['add'] and not global_diff['remove']:
+        diffs.remove(global_diff)
+
+    return diffs
@@ -0,0 +1,163 @@
+"""This module computes md5 digests of local files and caches them,
+so large images pushed to many devices are only hashed once.
+
+Digests are cached in memory for the life of the process and in a
+``<file>.md5`` sidecar file next to the hashed file, or in a cache
+directory for read-only or shared image stores, keyed by the file's
+real path, size, modification time and inode.  If any of those change
+the cached digest is ignored and the file is hashed again.
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+SIDECAR_SUFFIX = '.md5'
+
+_cache = {}
+_cache_lock = threading.Lock()
+_key_locks = {}
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    mtime_ns = getattr(stat, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(stat.st_mtime * 1e9)
+
+    return (os.path.realpath(path), stat.st_size, mtime_ns, stat.st_ino)
+
+
+def _hash_file(path, blocksize):
+    """Hash the file through mmap, falling back to buffered
+    reads for files that can't be mapped, e.g. empty files.
+    """
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            mapped = None
+
+        if mapped is not None:
+            try:
+                for offset in range(0, len(mapped), blocksize):
+                    md5.update(mapped[offset:offset + blocksize])
+            finally:
+                mapped.close()
+        else:
+            buf = f.read(blocksize)
+            while buf:
+                md5.update(buf)
+                buf = f.read(blocksize)
+
+    return md5.hexdigest()
+
+
+def _sidecar_path(key, cache_dir=None):
+    """Return the sidecar path of a file, next to the file or,
+    if ``cache_dir`` is set, in ``cache_dir`` under the file name and
+    a hash of its real path so files with the same name don't collide.
+    """
+    if cache_dir is None:
+        return key[0] + SIDECAR_SUFFIX
+
+    return os.path.join(cache_dir, '{0}.{1}{2}'.format(
+        os.path.basename(key[0]),
+        hashlib.md5(key[0]).hexdigest()[:12],
+        SIDECAR_SUFFIX))
+
+
+def _read_sidecar(key, cache_dir=None):
+    try:
+        with open(_sidecar_path(key, cache_dir)) as sidecar:
+            record = json.load(sidecar)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if [record.get('path'), record.get('size'),
+            record.get('mtime_ns'), record.get('inode')] == list(key):
+        return record.get('md5')
+    return None
+
+
+def _write_sidecar(key, digest, cache_dir=None):
+    record = dict(path=key[0], size=key[1], mtime_ns=key[2],
+                  inode=key[3], md5=digest)
+    try:
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        with open(_sidecar_path(key, cache_dir), 'w') as sidecar:
+            json.dump(record, sidecar)
+    except (IOError, OSError):
+        pass
+
+
+def file_md5(path, blocksize=2**20, sidecar=True, cache_dir=None):
+    """Return the md5 hex digest of a local file.
+
+    Concurrent calls for the same file, e.g. from threads pushing
+    one image to many devices, wait for a single hash of the file.
+
+    Args:
+        path (str): path to the local file
+        blocksize (int): OPTIONAL - bytes hashed per update
+        sidecar (bool): OPTIONAL - whether to read and write the
+            ``<file>.md5`` sidecar.  The sidecar is silently skipped
+            if its directory isn't writable.
+        cache_dir (str): OPTIONAL - directory for the sidecar,
+            created if missing. Defaults to the file's directory.
+
+    Returns:
+        The md5 hex digest as a string.
+
+    Raises:
+        IOError/OSError: if the file doesn't exist or isn't readable.
+    """
+    key = _file_key(path)
+
+    with _cache_lock:
+        digest = _cache.get(key)
+        if digest is not None:
+            return digest
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        digest = _cache.get(key)
+        if digest is None and sidecar:
+            digest = _read_sidecar(key, cache_dir)
+        if digest is None:
+            digest = _hash_file(path, blocksize)
+            if sidecar:
+                _write_sidecar(key, digest, cache_dir)
+
+        with _cache_lock:
+            _cache[key] = digest
+            _key_locks.pop(key, None)
+
+    return digest
+
+
+def remember(path, digest, sidecar=True, cache_dir=None):
+    """Cache a digest that was computed elsewhere, e.g. while the
+    file was streamed to a device.
+
+    Args:
+        path (str): path to the local file
+        digest (str): the md5 hex digest of the file
+        sidecar (bool): OPTIONAL - whether to write the sidecar
+        cache_dir (str): OPTIONAL - see ``file_md5``
+    """
+    key = _file_key(path)
+    with _cache_lock:
+        _cache[key] = digest
+    if sidecar:
+        _write_sidecar(key, digest, cache_dir)
+
+
+def clear_cache():
+    """Forget all in-memory digests. Sidecar files are left alone.
+    """
+    with _cache_lock:
+        _cache.clear()
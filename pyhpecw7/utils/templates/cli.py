@@ -15,30 +15,51 @@
 # limitations under the License.
 
 import os
+import threading
 import textfsm
 
+# parsed templates by file name, reset before every use
+_TEMPLATES = {}
+_TEMPLATES_LOCK = threading.Lock()
+
+
+def _get_template(template):
+    """Returns the cached ``TextFSM`` object for a template,
+    parsing the template file the first time it is used
+    """
+    fsm = _TEMPLATES.get(template)
+    if fsm is None:
+        path = os.path.dirname(os.path.abspath(__file__)) \
+            + '/textfsm_temps/' + template
+
+        with open(path) as template_file:
+            fsm = textfsm.TextFSM(template_file)
+        _TEMPLATES[template] = fsm
+
+    return fsm
+
 
 def get_structured_data(template, rawtxt):
     """Returns structured data given raw text using
     TextFSM templates
     """
 
-    path = os.path.dirname(os.path.abspath(__file__)) \
-        + '/textfsm_temps/' + template
-
-    fsm = textfsm.TextFSM(open(path))
+    with _TEMPLATES_LOCK:
+        fsm = _get_template(template)
+        fsm.Reset()
 
-    # an object is what is being extracted
-    # based on the template, it may be one objecst or multiple
-    # as is the case with neighbors, interfaces, etc.
-    objects = fsm.ParseText(rawtxt)
+        # an object is what is being extracted
+        # based on the template, it may be one objecst or multiple
+        # as is the case with neighbors, interfaces, etc.
+        objects = fsm.ParseText(rawtxt)
+        header = [name.lower() for name in fsm.header]
 
     structured_data = []
     for each in objects:
         index = 0
         temp = {}
         for template_value in each:
-            temp[fsm.header[index].lower()] = str(template_value)
+            temp[header[index]] = str(template_value)
             index += 1
         structured_data.append(temp)
 
@@ -7,7 +7,7 @@ from ncclient.operations.rpc import RPCReply
 from pyhpecw7.comware import HPCOM7, NCTimeoutError, ConnectionClosedError, NCError,\
     ConnectionAuthenticationError, ConnectionSSHError, ConnectionUknownHostError,\
     ConnectionError, LockConflictError, UnlockConflictError, NcTransErrors, NcOpErrors, RPCError,\
-    socket
+    socket, ConnectionRebootTimeoutError, ConnectionRebootVerifyError
 
 class HPCOM7TestCase(unittest.TestCase):
 
@@ -159,6 +159,47 @@ class HPCOM7TestCase(unittest.TestCase):
         self.device.connection.cli_display.assert_called_with('display current', b=2)
         self.assertEqual(result, self.device.connection.cli_display.return_value)
 
+    def test_execute_nested_keeps_lock(self):
+        self.device._locked = True
+        self.device.execute(self.device.connection.cli_display, ['display current'])
+
+        self.assertFalse(self.device.connection.lock.called)
+        self.assertFalse(self.device.connection.unlock.called)
+        self.assertEqual(self.device._locked, True)
+
+    def test_execute_staged_single_lock(self):
+        for cfg_type in ['edit_config', 'cli_config', 'cli_config']:
+            self.device.staged.append(dict(cfg_type=cfg_type, config='config object'))
+        self.device.connection.cli_config.return_value.xml = '<rpc-reply/>'
+
+        self.device.execute_staged()
+
+        self.device.connection.lock.assert_called_once_with('running')
+        self.device.connection.unlock.assert_called_once_with('running')
+        self.assertEqual(self.device.connection.cli_config.call_count, 2)
+        self.assertEqual(len(self.device.staged), 0)
+
+    def test_config_version(self):
+        self.assertEqual(self.device.config_version, 0)
+        self.device.connection.cli_config.return_value.xml = '<rpc-reply/>'
+        self.device.connection.cli_display.return_value.xml = '<rpc-reply/>'
+
+        self.device.cli_display('display current')
+        self.device.get(('subtree', 'filter'))
+        self.device.action('ping', modifies_config=False)
+        self.assertEqual(self.device.config_version, 0)
+
+        self.device.edit_config('config')
+        self.device.cli_config('vlan 10')
+        self.device.action('action')
+        self.device.rollback('file.cfg')
+        self.assertEqual(self.device.config_version, 4)
+
+    def test_running_config(self):
+        running_config = self.device.running_config
+        self.assertIs(running_config.device, self.device)
+        self.assertIs(self.device.running_config, running_config)
+
     @mock.patch.object(HPCOM7, 'edit_config')
     @mock.patch.object(HPCOM7, 'action')
     @mock.patch.object(HPCOM7, 'cli_config')
@@ -325,6 +366,97 @@ System View: return to User View with Ctrl+Z.
         self.device.reboot()
         self.device.connection.cli_display.assert_called_with(['reboot force'])
 
+    @mock.patch.object(HPCOM7, 'wait_for_reboot')
+    def test_reboot_wait(self, mock_wait):
+        self.device.reboot(wait=True, expected_os='7.1.045', maximum=10)
+        self.device.connection.cli_display.assert_called_with(['reboot force'])
+        mock_wait.assert_called_with(timeout=900, expected_os='7.1.045', maximum=10)
+
+    @mock.patch('pyhpecw7.comware.socket.create_connection')
+    def test_port_open(self, mock_create):
+        self.assertTrue(self.device._port_open(2))
+        mock_create.assert_called_with(('host', 830), 2)
+        mock_create.return_value.close.assert_called_with()
+
+        mock_create.side_effect = socket.error
+        self.assertFalse(self.device._port_open(2))
+
+    @mock.patch('pyhpecw7.comware.time.sleep')
+    @mock.patch.object(HPCOM7, 'open')
+    @mock.patch.object(HPCOM7, '_port_open')
+    def test_wait_for_reboot(self, mock_port_open, mock_open, mock_sleep):
+        # still up, down, down, port open before NETCONF, back
+        mock_port_open.side_effect = [True, False, False, True, True]
+        mock_open.side_effect = [ConnectionSSHError(self.device), None]
+
+        result = self.device.wait_for_reboot(initial=1, maximum=4)
+
+        self.assertEqual(result, self.device.connection)
+        self.device.connection.close_session.assert_called_with()
+        self.assertEqual(mock_open.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 3)
+
+        # exponential backoff with jitter, capped at maximum
+        sleeps = [call[0][0] for call in mock_sleep.call_args_list]
+        self.assertTrue(0.5 <= sleeps[0] <= 1)
+        self.assertTrue(0.5 <= sleeps[1] <= 1)
+        self.assertTrue(1 <= sleeps[2] <= 2)
+
+    @mock.patch('pyhpecw7.comware.time.sleep')
+    @mock.patch.object(HPCOM7, 'open')
+    @mock.patch.object(HPCOM7, '_port_open')
+    def test_wait_for_reboot_drops_caches(self, mock_port_open, mock_open, mock_sleep):
+        mock_port_open.side_effect = [False, True]
+        running_config = self.device.running_config
+        version = self.device.config_version
+
+        self.device.wait_for_reboot()
+
+        self.assertEqual(self.device.config_version, version + 1)
+        self.assertIsNot(self.device.running_config, running_config)
+
+    @mock.patch('pyhpecw7.comware.time.sleep')
+    @mock.patch.object(HPCOM7, 'open')
+    @mock.patch.object(HPCOM7, '_port_open')
+    def test_wait_for_reboot_bad_credentials(self, mock_port_open, mock_open, mock_sleep):
+        mock_port_open.side_effect = [False, True]
+        mock_open.side_effect = ConnectionAuthenticationError(self.device)
+
+        with self.assertRaises(ConnectionAuthenticationError):
+            self.device.wait_for_reboot()
+
+        self.assertEqual(mock_open.call_count, 1)
+
+    @mock.patch('pyhpecw7.comware.time.time')
+    @mock.patch('pyhpecw7.comware.time.sleep')
+    @mock.patch.object(HPCOM7, '_port_open')
+    def test_wait_for_reboot_timeout(self, mock_port_open, mock_sleep, mock_time):
+        clock = [0]
+
+        def _sleep(seconds):
+            clock[0] += max(seconds, 1)
+        mock_sleep.side_effect = _sleep
+        mock_time.side_effect = lambda: clock[0]
+        mock_port_open.return_value = False
+
+        with self.assertRaises(ConnectionRebootTimeoutError):
+            self.device.wait_for_reboot(timeout=60)
+
+        self.assertTrue(clock[0] >= 60)
+
+    @mock.patch('pyhpecw7.comware.time.sleep')
+    @mock.patch.object(HPCOM7, 'facts', new_callable=mock.PropertyMock)
+    @mock.patch.object(HPCOM7, 'open')
+    @mock.patch.object(HPCOM7, '_port_open')
+    def test_wait_for_reboot_verify_os(self, mock_port_open, mock_open, mock_facts, mock_sleep):
+        mock_port_open.side_effect = [False, True] * 2
+        mock_facts.return_value = {'os': '7.1.045'}
+
+        self.device.wait_for_reboot(expected_os='7.1.045')
+
+        with self.assertRaises(ConnectionRebootVerifyError):
+            self.device.wait_for_reboot(expected_os='7.1.070')
+
 
 
 
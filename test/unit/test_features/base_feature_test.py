@@ -1,4 +1,5 @@
 import unittest
+import mock
 import os
 from operator import attrgetter
 
@@ -29,6 +30,11 @@ class BaseFeatureCase(unittest.TestCase):
 
         return content
 
+    def mock_device(self, host):
+        device = mock.MagicMock()
+        device.host = host
+        return device
+
     def read_get_xml(self, filename):
         return etree.fromstring(self.read_xml('get', filename))
 
@@ -0,0 +1,110 @@
+"""In-process paramiko SFTP server used to test SFTP transfers.
+"""
+import logging
+import os
+import socket
+import threading
+
+import paramiko
+from paramiko.sftp import SFTP_OK
+from paramiko.sftp_attr import SFTPAttributes
+from paramiko.sftp_handle import SFTPHandle
+from paramiko.sftp_server import SFTPServer
+from paramiko.sftp_si import SFTPServerInterface
+
+HOST_KEY = paramiko.RSAKey.generate(1024)
+
+logging.getLogger('paramiko').addHandler(logging.NullHandler())
+
+
+class StubServer(paramiko.ServerInterface):
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+
+class StubSFTPHandle(SFTPHandle):
+
+    def stat(self):
+        return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def write(self, offset, data):
+        stub = self.stub
+        if stub.fail_after is not None and stub.written + len(data) > stub.fail_after:
+            stub.fail_after = None
+            stub.transport.close()
+            return SFTP_OK
+        stub.written += len(data)
+        return super(StubSFTPHandle, self).write(offset, data)
+
+
+class StubSFTPServer(SFTPServerInterface):
+
+    def __init__(self, server, stub, *args, **kwargs):
+        super(StubSFTPServer, self).__init__(server, *args, **kwargs)
+        self.stub = stub
+
+    def _path(self, path):
+        return os.path.join(self.stub.root, path.lstrip('/'))
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(self._path(path)))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        path = self._path(path)
+        try:
+            fd = os.open(path, flags | getattr(os, 'O_BINARY', 0), 0o644)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+        if flags & os.O_WRONLY:
+            mode = 'ab' if flags & os.O_APPEND else 'wb'
+        elif flags & os.O_RDWR:
+            mode = 'a+b' if flags & os.O_APPEND else 'r+b'
+        else:
+            mode = 'rb'
+
+        f = os.fdopen(fd, mode)
+        handle = StubSFTPHandle(flags)
+        handle.stub = self.stub
+        handle.filename = path
+        handle.readfile = f
+        handle.writefile = f
+        return handle
+
+
+class SFTPStub(object):
+    """Serves ``root`` over SFTP. ``connect()`` returns a new
+    authenticated client transport. If ``fail_after`` is set, the
+    connection is dropped once that many bytes have been written.
+    """
+    def __init__(self, root, fail_after=None):
+        self.root = root
+        self.fail_after = fail_after
+        self.written = 0
+        self.transport = None
+        self.connections = 0
+
+    def connect(self, *args, **kwargs):
+        server_sock, client_sock = socket.socketpair()
+
+        self.transport = paramiko.Transport(server_sock)
+        self.transport.add_server_key(HOST_KEY)
+        self.transport.set_subsystem_handler('sftp', SFTPServer, StubSFTPServer, self)
+        self.transport.start_server(event=threading.Event(), server=StubServer())
+
+        client = paramiko.Transport(client_sock)
+        client.connect(username='user', password='pass')
+        self.connections += 1
+        return client
@@ -3,7 +3,9 @@ import mock
 import os
 
 from pyhpecw7.features.config import Config
-from base_feature_test import BaseFeatureCase
+from pyhpecw7.features.errors import FileNotReadableError
+from pyhpecw7.features.running_config import RunningConfig
+from base_feature_test import BaseFeatureCase, CURRENT_DIR
 
 FILENAME = '/path/to/file.cfg'
 BASENAME = os.path.basename(FILENAME)
@@ -32,6 +34,35 @@ class ConfigTestCase(BaseFeatureCase):
         self.assertEqual(set(result[0]), set(expected[0]))
         self.assertEqual(set(result[1]), set(expected[1]))
 
+    def test_compare_config_local(self):
+        self.device.running_config = RunningConfig(self.device)
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
+        config = Config(self.device, os.path.join(CURRENT_DIR, 'fixtures', 'config', 'candidate.cfg'))
+
+        result = config.compare_config_local()
+        expected = [
+            {'section': None,
+             'add': ['tunnel global source-address 10.10.10.11', 'vlan 200'],
+             'remove': ['mad exclude interface FortyGigE1/0/10',
+                        'tunnel global source-address 10.10.10.10',
+                        'interface Tunnel20 mode vxlan']},
+            {'section': 'vlan 100', 'add': ['name web'], 'remove': ['name servers']},
+            {'section': 'interface FortyGigE1/0/1', 'add': ['shutdown'], 'remove': []},
+            {'section': 'interface FortyGigE1/0/2', 'add': ['shutdown'], 'remove': []},
+            {'section': 'interface Tunnel21 mode vxlan',
+             'add': ['source 10.1.1.1', 'destination 10.1.1.3'], 'remove': []},
+        ]
+
+        self.assertEqual(result, expected)
+        self.device.cli_display.assert_called_once_with('display current-configuration')
+
+    def test_compare_config_local_no_file(self):
+        self.device.running_config = RunningConfig(self.device)
+        config = Config(self.device, os.path.join(CURRENT_DIR, 'fixtures', 'config', 'missing.cfg'))
+
+        with self.assertRaises(FileNotReadableError):
+            config.compare_config_local()
+
     def test_build(self):
         self.config.build()
         self.device.save.assert_any_call('safety_file.cfg')
@@ -1,10 +1,13 @@
 import unittest
 import mock
 import __builtin__
-from tempfile import NamedTemporaryFile
+import os
+import shutil
+from tempfile import NamedTemporaryFile, mkdtemp
 
 from pyhpecw7.features.file_copy import FileCopy, FileNotEnoughSpaceError, FileNotReadableError, FileHashMismatchError, FileTransferError, NCError
 from base_feature_test import BaseFeatureCase
+from sftp_stub_server import SFTPStub
 
 SOURCE_FILE = '/path/to/source/file.txt'
 
@@ -117,6 +120,14 @@ class FileCopyTestCase(BaseFeatureCase):
         self.assertEqual(result, 'bcb898f62d9e1ac765c77e6804cbd872')
 
         test_file.close()
+        os.remove(test_file.name + '.md5')
+
+    def _temp_src(self):
+        test_file = NamedTemporaryFile()
+        test_file.write('Test content.')
+        test_file.flush()
+        self.addCleanup(test_file.close)
+        self.file_copy.src = test_file.name
 
     def test_remote_dir(self):
         expected_get, get_reply = self.xml_get_and_reply('file_copy_remote_dir')
@@ -129,18 +140,23 @@ class FileCopyTestCase(BaseFeatureCase):
         self.assert_get_request(expected_get)
 
 
+    @mock.patch('pyhpecw7.features.file_copy.remember')
     @mock.patch('pyhpecw7.features.file_copy.paramiko')
     @mock.patch('pyhpecw7.features.file_copy.SCPClient')
     @mock.patch.object(FileCopy, '_safety_checks')
-    @mock.patch.object(FileCopy, '_get_local_md5')
     @mock.patch.object(FileCopy, '_get_remote_md5')
-    def test_transfer_file(self, mock_remote_md5, mock_local_md5, mock_safety_checks, mock_SCP, mock_paramiko):
-        mock_remote_md5.return_value = 'abc'
-        mock_local_md5.return_value = 'abc'
+    def test_transfer_file(self, mock_remote_md5, mock_safety_checks, mock_SCP, mock_paramiko, mock_remember):
+        self._temp_src()
+        mock_remote_md5.return_value = 'bcb898f62d9e1ac765c77e6804cbd872'
 
         mock_ssh = mock_paramiko.SSHClient.return_value
+        mock_SCP.return_value.putfo.side_effect = lambda fl, dst, size: fl.read(size)
+        progress = mock.MagicMock()
 
-        self.file_copy.transfer_file()
+        self.file_copy.transfer_file(progress=progress)
+
+        mock_remember.assert_called_with(self.file_copy.src, 'bcb898f62d9e1ac765c77e6804cbd872', cache_dir=None)
+        self.assertEqual(progress.call_args[0][:2], (13, 13))
 
         mock_paramiko.SSHClient.assert_called_with()
 
@@ -153,19 +169,20 @@ class FileCopyTestCase(BaseFeatureCase):
                                              username=self.device.username)
 
         mock_SCP.assert_called_with(mock_ssh.get_transport.return_value)
-        mock_SCP.return_value.put.assert_called_with('/path/to/source/file.txt', 'flash:/file.txt')
+        mock_SCP.return_value.putfo.assert_called_with(mock.ANY, 'flash:/file.txt', size=13)
         mock_SCP.return_value.close.assert_called_with()
 
+    @mock.patch('pyhpecw7.features.file_copy.remember')
     @mock.patch('pyhpecw7.features.file_copy.paramiko')
     @mock.patch('pyhpecw7.features.file_copy.SCPClient')
     @mock.patch.object(FileCopy, '_safety_checks')
-    @mock.patch.object(FileCopy, '_get_local_md5')
     @mock.patch.object(FileCopy, '_get_remote_md5')
-    def test_transfer_file_mismatch_hash(self, mock_remote_md5, mock_local_md5, mock_safety_checks, mock_SCP, mock_paramiko):
+    def test_transfer_file_mismatch_hash(self, mock_remote_md5, mock_safety_checks, mock_SCP, mock_paramiko, mock_remember):
+        self._temp_src()
         mock_remote_md5.return_value = 'abc'
-        mock_local_md5.return_value = 'def'
 
         mock_ssh = mock_paramiko.SSHClient.return_value
+        mock_SCP.return_value.putfo.side_effect = lambda fl, dst, size: fl.read(size)
 
         with self.assertRaises(FileHashMismatchError):
             self.file_copy.transfer_file()
@@ -181,25 +198,29 @@ class FileCopyTestCase(BaseFeatureCase):
                                              username=self.device.username)
 
         mock_SCP.assert_called_with(mock_ssh.get_transport.return_value)
-        mock_SCP.return_value.put.assert_called_with('/path/to/source/file.txt', 'flash:/file.txt')
+        mock_SCP.return_value.putfo.assert_called_with(mock.ANY, 'flash:/file.txt', size=13)
         mock_SCP.return_value.close.assert_called_with()
 
+    @mock.patch('pyhpecw7.features.file_copy.remember')
     @mock.patch('pyhpecw7.features.file_copy.paramiko')
     @mock.patch('pyhpecw7.features.file_copy.SCPClient')
     @mock.patch.object(FileCopy, '_safety_checks')
-    @mock.patch.object(FileCopy, '_get_local_md5')
     @mock.patch.object(FileCopy, '_get_remote_md5')
-    def test_transfer_file_error(self, mock_remote_md5, mock_local_md5, mock_safety_checks, mock_SCP, mock_paramiko):
+    def test_transfer_file_error(self, mock_remote_md5, mock_safety_checks, mock_SCP, mock_paramiko, mock_remember):
+        self._temp_src()
         mock_remote_md5.return_value = 'abc'
-        mock_local_md5.return_value = 'def'
 
         mock_ssh = mock_paramiko.SSHClient.return_value
 
-        mock_SCP.return_value.put.side_effect = Exception
+        mock_SCP.return_value.putfo.side_effect = EOFError
 
-        with self.assertRaises(FileTransferError):
+        with self.assertRaises(FileTransferError) as raised:
             self.file_copy.transfer_file()
 
+        self.assertIsInstance(raised.exception.error, EOFError)
+        mock_SCP.return_value.close.assert_called_with()
+        mock_ssh.get_transport.return_value.close.assert_called_with()
+
         mock_paramiko.SSHClient.assert_called_with()
 
         mock_ssh.set_missing_host_key_policy.assert_called_with(mock_paramiko.AutoAddPolicy.return_value)
@@ -211,8 +232,140 @@ class FileCopyTestCase(BaseFeatureCase):
                                              username=self.device.username)
 
         mock_SCP.assert_called_with(mock_ssh.get_transport.return_value)
-        mock_SCP.return_value.put.assert_called_with('/path/to/source/file.txt', 'flash:/file.txt')
+        mock_SCP.return_value.putfo.assert_called_with(mock.ANY, 'flash:/file.txt', size=13)
+
+
+    @mock.patch('pyhpecw7.features.file_copy.remember')
+    @mock.patch('pyhpecw7.features.file_copy.paramiko')
+    @mock.patch('pyhpecw7.features.file_copy.SCPClient')
+    @mock.patch.object(FileCopy, '_safety_checks')
+    @mock.patch.object(FileCopy, '_get_remote_md5')
+    def test_transfer_file_reuse_transport(self, mock_remote_md5, mock_safety_checks, mock_SCP, mock_paramiko, mock_remember):
+        self._temp_src()
+        mock_remote_md5.return_value = 'bcb898f62d9e1ac765c77e6804cbd872'
+        mock_SCP.return_value.putfo.side_effect = lambda fl, dst, size: fl.read(size)
+        mock_SCP.return_value.channel = None
+        self.device.port = 22
+        transport = self.device.connection._session._transport
+        transport.is_active.return_value = True
+
+        self.file_copy.transfer_file(reuse_transport=True, window_size=2**24, max_packet_size=2**15)
+
+        self.assertFalse(mock_paramiko.SSHClient.called)
+        mock_SCP.assert_called_with(transport)
+        transport.open_session.assert_called_with(window_size=2**24, max_packet_size=2**15)
+        self.assertEqual(mock_SCP.return_value.channel, transport.open_session.return_value)
+        self.assertFalse(transport.close.called)
+
+    @mock.patch('pyhpecw7.features.file_copy.remember')
+    @mock.patch('pyhpecw7.features.file_copy.paramiko')
+    @mock.patch('pyhpecw7.features.file_copy.SCPClient')
+    @mock.patch.object(FileCopy, '_safety_checks')
+    @mock.patch.object(FileCopy, '_get_remote_md5')
+    def test_transfer_file_reuse_transport_port_mismatch(self, mock_remote_md5, mock_safety_checks, mock_SCP, mock_paramiko, mock_remember):
+        self._temp_src()
+        mock_remote_md5.return_value = 'bcb898f62d9e1ac765c77e6804cbd872'
+        mock_SCP.return_value.putfo.side_effect = lambda fl, dst, size: fl.read(size)
+        self.device.port = 830
+
+        self.file_copy.transfer_file(reuse_transport=True)
+
+        mock_paramiko.SSHClient.assert_called_with()
+        mock_SCP.assert_called_with(mock_paramiko.SSHClient.return_value.get_transport.return_value)
+
+    def _sftp_transfer(self, stub, **kwargs):
+        self.device.host = 'sw1'
+        with mock.patch.object(FileCopy, '_get_transport', side_effect=stub.connect),\
+                mock.patch.object(FileCopy, '_get_remote_md5', side_effect=self.file_copy._get_local_md5):
+            self.file_copy.transfer_file_sftp(safety_checks=False, chunk_size=2**12,
+                                              checkpoint_size=2**14, **kwargs)
+
+        with open(os.path.join(stub.root, 'file.txt'), 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(os.path.exists(self.file_copy._progress_path()))
+        # local state stays out of the source file's directory
+        self.assertFalse(os.path.exists(self.file_copy.src + '.md5'))
+        self.assertFalse(os.path.exists(self.file_copy.src + '.sw1.progress'))
+
+    def _sftp_setup(self, fail_after=None):
+        self.content = os.urandom(100000)
+        test_file = NamedTemporaryFile()
+        test_file.write(self.content)
+        test_file.flush()
+        self.addCleanup(test_file.close)
+        self.file_copy.src = test_file.name
+
+        state_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        self.file_copy.state_dir = os.path.join(state_dir, 'state')
 
+        root = mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        return SFTPStub(root, fail_after=fail_after)
+
+    def test_transfer_file_sftp(self):
+        stub = self._sftp_setup()
+        progress = mock.MagicMock()
+
+        self._sftp_transfer(stub, progress=progress)
+
+        self.assertEqual(stub.connections, 1)
+        self.assertEqual(stub.written, 100000)
+        self.assertEqual(progress.call_args[0][:2], (100000, 100000))
+
+    def test_transfer_file_sftp_resume(self):
+        stub = self._sftp_setup(fail_after=50000)
+
+        self._sftp_transfer(stub)
+
+        self.assertEqual(stub.connections, 2)
+        # only the unconfirmed tail of the first attempt is sent again
+        self.assertGreaterEqual(stub.written, 100000)
+        self.assertLess(stub.written, 100000 + 2**14 + 2**12)
+
+    def test_transfer_file_sftp_resume_bad_prefix(self):
+        stub = self._sftp_setup()
+        with open(os.path.join(stub.root, 'file.txt'), 'wb') as f:
+            f.write('x' * 50000)
+        self.device.host = 'sw1'
+        self.file_copy._write_progress(self.file_copy._get_local_md5(), 50000)
+
+        self._sftp_transfer(stub)
+
+        self.assertEqual(stub.written, 100000)
+
+    def test_transfer_file_sftp_fails(self):
+        stub = self._sftp_setup(fail_after=50000)
+        stub.connect = mock.MagicMock(side_effect=EOFError)
+        self.device.host = 'sw1'
+
+        with mock.patch.object(FileCopy, '_get_transport', side_effect=stub.connect):
+            with self.assertRaises(FileTransferError):
+                self.file_copy.transfer_file_sftp(safety_checks=False, retries=2)
+
+        self.assertEqual(stub.connect.call_count, 3)
+
+    def test_sftp_path(self):
+        self.assertEqual(self.file_copy._sftp_path(), '/file.txt')
+        self.file_copy.dst = 'flash:/images/file.ipe'
+        self.assertEqual(self.file_copy._sftp_path(), '/images/file.ipe')
+
+    def test_filesystem(self):
+        filesystem = mock.MagicMock()
+        filesystem.get_md5.return_value = 'abc123'
+        filesystem.is_dir.return_value = False
+
+        file_copy = FileCopy(self.device, SOURCE_FILE, 'flash:/images/file.txt', filesystem=filesystem)
+
+        self.assertFalse(file_copy.remote_dir_exists)
+        filesystem.is_dir.assert_called_with('flash:/images/')
+        self.assertEqual(file_copy._get_remote_md5(), 'abc123')
+        filesystem.get_md5.assert_called_with('flash:/images/file.txt')
+        self.assertFalse(self.device.action.called)
+
+        self.device.action.return_value = self.read_action_reply_xml('file_copy_create_remote_dir')
+        file_copy.create_remote_dir()
+        filesystem.invalidate.assert_called_with('flash:/images/')
 
     def test_create_dir(self):
         self.file_copy._remote_dir = 'flash:/unit/'
@@ -226,6 +379,54 @@ class FileCopyTestCase(BaseFeatureCase):
         self.assertEqual(result, expected)
         self.assert_action_request(expected_get)
 
+    @mock.patch.object(FileCopy, '_get_local_md5')
+    def test_replicate(self, mock_local_md5):
+        mock_local_md5.return_value = 'abc'
+        self.device.cli_display.return_value = self.read_cli_display('dir_all_filesystems')
+        filesystem = mock.Mock()
+        filesystem.get_md5s.side_effect = [{'slot2#flash:/file.txt': None},
+                                           {'slot2#flash:/file.txt': 'abc'}]
+        self.file_copy.filesystem = filesystem
+
+        result = self.file_copy.replicate()
+
+        self.assertEqual(result, {'slot2#flash:/file.txt': True})
+        self.device.cli_display.assert_called_once_with('dir /all-filesystems')
+        self.assert_action_request(self.read_action_xml('file_copy_replicate'))
+        self.assertFalse(filesystem.is_dirs.called)
+
+    @mock.patch.object(FileCopy, '_get_local_md5')
+    def test_replicate_subdir(self, mock_local_md5):
+        mock_local_md5.return_value = 'abc'
+        filesystem = mock.Mock()
+        file_copy = FileCopy(self.device, SOURCE_FILE, dst='flash:/images/file.txt',
+                             filesystem=filesystem)
+        filesystem.get_md5s.side_effect = [
+            {'slot2#flash:/images/file.txt': None, 'slot3#flash:/images/file.txt': 'abc'},
+            {'slot2#flash:/images/file.txt': 'abc'}]
+        filesystem.is_dirs.return_value = {'slot2#flash:/images': False}
+
+        result = file_copy.replicate(['slot2#flash:', 'slot3#flash:'])
+
+        self.assertEqual(result, {'slot2#flash:/images/file.txt': True,
+                                  'slot3#flash:/images/file.txt': False})
+        filesystem.is_dirs.assert_called_once_with(['slot2#flash:/images'])
+        mkdir, copy = [call[0][0] for call in self.device.action.call_args_list]
+        self.assertEqual(mkdir.findtext('.//{*}SrcName'), 'slot2#flash:/images')
+        self.assertIsNotNone(mkdir.find('.//{*}MkDir'))
+        self.assertEqual(copy.findtext('.//{*}DstName'), 'slot2#flash:/images/file.txt')
+
+    @mock.patch.object(FileCopy, '_get_local_md5')
+    def test_replicate_mismatch(self, mock_local_md5):
+        mock_local_md5.return_value = 'abc'
+        filesystem = mock.Mock()
+        filesystem.get_md5s.side_effect = [{'slot2#flash:/file.txt': None},
+                                           {'slot2#flash:/file.txt': 'def'}]
+        self.file_copy.filesystem = filesystem
+
+        with self.assertRaises(FileHashMismatchError):
+            self.file_copy.replicate(['slot2#flash:'])
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,151 @@
+import unittest
+import mock
+from lxml import etree
+
+from pyhpecw7.features.filesystem import FileSystem, FileSystemInventory
+from pyhpecw7.errors import NCError
+from base_feature_test import BaseFeatureCase
+
+
+class FileSystemTestCase(BaseFeatureCase):
+
+    @mock.patch('pyhpecw7.comware.HPCOM7')
+    def setUp(self, mock_device):
+        self.device = mock_device
+        self.device.config_version = 0
+        self.filesystem = FileSystem(self.device)
+
+    def test_get_md5s(self):
+        expected_action, action_reply = self.xml_action_and_reply('filesystem_md5s')
+        self.device.action.return_value = action_reply
+
+        result = self.filesystem.get_md5s(['flash:/boot.bin', 'flash:/system.bin'])
+        expected = {'flash:/boot.bin': '44d5527772e1b9841f99cb03f31cbc1c',
+                    'flash:/system.bin': '2b4d7e5b1a9e0c9f3d1e8a7c6b5a4f3e'}
+
+        self.assertEqual(result, expected)
+        self.assert_action_request(expected_action)
+
+        self.assertEqual(self.filesystem.get_md5('flash:/boot.bin'), '44d5527772e1b9841f99cb03f31cbc1c')
+        self.assertEqual(self.device.action.call_count, 1)
+
+    def test_get_md5s_cache_invalidated(self):
+        self.device.action.return_value = self.read_action_reply_xml('filesystem_md5s')
+        self.filesystem.get_md5s(['flash:/boot.bin', 'flash:/system.bin'])
+
+        self.filesystem.invalidate('flash:/boot.bin')
+        self.filesystem.get_md5('flash:/boot.bin')
+        self.assertEqual(self.device.action.call_count, 2)
+
+        self.device.config_version = 1
+        self.filesystem.get_md5('flash:/system.bin')
+        self.assertEqual(self.device.action.call_count, 3)
+
+    def test_get_md5s_missing_file(self):
+        reply = self.read_action_reply_xml('file_copy_remote_md5')
+
+        def _action(top, modifies_config=True):
+            if len(top.findall('.//{*}File')) > 1 or 'missing' in etree.tostring(top):
+                raise NCError
+            return reply
+        self.device.action.side_effect = _action
+
+        result = self.filesystem.get_md5s(['flash:/file.txt', 'flash:/missing.bin'])
+
+        self.assertEqual(result, {'flash:/file.txt': '44d5527772e1b9841f99cb03f31cbc1c',
+                                  'flash:/missing.bin': None})
+        self.assertEqual(self.device.action.call_count, 3)
+
+    def test_is_dirs(self):
+        expected_get, get_reply = self.xml_get_and_reply('filesystem_dirs')
+        self.device.get.return_value = get_reply
+
+        result = self.filesystem.is_dirs(['flash:/', 'slot2#flash:/images/', 'flash:/missing'])
+        expected = {'flash:': True, 'slot2#flash:/images': True, 'flash:/missing': False}
+
+        self.assertEqual(result, expected)
+        self.assert_get_request(expected_get)
+
+        self.assertTrue(self.filesystem.is_dir('flash:/'))
+        self.assertEqual(self.device.get.call_count, 1)
+
+
+class FileSystemInventoryTestCase(BaseFeatureCase):
+
+    @mock.patch('pyhpecw7.comware.HPCOM7')
+    def setUp(self, mock_device):
+        self.device = mock_device
+        self.device.host = 'switch1'
+        self.device.config_version = 0
+        self.device.cli_display.return_value = self.read_cli_display('dir_all_filesystems')
+        self.device.get.return_value = self.read_get_reply_xml('install_os')
+        self.inventory = FileSystemInventory(self.device)
+
+    def test_get_config(self):
+        result = self.inventory.get_config()
+
+        self.assertEqual(sorted(result.keys()), ['flash:', 'slot2#flash:', 'slot2#usba0:'])
+        self.assertEqual(result['flash:']['total'], 1048576000)
+        self.assertEqual(result['flash:']['free'], 142204000)
+        self.assertEqual(len(result['flash:']['files']), 8)
+        self.assertEqual(result['flash:']['files'][0]['name'], 'diagfile')
+        self.assertTrue(result['flash:']['files'][0]['is_dir'])
+        self.assertEqual(result['slot2#flash:']['files'][1]['size'], 76920832)
+        self.device.cli_display.assert_called_once_with('dir /all-filesystems')
+
+    def test_get_config_cached(self):
+        self.inventory.get_config()
+        self.inventory.get_config()
+        self.assertEqual(self.device.cli_display.call_count, 1)
+
+        self.device.config_version = 1
+        self.inventory.get_config()
+        self.assertEqual(self.device.cli_display.call_count, 2)
+
+        self.inventory.invalidate()
+        self.inventory.get_config()
+        self.assertEqual(self.device.cli_display.call_count, 3)
+
+    def test_plan_enough_space(self):
+        result = self.inventory.plan(100000000)
+
+        self.assertEqual(sorted(result.keys()), ['flash:', 'slot2#flash:'])
+        self.assertTrue(all(plan['enough'] for plan in result.values()))
+        self.assertEqual(result['flash:']['delete'], [])
+        self.assertFalse(self.device.get.called)
+
+    def test_plan(self):
+        result = self.inventory.plan(200000000)
+
+        self.assertEqual(result['flash:']['needed'], 57796000)
+        self.assertEqual(result['flash:']['delete'], ['flash:/5900_5920_5930-CMW710-R2208.ipe'])
+        self.assertTrue(result['flash:']['enough'])
+        self.assertEqual(result['slot2#flash:']['delete'], [])
+
+        result = self.inventory.plan(200000000, filesystems=['flash:'],
+                                     keep=['5900_5920_5930-CMW710-R2208.ipe'])
+        self.assertEqual(result['flash:']['delete'], ['flash:/5930-cmw710-boot-r2311.bin',
+                                                      'flash:/5930-cmw710-system-r2311.bin'])
+        self.assertTrue(result['flash:']['enough'])
+
+    def test_plan_not_enough(self):
+        result = self.inventory.plan(500000000, filesystems=['flash:'])
+
+        self.assertEqual(len(result['flash:']['delete']), 3)
+        self.assertFalse(result['flash:']['enough'])
+        for path in result['flash:']['delete']:
+            self.assertNotIn('e2415', path)
+
+    def test_plan_many(self):
+        other = mock.Mock(host='switch2')
+        other.cli_display.side_effect = NCError
+
+        result = FileSystemInventory.plan_many([self.device, other], 200000000)
+
+        self.assertEqual(result['switch1']['flash:']['delete'],
+                         ['flash:/5900_5920_5930-CMW710-R2208.ipe'])
+        self.assertIsInstance(result['switch2'], NCError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import mock
+from tempfile import NamedTemporaryFile
+
+from pyhpecw7.features.fleet_copy import FleetCopy, TokenBucket
+from pyhpecw7.features.errors import FileTransferError
+from base_feature_test import BaseFeatureCase
+
+
+class FleetCopyTestCase(BaseFeatureCase):
+
+    def setUp(self):
+        self.src = NamedTemporaryFile()
+        self.src.write('x' * 1000)
+        self.src.flush()
+        self.devices = [self.mock_device(host) for host in ('sw1', 'sw2', 'sw3', 'sw4')]
+        self.fleet_copy = FleetCopy(self.devices, self.src.name, workers=2)
+
+    def tearDown(self):
+        self.src.close()
+
+    def _file_copies(self, mock_file_copy):
+        file_copies = {}
+
+        def _create(device, src, dst=None, port=22, state_dir=None):
+            file_copy = file_copies.setdefault(device.host, mock.MagicMock())
+            file_copy.remote_dir_exists = True
+            file_copy.file_already_exists.return_value = device.host == 'sw1'
+            file_copy._get_flash_size.return_value = 10 if device.host == 'sw2' else 10000
+            if device.host == 'sw4':
+                file_copy.transfer_file.side_effect = FileTransferError
+
+            def _transfer(progress, **kwargs):
+                progress(500, 1000, 5000.0)
+                progress(1000, 1000, 5000.0)
+            if device.host != 'sw4':
+                file_copy.transfer_file.side_effect = _transfer
+            return file_copy
+
+        mock_file_copy.side_effect = _create
+        return file_copies
+
+    def test_init(self):
+        self.assertEqual(self.fleet_copy.size, 1000)
+        self.assertEqual(self.fleet_copy.results['sw1'],
+                         dict(status='pending', sent=0, size=1000, rate=0.0, error=None))
+
+    @mock.patch('pyhpecw7.features.fleet_copy.FileCopy')
+    def test_check(self, mock_file_copy):
+        self._file_copies(mock_file_copy)
+
+        results = self.fleet_copy.check()
+
+        self.assertEqual(dict((host, result['status']) for host, result in results.items()),
+                         {'sw1': 'skipped', 'sw2': 'no_space', 'sw3': 'ready', 'sw4': 'ready'})
+
+    @mock.patch('pyhpecw7.features.fleet_copy.FileCopy')
+    def test_transfer(self, mock_file_copy):
+        file_copies = self._file_copies(mock_file_copy)
+        progress = mock.MagicMock()
+
+        results = self.fleet_copy.transfer(progress=progress, reuse_transport=True)
+
+        self.assertEqual(dict((host, result['status']) for host, result in results.items()),
+                         {'sw1': 'skipped', 'sw2': 'no_space', 'sw3': 'done', 'sw4': 'failed'})
+        self.assertEqual(results['sw3']['sent'], 1000)
+        self.assertEqual(results['sw3']['rate'], 5000.0)
+        self.assertIn('error', results['sw4']['error'])
+
+        self.assertFalse(file_copies['sw1'].transfer_file.called)
+        self.assertFalse(file_copies['sw2'].transfer_file.called)
+        file_copies['sw3'].transfer_file.assert_called_with(
+            progress=mock.ANY, safety_checks=False, reuse_transport=True)
+        progress.assert_any_call('sw3', 1000, 1000, 5000.0)
+
+    @mock.patch('pyhpecw7.features.fleet_copy.FileCopy')
+    def test_transfer_site_cap(self, mock_file_copy):
+        self._file_copies(mock_file_copy)
+        fleet_copy = FleetCopy(self.devices, self.src.name, sites={'sw3': 'dc1'},
+                               site_rates={'dc1': 1000}, max_rate=10**6)
+
+        with mock.patch.object(fleet_copy, '_site_buckets', {'dc1': mock.MagicMock()}):
+            fleet_copy.transfer()
+            fleet_copy._site_buckets['dc1'].consume.assert_has_calls([mock.call(500), mock.call(500)])
+
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    @mock.patch('pyhpecw7.features.fleet_copy.time')
+    def test_consume(self, mock_time):
+        mock_time.time.return_value = 100.0
+        bucket = TokenBucket(1000)
+
+        bucket.consume(1000)
+        self.assertFalse(mock_time.sleep.called)
+
+        def _sleep(seconds):
+            mock_time.time.return_value += seconds
+        mock_time.sleep.side_effect = _sleep
+
+        bucket.consume(500)
+        mock_time.sleep.assert_called_once_with(0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
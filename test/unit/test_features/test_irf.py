@@ -2,6 +2,7 @@ import unittest
 import mock
 
 from pyhpecw7.features.irf import IrfPort, IrfMember, InterfaceAbsentError, IRFMemberDoesntExistError
+from pyhpecw7.features.running_config import RunningConfig
 from base_feature_test import BaseFeatureCase
 
 class IrfTestCase(BaseFeatureCase):
@@ -128,10 +129,11 @@ class IrfTestCase(BaseFeatureCase):
         self.assertTrue(result)
 
     def test_member_get_mad_exclude(self):
-        self.device.cli_display.return_value = '<HP1>display current | inc "mad exclude interface"\r\n mad exclude interface FortyGigE1/0/9\r\n mad exclude interface FortyGigE1/0/10\r\n'
+        self.device.running_config = RunningConfig(self.device)
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
         result = self.irf_member._get_mad_exclude()
 
-        self.device.cli_display.assert_called_with('display current | inc "mad exclude interface"')
+        self.device.cli_display.assert_called_with('display current-configuration')
         self.assertEqual(result, {'mad_exclude': ['FortyGigE1/0/9', 'FortyGigE1/0/10']})
 
     @mock.patch('pyhpecw7.features.irf.Interface')
@@ -52,7 +52,7 @@ class PingTestCase(BaseFeatureCase):
 
         expected = {
             'payload_length': '56',
-            'max': '8',
+            'max': '11',
             'packets_rx': '5',
             'detailed_response': [
                 {
@@ -78,12 +78,75 @@ class PingTestCase(BaseFeatureCase):
             ],
             'loss_rate': '0',
             'host': '8.8.8.8',
-            'min': '8',
+            'min': '7',
             'packets_tx': '5',
-            'avg': '8'
+            'avg': '8',
+            'avg_us': '8549'
         }
 
         self.assertEqual(result, expected)
+        self.assertEqual(list(ping.rtts), [8061, 7716, 7839, 7791, 11339])
+
+    @mock.patch.object(Ping, '_ping')
+    def test_build_response_no_detail(self, mock_ping):
+        ping = Ping(self.device, TARGET)
+        result = ping._build_response(self.read_action_reply_xml('ping'))
+
+        self.assertNotIn('detailed_response', result)
+        self.assertEqual(result['avg'], '8')
+        self.assertEqual(len(ping.rtts), 5)
+
+    def _rpc(self, reply=None, error=None, done=True):
+        rpc = mock.Mock()
+        rpc.event.wait.return_value = done
+        rpc.error = error
+        rpc.reply = reply or self.read_action_reply_xml('ping')
+        return rpc
+
+    def test_many(self):
+        self.device.timeout = 30
+        self.device.connection.action.side_effect = [
+            self._rpc(), self._rpc(error='session closed'), self._rpc(done=False)]
+        completed = []
+
+        result = Ping.many(self.device, ['8.8.8.8', '8.8.4.4', '1.1.1.1', '1.2.3'],
+                           concurrency=2, callback=lambda host, rsp: completed.append(host))
+
+        self.assertEqual(result['8.8.8.8']['packets_rx'], '5')
+        self.assertEqual(result['8.8.4.4'], {'host': '8.8.4.4', 'error': 'session closed'})
+        self.assertIn('timed out', result['1.1.1.1']['error'])
+        self.assertIn('error', result['1.2.3'])
+        self.assertEqual(completed, ['8.8.8.8', '8.8.4.4', '1.2.3', '1.1.1.1'])
+        self.assertEqual(self.device.connection.action.call_count, 3)
+        self.assertEqual(self.device.connection.async_mode, False)
+
+        hosts = [call[0][0].findtext('.//{*}Host')
+                 for call in self.device.connection.action.call_args_list]
+        self.assertEqual(hosts, ['8.8.8.8', '8.8.4.4', '1.1.1.1'])
+
+    def test_many_not_pipelined(self):
+        self.device.connection.action.side_effect = UserWarning
+        self.device.action.return_value = self.read_action_reply_xml('ping')
+
+        result = Ping.many(self.device, ['8.8.8.8', '8.8.4.4'])
+
+        self.assertEqual(sorted(result.keys()), ['8.8.4.4', '8.8.8.8'])
+        self.assertEqual(self.device.action.call_count, 2)
+
+    @mock.patch.object(Ping, '_open_session')
+    def test_many_sessions(self, mock_open_session):
+        session = mock.MagicMock()
+        mock_open_session.return_value = session
+        for device in (self.device, session):
+            device.timeout = 30
+            device.connection.action.side_effect = lambda top: self._rpc()
+
+        result = Ping.many(self.device, ['8.8.8.8', '8.8.4.4', '1.1.1.1'], sessions=2)
+
+        self.assertEqual(len(result), 3)
+        self.assertEqual(self.device.connection.action.call_count, 2)
+        self.assertEqual(session.connection.action.call_count, 1)
+        session.close.assert_called_with()
 
     @mock.patch.object(Ping, '_ping')
     def test_param_check(self, mock_ping):
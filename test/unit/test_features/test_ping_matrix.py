@@ -0,0 +1,88 @@
+import unittest
+import mock
+import math
+import os
+import shutil
+from tempfile import mkdtemp
+
+from pyhpecw7.features.ping_matrix import PingMatrix
+from base_feature_test import BaseFeatureCase
+
+TARGETS = ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+
+RESPONSES = {
+    ('sw1', ''): {'10.0.0.1': {'loss_rate': '0', 'avg': '0', 'avg_us': '250'},
+                  '10.0.0.2': {'loss_rate': '0', 'avg': '9', 'avg_us': '9000'},
+                  '10.0.0.3': {'loss_rate': '40', 'avg': '4', 'avg_us': '4000'}},
+    ('sw1', 'mgmt'): {'10.0.0.1': {'loss_rate': '100'},
+                      '10.0.0.2': {'host': '10.0.0.2', 'error': 'timed out'},
+                      '10.0.0.3': {'loss_rate': '0', 'avg': '1', 'avg_us': '1000'}},
+}
+
+
+def _many(device, targets, vrf='', callback=None, **kwargs):
+    if device.host == 'sw2':
+        raise ValueError('not connected')
+    for target in targets:
+        callback(target, RESPONSES[(device.host, vrf)][target])
+
+
+class PingMatrixTestCase(BaseFeatureCase):
+
+    def setUp(self):
+        self.sw1 = self.mock_device('sw1')
+        self.sw2 = self.mock_device('sw2')
+        self.matrix = PingMatrix([self.sw1, (self.sw1, 'mgmt'), self.sw2], TARGETS,
+                                 concurrency=4)
+
+    def test_init(self):
+        self.assertEqual(self.matrix.sources, ['sw1', 'sw1/mgmt', 'sw2'])
+        self.assertEqual(len(self.matrix.loss), 9)
+        self.assertEqual(self.matrix.loss.itemsize, 4)
+        self.assertTrue(math.isnan(self.matrix.rtt[0]))
+
+    @mock.patch('pyhpecw7.features.ping_matrix.Ping')
+    def test_run(self, mock_ping):
+        mock_ping.many.side_effect = _many
+
+        self.matrix.run()
+
+        self.assertEqual(self.matrix.get('sw1', '10.0.0.2'), (0.0, 9.0))
+        self.assertEqual(self.matrix.get('sw1/mgmt', '10.0.0.3'), (0.0, 1.0))
+        self.assertEqual(self.matrix.get('sw1', '10.0.0.1'), (0.0, 0.25))
+        self.assertEqual(self.matrix.errors[('sw1/mgmt', '10.0.0.2')], 'timed out')
+        self.assertEqual(self.matrix.errors[('sw2', '10.0.0.1')], 'not connected')
+        mock_ping.many.assert_any_call(self.sw1, TARGETS, vrf='mgmt', callback=mock.ANY,
+                                       concurrency=4)
+
+        failed = [(source, target) for source, target, loss in self.matrix.failed()]
+        self.assertEqual(failed, [('sw1', '10.0.0.3'), ('sw1/mgmt', '10.0.0.1'),
+                                  ('sw1/mgmt', '10.0.0.2'), ('sw2', '10.0.0.1'),
+                                  ('sw2', '10.0.0.2'), ('sw2', '10.0.0.3')])
+        self.assertEqual(len(self.matrix.failed(max_loss=50)), 5)
+
+        self.assertEqual(self.matrix.worst_rtt(), {'sw1': ('10.0.0.2', 9.0),
+                                                   'sw1/mgmt': ('10.0.0.3', 1.0),
+                                                   'sw2': None})
+
+    @mock.patch('pyhpecw7.features.ping_matrix.Ping')
+    def test_save_load(self, mock_ping):
+        mock_ping.many.side_effect = _many
+        self.matrix.run()
+        tmp = mkdtemp()
+        try:
+            path = os.path.join(tmp, 'matrix.json')
+            self.matrix.save(path)
+            loaded = PingMatrix.load(path)
+        finally:
+            shutil.rmtree(tmp)
+
+        self.assertEqual(loaded.sources, self.matrix.sources)
+        self.assertEqual(loaded.targets, TARGETS)
+        self.assertEqual(loaded.get('sw1', '10.0.0.2'), (0.0, 9.0))
+        self.assertEqual(loaded.errors, self.matrix.errors)
+        self.assertEqual(loaded.failed(), self.matrix.failed())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,21 @@
 import unittest
 import mock
 
-from pyhpecw7.features.portchannel import Portchannel, InvalidPortType, AggregationGroupError
+from pyhpecw7.features.portchannel import Portchannel, PortchannelInventory,\
+    InvalidPortType, AggregationGroupError, InterfaceAbsentError
+from pyhpecw7.features.running_config import RunningConfig
 from base_feature_test import BaseFeatureCase
 
 R_GROUP_ID = '101'
 B_GROUP_ID = '100'
 
+PORTCHANNELS = [
+    dict(groupid='100', pc_type='bridged', members=['FortyGigE1/0/1', 'fortygige1/0/4'],
+         min_ports='2', max_ports='4'),
+    dict(groupid='1', pc_type='routed', members=[]),
+    dict(groupid='200', pc_type='bridged', members=['FortyGigE1/0/2'], mode='dynamic'),
+]
+
 class PortChannelTestCase(BaseFeatureCase):
 
     @mock.patch('pyhpecw7.comware.HPCOM7')
@@ -238,6 +247,38 @@ class PortChannelTestCase(BaseFeatureCase):
 
         self.assert_config_request(expected_call)
 
+    @mock.patch.object(Portchannel, 'get_index_from_interface')
+    def test_build_config_bitmap(self, mock_index_from_iface):
+        index_list = ['1', '5']
+        def mock_index_gen(interface):
+            return index_list.pop(0)
+
+        mock_index_from_iface.side_effect = mock_index_gen
+
+        expected_call = self.read_config_xml('portchannel_bitmap')
+        self.bpc._build_config('present', members=['FortyGigE1/0/1', 'FortyGigE1/0/2'], members_as_bitmap=True)
+
+        self.assert_config_request(expected_call)
+
+    def test_build_config_bitmap_members_to_remove(self):
+        self.bpc.members_to_remove = ['FortyGigE1/0/3']
+
+        with self.assertRaises(ValueError):
+            self.bpc._build_config('present', members=['FortyGigE1/0/1'], members_as_bitmap=True)
+
+        self.assertFalse(self.device.edit_config.called)
+
+    @mock.patch.object(Portchannel, 'get_index_from_interface')
+    def test_get_bitmap_from_members(self, mock_index_from_iface):
+        index_list = ['5', '1']
+        def mock_index_gen(interface):
+            return index_list.pop(0)
+
+        mock_index_from_iface.side_effect = mock_index_gen
+
+        result = self.bpc._get_bitmap_from_members(['FortyGigE1/0/2', 'FortyGigE1/0/1'])
+        self.assertEqual(result, 'iA==')
+
     def test_build_config_no_members(self):
         expected_call = self.read_config_xml('portchannel_no_members')
         self.bpc._build_config('present')
@@ -287,5 +328,147 @@ class PortChannelTestCase(BaseFeatureCase):
             self.bpc.param_check(members=['FortyGigE1/0/1'])
 
 
+class PortChannelRunningConfigTestCase(BaseFeatureCase):
+
+    @mock.patch('pyhpecw7.comware.HPCOM7')
+    def setUp(self, mock_device):
+        self.device = mock_device
+        self.device.running_config = RunningConfig(self.device)
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
+
+    def test_get_selected_port_min_max(self):
+        portchannel = Portchannel(self.device, B_GROUP_ID, 'bridged')
+
+        self.assertEqual(portchannel.get_selected_port_min(), '2')
+        self.assertEqual(portchannel.get_selected_port_max(), '8')
+
+        routed = Portchannel(self.device, '1', 'routed')
+        self.assertIsNone(routed.get_selected_port_min())
+        self.assertIsNone(routed.get_selected_port_max())
+
+        self.device.cli_display.assert_called_once_with('display current-configuration')
+
+
+class PortChannelInventoryTestCase(BaseFeatureCase):
+
+    @mock.patch('pyhpecw7.comware.HPCOM7')
+    def setUp(self, mock_device):
+        self.device = mock_device
+        self.device.running_config = RunningConfig(self.device)
+        self.inventory = PortchannelInventory(self.device)
+
+    def test_get_config(self):
+        expected_get, get_reply = self.xml_get_and_reply('portchannel_inventory')
+        self.device.get.return_value = get_reply
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
+
+        expected = {
+            'Bridge-Aggregation100': {
+                'groupid': '100',
+                'nc_groupid': '100',
+                'pc_type': 'bridged',
+                'pc_index': '33736',
+                'mode': 'static',
+                'lacp_edge': 'disabled',
+                'members': ['FortyGigE1/0/1', 'FortyGigE1/0/2'],
+                'lacp_modes_by_interface': [
+                    {'interface': 'FortyGigE1/0/1', 'lacp_mode': 'active'},
+                    {'interface': 'FortyGigE1/0/2', 'lacp_mode': 'passive'}
+                ],
+                'min_ports': '2',
+                'max_ports': '8'
+            },
+            'Route-Aggregation1': {
+                'groupid': '1',
+                'nc_groupid': '16385',
+                'pc_type': 'routed',
+                'pc_index': '33737',
+                'mode': 'dynamic',
+                'lacp_edge': 'disabled',
+                'members': ['FortyGigE1/0/3'],
+                'lacp_modes_by_interface': [
+                    {'interface': 'FortyGigE1/0/3', 'lacp_mode': 'active'}
+                ],
+                'min_ports': None,
+                'max_ports': None
+            }
+        }
+
+        result = self.inventory.get_config()
+
+        self.assertEqual(result, expected)
+        self.assert_get_request(expected_get)
+        self.assertEqual(self.device.get.call_count, 1)
+        self.device.cli_display.assert_called_once_with('display current-configuration')
+
+        self.assertEqual(self.inventory.member_groups,
+                         {'FortyGigE1/0/1': '100', 'FortyGigE1/0/2': '100', 'FortyGigE1/0/3': '16385'})
+        self.assertEqual(self.inventory.iface_map['33737'], 'Route-Aggregation1')
+
+
+class PortChannelBuildManyTestCase(BaseFeatureCase):
+
+    @mock.patch('pyhpecw7.comware.HPCOM7')
+    def setUp(self, mock_device):
+        self.device = mock_device
+        self.device.running_config = RunningConfig(self.device)
+        self.device.get.return_value = self.read_get_reply_xml('portchannel_inventory')
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
+
+    def test_build_many(self):
+        self.device.execute.side_effect = lambda func: func()
+        expected_config = self.read_config_xml('portchannel_build_many')
+        expected_cmds = ['interface Bridge-Aggregation 100', 'link-aggregation selected-port maximum 4']
+
+        result = Portchannel.build_many(self.device, PORTCHANNELS)
+
+        self.assertEqual(self.device.get.call_count, 1)
+        self.assertEqual(self.device.cli_display.call_count, 1)
+        self.assert_config_request(expected_config)
+        self.device.cli_config.assert_called_once_with(expected_cmds)
+        self.assertEqual(result, [self.device.edit_config.return_value, self.device.cli_config.return_value])
+
+    def test_build_many_stage(self):
+        expected_config = self.read_config_xml('portchannel_build_many')
+        expected_cmds = ['interface Bridge-Aggregation 100', 'link-aggregation selected-port maximum 4']
+
+        Portchannel.build_many(self.device, PORTCHANNELS, stage=True)
+
+        self.assertEqual(self.device.stage_config.call_count, 2)
+        config_call, cli_call = self.args_in_all_mock_calls(self.device.stage_config)
+        self.assertEqual(config_call[1], 'edit_config')
+        self.assert_elements_equal(config_call[0], expected_config)
+        self.assertEqual(cli_call, (expected_cmds, 'cli_config'))
+
+    @mock.patch('pyhpecw7.features.portchannel.Interface')
+    def test_build_many_absent_member(self, mock_iface):
+        mock_iface.return_value.iface_index = ''
+
+        with self.assertRaises(InterfaceAbsentError):
+            Portchannel.build_many(self.device, [dict(groupid='100', pc_type='bridged', members=['FortyGigE9/0/9'])])
+
+    def test_build_many_no_change(self):
+        portchannels = [
+            dict(groupid='100', pc_type='bridged', members=['FortyGigE1/0/1', 'FortyGigE1/0/2'],
+                 mode='static', min_ports='2', max_ports='8'),
+            dict(groupid='1', pc_type='routed', members=['FortyGigE1/0/3'], lacp_edge='disabled'),
+        ]
+
+        result = Portchannel.build_many(self.device, portchannels)
+
+        self.assertIsNone(result)
+        self.assertFalse(self.device.execute.called)
+        self.assertFalse(self.device.stage_config.called)
+
+    def test_build_many_member_of_other_group(self):
+        with self.assertRaises(AggregationGroupError):
+            Portchannel.build_many(self.device, [
+                dict(groupid='200', pc_type='bridged', members=['FortyGigE1/0/3']),
+                dict(groupid='1', pc_type='routed', mode='dynamic')])
+
+        self.assertFalse(self.device.execute.called)
+        self.assertFalse(self.device.stage_config.called)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import mock
+import shutil
+import tempfile
+import os
+
+from pyhpecw7.features.provision import Provision
+from pyhpecw7.features.running_config import RunningConfig
+from base_feature_test import BaseFeatureCase
+
+MODEL = {
+    'sysname': 'leaf1',
+    'globals': ['lldp global enable'],
+    'vlans': {'100': {'name': 'web'}, '20': {}},
+    'interfaces': {
+        'FortyGigE1/0/10': {'commands': ['port link-mode bridge']},
+        'FortyGigE1/0/2': {'description': 'uplink', 'admin': 'down',
+                           'commands': ['port link-mode bridge']},
+    },
+    'sections': [('line vty 0 63', ['authentication-mode scheme'])],
+}
+
+RENDERED = """#
+ sysname leaf1
+#
+ lldp global enable
+#
+vlan 20
+#
+vlan 100
+ name web
+#
+interface FortyGigE1/0/2
+ description uplink
+ port link-mode bridge
+ shutdown
+#
+interface FortyGigE1/0/10
+ port link-mode bridge
+#
+line vty 0 63
+ authentication-mode scheme
+#
+return
+"""
+
+
+class ProvisionTestCase(BaseFeatureCase):
+
+    @mock.patch('pyhpecw7.comware.HPCOM7')
+    def setUp(self, mock_device):
+        self.device = mock_device
+        self.device.running_config = RunningConfig(self.device)
+        self.local_dir = tempfile.mkdtemp()
+        self.provision = Provision(self.device, MODEL, local_dir=self.local_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.local_dir)
+
+    def test_init(self):
+        self.assertEqual(self.provision.filename, 'provision.cfg')
+        self.assertEqual(self.provision.local_path, os.path.join(self.local_dir, 'provision.cfg'))
+        self.assertEqual(self.provision.port, 22)
+
+    def test_init_default_local_path(self):
+        self.device.host = 'fe80::1'
+        provision = Provision(self.device, MODEL)
+
+        self.assertEqual(provision.filename, 'provision.cfg')
+        self.assertEqual(provision.local_path,
+                         os.path.join(tempfile.gettempdir(), 'fe80__1-provision.cfg'))
+
+    def test_render(self):
+        self.assertEqual(self.provision.render(), RENDERED)
+
+    @mock.patch('pyhpecw7.features.provision.Config')
+    @mock.patch('pyhpecw7.features.provision.FileCopy')
+    def test_build(self, mock_file_copy, mock_config):
+        self.device.cli_display.return_value = RENDERED.replace(' name web\n', '')
+        mock_file_copy.return_value.file_already_exists.return_value = False
+
+        result = self.provision.build()
+        expected = dict(diffs=[{'section': 'vlan 100', 'add': ['name web'], 'remove': []}],
+                        transferred=True,
+                        responses=mock_config.return_value.build.return_value)
+
+        self.assertEqual(result, expected)
+        with open(self.provision.local_path) as config_file:
+            self.assertEqual(config_file.read(), RENDERED)
+
+        mock_file_copy.assert_called_with(self.device, self.provision.local_path,
+                                          dst='provision.cfg', port=22)
+        mock_file_copy.return_value.transfer_file.assert_called_with(hostname=None, username=None, password=None)
+        mock_config.assert_called_with(self.device, self.provision.local_path)
+        mock_config.return_value.build.assert_called_with(stage=False)
+
+    @mock.patch('pyhpecw7.features.provision.Config')
+    @mock.patch('pyhpecw7.features.provision.FileCopy')
+    def test_build_file_exists(self, mock_file_copy, mock_config):
+        self.device.cli_display.return_value = RENDERED.replace(' name web\n', '')
+        mock_file_copy.return_value.file_already_exists.return_value = True
+
+        result = self.provision.build(stage=True)
+
+        self.assertFalse(result['transferred'])
+        self.assertFalse(mock_file_copy.return_value.transfer_file.called)
+        mock_config.return_value.build.assert_called_with(stage=True)
+
+    @mock.patch('pyhpecw7.features.provision.Config')
+    @mock.patch('pyhpecw7.features.provision.FileCopy')
+    def test_build_no_changes(self, mock_file_copy, mock_config):
+        self.device.cli_display.return_value = RENDERED
+
+        result = self.provision.build()
+
+        self.assertEqual(result, dict(diffs=[], transferred=False, responses=None))
+        self.assertFalse(mock_file_copy.called)
+        self.assertFalse(mock_config.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,6 +19,16 @@ class RebootTestCase(BaseFeatureCase):
         self.reboot.build(stage=True, reboot=True)
         self.device.stage_config.assert_called_with(['reboot force'], 'cli_display')
 
+    def test_build_wait(self):
+        self.reboot.build(reboot=True, wait=True, expected_os='7.1.045')
+        self.device.reboot.assert_called_with()
+        self.device.wait_for_reboot.assert_called_with(timeout=900, expected_os='7.1.045')
+        self.assertFalse(self.device.cli_display.called)
+
+        self.reboot.build(reboot=True, delay='20', wait=True)
+        self.device.cli_display.assert_called_with(['scheduler reboot delay 20'])
+        self.assertEqual(self.device.wait_for_reboot.call_count, 1)
+
     def test_build_delay(self):
         self.reboot.build(reboot=True, delay='20')
         self.device.cli_display.assert_called_with(['scheduler reboot delay 20'])
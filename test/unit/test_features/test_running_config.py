@@ -0,0 +1,45 @@
+import unittest
+import mock
+
+from pyhpecw7.features.running_config import RunningConfig
+from base_feature_test import BaseFeatureCase
+
+
+class RunningConfigTestCase(BaseFeatureCase):
+
+    @mock.patch('pyhpecw7.comware.HPCOM7')
+    def setUp(self, mock_device):
+        self.device = mock_device
+        self.device.config_version = 0
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
+        self.running_config = RunningConfig(self.device)
+
+    def test_single_fetch(self):
+        self.assertEqual(self.running_config.interface('vlan100').text, 'interface Vlan-interface100')
+        self.assertEqual(self.running_config.section('vlan 100').children[0].text, 'name servers')
+        self.assertEqual(self.running_config.find_global('tunnel global source-address'),
+                         ['tunnel global source-address 10.10.10.10'])
+        self.assertEqual([line.text for line in self.running_config.interfaces('Bridge-Aggregation')],
+                         ['interface Bridge-Aggregation100'])
+
+        self.device.cli_display.assert_called_once_with('display current-configuration')
+
+    def test_refresh_after_write(self):
+        self.assertIsNotNone(self.running_config.interface('Tunnel20'))
+
+        self.device.config_version = 1
+        self.device.cli_display.return_value = '<HP1>display current-configuration\n#\nreturn\n'
+
+        self.assertIsNone(self.running_config.interface('Tunnel20'))
+        self.assertEqual(self.device.cli_display.call_count, 2)
+
+    def test_invalidate(self):
+        self.running_config.tree
+        self.running_config.invalidate()
+        self.running_config.tree
+
+        self.assertEqual(self.device.cli_display.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+import mock
+import os
+import shutil
+from tempfile import mkdtemp
+
+from pyhpecw7.features.upgrade import Upgrade
+from base_feature_test import BaseFeatureCase
+
+HEALTH = {'os': '7.1.045', 'neighbors': 2, 'interfaces_up': 10}
+
+
+class UpgradeTestCase(BaseFeatureCase):
+
+    def setUp(self):
+        self.tmp = mkdtemp()
+        self.checkpoint = os.path.join(self.tmp, 'upgrade.json')
+        self.devices = [self.mock_device(host) for host in ('sw1', 'sw2', 'sw3', 'sw4')]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _transfer(self, statuses=None):
+        statuses = statuses or {}
+
+        def _fleet_copy(devices, src, **kwargs):
+            fleet_copy = mock.Mock()
+            fleet_copy.transfer.return_value = dict(
+                (device.host, dict(status=statuses.get(device.host, 'done'), error=None))
+                for device in devices)
+            return fleet_copy
+        return _fleet_copy
+
+    def test_waves(self):
+        upgrade = Upgrade(self.devices, ipe='/tmp/new.ipe', wave_size=2,
+                          groups=[['sw1', 'sw2'], ['sw3', 'sw4']])
+
+        waves = [[device.host for device in wave] for wave in upgrade.waves()]
+        self.assertEqual(waves, [['sw1', 'sw3'], ['sw2', 'sw4']])
+
+        upgrade.wave_size = 3
+        upgrade.groups = [['sw1', 'sw2', 'sw3']]
+        waves = [[device.host for device in wave] for wave in upgrade.waves()]
+        self.assertEqual(waves, [['sw1', 'sw4'], ['sw2'], ['sw3']])
+
+    @mock.patch('pyhpecw7.features.upgrade.FleetCopy')
+    def test_stage(self, mock_fleet_copy):
+        mock_fleet_copy.side_effect = self._transfer({'sw2': 'no_space'})
+        upgrade = Upgrade(self.devices, boot='/tmp/boot.bin', system='/tmp/system.bin')
+
+        result = upgrade.stage()
+
+        self.assertEqual(result['sw1']['status'], 'staged')
+        self.assertEqual(result['sw2']['status'], 'failed')
+        self.assertEqual(result['sw2']['error'], 'no_space')
+        self.assertEqual(mock_fleet_copy.call_count, 2)
+        self.assertEqual(len(mock_fleet_copy.call_args_list[1][0][0]), 3)
+
+    @mock.patch.object(Upgrade, 'health')
+    @mock.patch('pyhpecw7.features.upgrade.InstallOs')
+    @mock.patch('pyhpecw7.features.upgrade.FleetCopy')
+    def test_run_and_resume(self, mock_fleet_copy, mock_install_os, mock_health):
+        mock_fleet_copy.side_effect = self._transfer()
+        mock_health.return_value = HEALTH
+        upgrade = Upgrade(self.devices, ipe='/tmp/new.ipe', checkpoint=self.checkpoint,
+                          expected_os='7.1.070')
+
+        result = upgrade.run()
+
+        self.assertEqual(set(r['status'] for r in result.values()), set(['upgraded']))
+        mock_install_os.return_value.build.assert_called_with('ipe', ipe='flash:/new.ipe')
+        for device in self.devices:
+            device.reboot.assert_called_with(wait=True, timeout=900, expected_os='7.1.070')
+
+        upgrade = Upgrade(self.devices, ipe='/tmp/new.ipe', checkpoint=self.checkpoint)
+        self.assertEqual(upgrade.results['sw1']['status'], 'upgraded')
+        upgrade.run()
+
+        self.assertEqual(mock_fleet_copy.call_count, 1)
+        self.assertEqual(self.devices[0].reboot.call_count, 1)
+
+        upgrade = Upgrade(self.devices, ipe='/tmp/newer.ipe', checkpoint=self.checkpoint)
+        self.assertEqual(upgrade.results['sw1']['status'], 'pending')
+
+    @mock.patch.object(Upgrade, 'health')
+    @mock.patch('pyhpecw7.features.upgrade.InstallOs')
+    @mock.patch('pyhpecw7.features.upgrade.FleetCopy')
+    def test_resume_after_reboot(self, mock_fleet_copy, mock_install_os, mock_health):
+        mock_health.return_value = HEALTH
+        upgrade = Upgrade(self.devices[:1], ipe='/tmp/new.ipe', checkpoint=self.checkpoint,
+                          expected_os='7.1.070')
+        upgrade._set('sw1', status='boot_set', baseline=HEALTH)
+
+        self.devices[0].connected = True
+        self.devices[0].facts = {'os': '7.1.070'}
+        upgrade = Upgrade(self.devices[:1], ipe='/tmp/new.ipe', checkpoint=self.checkpoint,
+                          expected_os='7.1.070')
+        result = upgrade.run()
+
+        self.assertEqual(result['sw1']['status'], 'upgraded')
+        self.assertFalse(mock_fleet_copy.called)
+        self.assertFalse(mock_install_os.called)
+        self.assertFalse(self.devices[0].reboot.called)
+
+    @mock.patch.object(Upgrade, 'health')
+    @mock.patch('pyhpecw7.features.upgrade.InstallOs')
+    @mock.patch('pyhpecw7.features.upgrade.FleetCopy')
+    def test_run_stops_after_failed_wave(self, mock_fleet_copy, mock_install_os, mock_health):
+        mock_fleet_copy.side_effect = self._transfer()
+        unhealthy = dict(HEALTH, neighbors=1)
+        mock_health.side_effect = lambda device: unhealthy if device.reboot.called else HEALTH
+        upgrade = Upgrade(self.devices, ipe='/tmp/new.ipe', wave_size=2, health_timeout=0)
+
+        result = upgrade.run()
+
+        self.assertEqual(result['sw1']['status'], 'failed')
+        self.assertIn('not healthy', result['sw1']['error'])
+        self.assertEqual(result['sw3']['status'], 'staged')
+        self.assertFalse(self.devices[2].reboot.called)
+
+    @mock.patch.object(Upgrade, 'health')
+    @mock.patch('pyhpecw7.features.upgrade.InstallOs')
+    @mock.patch('pyhpecw7.features.upgrade.FleetCopy')
+    def test_run_skips_failed_stage(self, mock_fleet_copy, mock_install_os, mock_health):
+        mock_fleet_copy.side_effect = self._transfer({'sw2': 'no_space'})
+        mock_health.return_value = HEALTH
+        upgrade = Upgrade(self.devices, ipe='/tmp/new.ipe', dst='flash:/images/new.ipe')
+
+        self.assertEqual(len(sum(upgrade.waves(), [])), 4)
+        result = upgrade.run()
+
+        self.assertEqual(result['sw2']['status'], 'failed')
+        self.assertFalse(self.devices[1].reboot.called)
+        self.assertNotIn(self.devices[1], sum(upgrade.waves(), []))
+        for host in ('sw1', 'sw3', 'sw4'):
+            self.assertEqual(result[host]['status'], 'upgraded')
+        mock_install_os.return_value.build.assert_called_with(
+            'ipe', ipe='flash:/images/new.ipe')
+
+    def test_dst_with_bootsys(self):
+        with self.assertRaises(ValueError):
+            Upgrade(self.devices, boot='/tmp/boot.bin', system='/tmp/system.bin',
+                    dst='flash:/boot.bin')
+
+    @mock.patch('pyhpecw7.features.upgrade.Neighbors')
+    def test_health(self, mock_neighbors):
+        device = self.devices[0]
+        device.get.return_value = self.read_get_reply_xml('upgrade_interfaces')
+        device.facts = {'os': '7.1.045'}
+        mock_neighbors.return_value.lldp = [{}, {}, {}]
+
+        result = Upgrade(self.devices, ipe='/tmp/new.ipe').health(device)
+
+        self.assertEqual(result, {'os': '7.1.045', 'neighbors': 3, 'interfaces_up': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
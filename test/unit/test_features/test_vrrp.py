@@ -1,17 +1,27 @@
 import unittest
 import mock
 
-from pyhpecw7.features.vrrp import VRRP
+from pyhpecw7.features.vrrp import VRRP, VRRPInventory
+from pyhpecw7.features.running_config import RunningConfig
 from base_feature_test import BaseFeatureCase
 
 IFACE_NAME = 'vlan100'
 VRID = '100'
 
+GROUPS = [
+    dict(interface='vlan100', vrid='100', vip='100.100.100.1', priority='120'),
+    dict(interface='vlan200', vrid='1', state='absent'),
+    dict(interface='Vlan100', vrid='101', preempt='no'),
+    dict(interface='vlan300', vrid='3', state='shutdown'),
+    dict(interface='vlan400', vrid='4'),
+]
+
 class VRRPTestCase(BaseFeatureCase):
 
     @mock.patch('pyhpecw7.comware.HPCOM7')
     def setUp(self, mock_device):
         self.device = mock_device
+        self.device.running_config = RunningConfig(self.device)
         self.vrrp = VRRP(self.device, IFACE_NAME, VRID)
 
     def test_get_groups(self):
@@ -37,18 +47,14 @@ class VRRPTestCase(BaseFeatureCase):
         self.device.cli_display.assert_called_with(expected_cmd)
 
     def test_get_auth(self):
-        expected_cmd = 'display current-configuration interface vlan100 | inc "vrid 100 auth"'
-        RAW_OUT = """<HP1>display current-configuration interface vlan100 | inc "vrid 100 auth"
- vrrp vrid 100 authentication-mode simple cipher $c$3$ePQsjr4juyIoqhrNpWXUhRx0JQr220UaQj8=
-
-"""
-        self.device.cli_display.return_value = RAW_OUT
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
 
         result = self.vrrp.get_auth_type()
         expected = {'key_type': 'cipher', 'auth_mode': 'simple', 'key': '$c$3$ePQsjr4juyIoqhrNpWXUhRx0JQr220UaQj8='}
 
         self.assertEqual(result, expected)
-        self.device.cli_display.assert_called_with(expected_cmd)
+        self.assertEqual(VRRP(self.device, IFACE_NAME, '101').get_auth_type(), {})
+        self.device.cli_display.assert_called_once_with('display current-configuration')
 
     def test_remove(self):
         expected_cmds = ['interface vlan100', 'undo vrrp vrid 100', '\n']
@@ -108,9 +114,76 @@ class VRRPTestCase(BaseFeatureCase):
         self.device.stage_config.assert_called_with(expected_cmds, 'cli_config')
         self.assertEqual(result, self.device.stage_config.return_value)
 
+    def test_build_many(self):
+        result = VRRP.build_many(self.device, GROUPS)
+
+        self.device.cli_config.assert_called_once_with([
+            'interface vlan100',
+            'vrrp vrid 100 virtual-ip 100.100.100.1',
+            'vrrp vrid 100 priority 120',
+            'undo vrrp vrid 101 preempt-mode',
+            'interface vlan200',
+            'undo vrrp vrid 1',
+            'interface vlan300',
+            'vrrp vrid 3 shutdown',
+            '\n'])
+        self.assertEqual(result, [self.device.cli_config.return_value])
+
+    def test_build_many_chunks(self):
+        result = VRRP.build_many(self.device, GROUPS, max_commands=3, stage=True)
+
+        self.assertEqual(self.device.stage_config.call_args_list, [
+            mock.call(['interface vlan100',
+                       'vrrp vrid 100 virtual-ip 100.100.100.1',
+                       'vrrp vrid 100 priority 120', '\n'], 'cli_config'),
+            mock.call(['interface vlan100',
+                       'undo vrrp vrid 101 preempt-mode', '\n'], 'cli_config'),
+            mock.call(['interface vlan200', 'undo vrrp vrid 1', '\n'], 'cli_config'),
+            mock.call(['interface vlan300', 'vrrp vrid 3 shutdown', '\n'], 'cli_config'),
+        ])
+        self.assertEqual(len(result), 4)
+        self.assertFalse(self.device.cli_config.called)
+
+    def test_build_many_no_commands(self):
+        result = VRRP.build_many(self.device, [dict(interface='vlan100', vrid='100')])
+
+        self.assertIsNone(result)
+        self.assertFalse(self.device.cli_config.called)
+
+
+class VRRPInventoryTestCase(BaseFeatureCase):
 
+    @mock.patch('pyhpecw7.comware.HPCOM7')
+    def setUp(self, mock_device):
+        self.device = mock_device
+        self.device.running_config = RunningConfig(self.device)
+        self.inventory = VRRPInventory(self.device)
+
+        outputs = {
+            'display vrrp verbose': self.read_cli_display('display_vrrp_verbose'),
+            'display current-configuration': self.read_cli_display('display_current'),
+        }
+        self.device.cli_display.side_effect = lambda command: outputs[command]
+
+    def test_get_config(self):
+        result = self.inventory.get_config()
+        expected = {
+            'Vlan-interface100': {
+                '100': {'vrid': '100', 'admin': 'Up', 'priority': '120',
+                        'preempt': 'yes', 'vip': '100.100.100.1',
+                        'auth_mode': 'simple', 'key_type': 'cipher',
+                        'key': '$c$3$ePQsjr4juyIoqhrNpWXUhRx0JQr220UaQj8='},
+                '101': {'vrid': '101', 'admin': 'Down', 'priority': '100',
+                        'preempt': 'no', 'vip': '100.100.100.11'},
+            },
+            'Vlan-interface200': {
+                '1': {'vrid': '1', 'admin': 'Up', 'priority': '100',
+                      'preempt': 'yes', 'vip': '200.200.200.1'},
+            },
+        }
 
-
+        self.assertEqual(result, expected)
+        self.assertEqual(self.device.cli_display.call_count, 2)
 
 
 if __name__ == '__main__':
@@ -1,7 +1,9 @@
 import unittest
 import mock
 
-from pyhpecw7.features.vxlan import Vxlan, Tunnel, L2EthService
+from pyhpecw7.features.vxlan import Vxlan, Tunnel, L2EthService, VxlanInventory, TunnelInventory
+from pyhpecw7.features.running_config import RunningConfig
+from pyhpecw7.features.errors import InterfaceAbsentError
 from base_feature_test import BaseFeatureCase
 
 INTERFACE = 'FortyGigE1/0/2'
@@ -9,49 +11,107 @@ INSTANCE = '100'
 VSI = 'VSI_VXLAN_100'
 TUNNEL = '20'
 
+VXLANS = [
+    dict(vxlan='100', vsi='VSI_VXLAN_100', tunnels=['20', '22']),
+    dict(vxlan='200', vsi='VSI_VXLAN_200'),
+    dict(vxlan=300, vsi='VSI_VXLAN_300', tunnels=[20]),
+    dict(vxlan='400', vsi='VSI_UNUSED'),
+]
+
+SERVICES = [
+    dict(interface='FortyGigE1/0/2', instance='100', encap='tagged',
+         vsi='VSI_VXLAN_100', access_mode='ethernet'),
+    dict(interface='fortygige1/0/3', instance=100, encap='default',
+         vsi='VSI_VXLAN_100'),
+    dict(interface='FortyGigE1/0/2', instance='300', encap='s-vid',
+         vlanid=300, vsi='VSI_VXLAN_200', access_mode='vlan'),
+    dict(interface='FortyGigE1/0/2', instance='200', state='absent'),
+    dict(interface='FortyGigE1/0/3', instance='400', state='absent'),
+]
+
 class VxlanTestCase(BaseFeatureCase):
 
     @mock.patch('pyhpecw7.comware.HPCOM7')
     def setUp(self,  mock_device):
         self.device = mock_device
+        self.device.running_config = RunningConfig(self.device)
         self.l2eth = L2EthService(self.device, INTERFACE, INSTANCE, VSI)
         self.vxlan = Vxlan(self.device, INSTANCE, vsi=VSI)
         self.tunnel = Tunnel(self.device, TUNNEL)
 
 
     def test_tunnel_get_config(self):
-        self.device.cli_display.return_value = """<HP1>display current-configuration interface Tunnel 20
-#
-interface Tunnel20 mode vxlan
- source 10.1.1.1
- destination 10.1.1.2
-#
-return
-"""
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
         expected = {'dest': '10.1.1.2', 'src': '10.1.1.1', 'mode': 'vxlan'}
         result = self.tunnel.get_config()
 
         self.assertEqual(result, expected)
+        self.device.cli_display.assert_called_once_with('display current-configuration')
 
     def test_tunnel_get_config_no_tunnel(self):
-        self.device.cli_display.return_value = """                                                    ^
- % Wrong parameter found at '^' position.
-"""
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
         expected = {}
-        result = self.tunnel.get_config()
+        result = Tunnel(self.device, '21').get_config()
 
         self.assertEqual(result, expected)
 
     def test_tunnel_get_global_source(self):
-        self.device.cli_display.return_value = """<HP1>display current-configuration | inc "tunnel global source"
- tunnel global source-address 10.10.10.10
-
-"""
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
         expected = '10.10.10.10'
         result = self.tunnel.get_global_source()
 
         self.assertEqual(result, expected)
 
+    def test_tunnel_get_global_source_none(self):
+        self.device.cli_display.return_value = '<HP1>display current-configuration\n#\nreturn\n'
+        result = self.tunnel.get_global_source()
+
+        self.assertIsNone(result)
+
+    def test_tunnel_inventory(self):
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
+
+        result = TunnelInventory(self.device).get_config()
+
+        self.assertEqual(result, {'20': {'dest': '10.1.1.2', 'src': '10.1.1.1', 'mode': 'vxlan'}})
+        self.assertEqual(result['20'], self.tunnel.get_config())
+        self.device.cli_display.assert_called_once_with('display current-configuration')
+
+    def test_tunnel_build_many(self):
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
+        tunnels = [
+            dict(tunnel='20', src='10.1.1.1', dest='10.1.1.3'),
+            dict(tunnel=21, src='10.1.1.1', dest='10.1.1.4'),
+            dict(tunnel='22', state='absent'),
+        ]
+
+        Tunnel.build_many(self.device, tunnels, global_src='10.10.10.11')
+
+        self.device.cli_config.assert_called_once_with([
+            'tunnel global source-address 10.10.10.11',
+            'interface tunnel 20 mode vxlan',
+            'destination 10.1.1.3',
+            'interface tunnel 21 mode vxlan',
+            'source 10.1.1.1',
+            'destination 10.1.1.4'])
+        self.device.cli_display.assert_called_once_with('display current-configuration')
+
+    def test_tunnel_build_many_remove(self):
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
+
+        Tunnel.build_many(self.device, [dict(tunnel='20', state='absent')], stage=True)
+
+        self.device.stage_config.assert_called_once_with(['undo interface tunnel 20'], 'cli_config')
+
+    def test_tunnel_build_many_no_change(self):
+        self.device.cli_display.return_value = self.read_cli_display('display_current')
+        tunnels = [dict(tunnel='20', src='10.1.1.1', dest='10.1.1.2'), dict(tunnel='22', state='absent')]
+
+        result = Tunnel.build_many(self.device, tunnels, global_src='10.10.10.10', stage=True)
+
+        self.assertIsNone(result)
+        self.assertFalse(self.device.stage_config.called)
+
     def test_tunnel_build_config(self):
         self.tunnel._build_config('present', src='1.1.1.1', dest='2.2.2.2', global_src='1.1.1.2')
         expected_call = ['tunnel global source-address 1.1.1.2', 'interface tunnel 20 mode vxlan', 'source 1.1.1.1', 'destination 2.2.2.2']
@@ -175,6 +235,30 @@ return
         self.assertEqual(result, expected)
         self.assert_get_request(expected_get)
 
+    def test_build_many(self):
+        self.device.get.return_value = self.read_get_reply_xml('vxlan_inventory')
+
+        result = Vxlan.build_many(self.device, VXLANS)
+
+        self.assertEqual(self.device.get.call_count, 1)
+        self.assert_config_request(self.read_config_xml('vxlan_build_many'))
+        self.assertEqual(result, self.device.edit_config.return_value)
+
+    def test_build_many_stage(self):
+        self.device.get.return_value = self.read_get_reply_xml('vxlan_inventory')
+
+        Vxlan.build_many(self.device, VXLANS, stage=True)
+
+        self.assert_stage_request(self.read_config_xml('vxlan_build_many'), 'edit_config')
+
+    def test_build_many_no_change(self):
+        self.device.get.return_value = self.read_get_reply_xml('vxlan_inventory')
+
+        result = Vxlan.build_many(self.device, [dict(vxlan='100', vsi='VSI_VXLAN_100', tunnels=['21', '20'])])
+
+        self.assertIsNone(result)
+        self.assertFalse(self.device.edit_config.called)
+
     def test_l2eth_vsi_exist(self):
         expected_get, get_reply = self.xml_get_and_reply('l2eth_vsi_exist')
         self.device.get.return_value = get_reply
@@ -309,6 +393,102 @@ return
         self.assertEqual(result, expected)
         self.assert_get_request(expected_get)
 
+    def test_l2eth_build_many(self):
+        self.device.get.return_value = self.read_get_reply_xml('vxlan_inventory')
+
+        result = L2EthService.build_many(self.device, SERVICES)
+
+        self.assertEqual(self.device.get.call_count, 1)
+        self.assert_config_request(self.read_config_xml('l2eth_build_many'))
+        self.assertEqual(result, self.device.edit_config.return_value)
+
+    def test_l2eth_build_many_stage(self):
+        self.device.get.return_value = self.read_get_reply_xml('vxlan_inventory')
+
+        L2EthService.build_many(self.device, SERVICES, stage=True)
+
+        self.assert_stage_request(self.read_config_xml('l2eth_build_many'), 'edit_config')
+
+    def test_l2eth_build_many_no_change(self):
+        self.device.get.return_value = self.read_get_reply_xml('vxlan_inventory')
+        services = [
+            dict(interface='FortyGigE1/0/2', instance=200, encap='s-vid',
+                 vlanid=200, vsi='VSI_VXLAN_200'),
+            dict(interface='FortyGigE1/0/2', instance='100', encap='tagged', vlanid='10',
+                 vsi='VSI_VXLAN_100', access_mode='ethernet'),
+        ]
+
+        result = L2EthService.build_many(self.device, services)
+
+        self.assertIsNone(result)
+        self.assertFalse(self.device.edit_config.called)
+
+    @mock.patch('pyhpecw7.features.vxlan.Interface')
+    def test_l2eth_build_many_abbreviated_interface(self, mock_iface):
+        mock_iface.return_value.iface_index = '125'
+        self.device.get.return_value = self.read_get_reply_xml('vxlan_inventory')
+        services = [dict(interface='fo1/0/2', instance='100', encap='tagged',
+                         vsi='VSI_VXLAN_100', access_mode='ethernet')]
+
+        result = L2EthService.build_many(self.device, services)
+
+        self.assertIsNone(result)
+        mock_iface.assert_called_once_with(self.device, 'fo1/0/2')
+
+    @mock.patch('pyhpecw7.features.vxlan.Interface')
+    def test_l2eth_build_many_bad_interface(self, mock_iface):
+        mock_iface.return_value.iface_index = ''
+        self.device.get.return_value = self.read_get_reply_xml('vxlan_inventory')
+        services = [dict(interface='FortyGigE1/0/9', instance='100', encap='default',
+                         vsi='VSI_VXLAN_100')]
+
+        with self.assertRaises(InterfaceAbsentError):
+            L2EthService.build_many(self.device, services)
+
+    def test_l2eth_build_many_bad_access_mode(self):
+        self.device.get.return_value = self.read_get_reply_xml('vxlan_inventory')
+        services = [dict(interface='FortyGigE1/0/2', instance='300', encap='default',
+                         vsi='VSI_VXLAN_100', access_mode='vpn')]
+
+        with self.assertRaises(ValueError):
+            L2EthService.build_many(self.device, services)
+        self.assertFalse(self.device.edit_config.called)
+
+
+class VxlanInventoryTestCase(BaseFeatureCase):
+
+    @mock.patch('pyhpecw7.comware.HPCOM7')
+    def setUp(self, mock_device):
+        self.device = mock_device
+        self.inventory = VxlanInventory(self.device)
+
+    def test_get_config(self):
+        expected_get, get_reply = self.xml_get_and_reply('vxlan_inventory')
+        self.device.get.return_value = get_reply
+
+        expected = {
+            '100': {'vxlan': '100', 'vsi': 'VSI_VXLAN_100', 'tunnels': ['20', '21']},
+            '200': {'vxlan': '200', 'vsi': 'VSI_VXLAN_200', 'tunnels': ['20']},
+        }
+
+        result = self.inventory.get_config()
+
+        self.assertEqual(result, expected)
+        self.assert_get_request(expected_get)
+        self.assertEqual(self.device.get.call_count, 1)
+
+        self.assertEqual(self.inventory.tunnel_vxlans, {'20': ['100', '200'], '21': ['100']})
+        self.assertEqual(sorted(self.inventory.vsis), ['VSI_UNUSED', 'VSI_VXLAN_100', 'VSI_VXLAN_200'])
+        self.assertEqual(self.inventory.vsis['VSI_VXLAN_100']['descr'], 'servers')
+        self.assertEqual(self.inventory.services['FortyGigE1/0/2'], [
+            {'index': '125', 'interface': 'FortyGigE1/0/2', 'instance': '100',
+             'encap': 'tagged', 'vsi': 'VSI_VXLAN_100', 'access_mode': 'ethernet'},
+            {'index': '125', 'interface': 'FortyGigE1/0/2', 'instance': '200',
+             'encap': 's-vid', 'vlanid': '200', 'vsi': 'VSI_VXLAN_200', 'access_mode': 'vlan'},
+        ])
+        self.assertEqual(self.inventory.services['FortyGigE1/0/3'], [
+            {'index': '126', 'interface': 'FortyGigE1/0/3', 'instance': '100', 'encap': 'default'}])
+
 
 if __name__ == '__main__':
     unittest.main()
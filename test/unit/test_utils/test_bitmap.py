@@ -0,0 +1,42 @@
+import unittest
+
+from pyhpecw7.utils.bitmap import bitmap_to_indexes, indexes_to_bitmap,\
+    bitmap_union, bitmap_intersection, bitmap_difference
+
+
+class BitmapTestCase(unittest.TestCase):
+
+    def test_bitmap_to_indexes(self):
+        self.assertEqual(list(bitmap_to_indexes('iA==')), [1, 5])
+        self.assertEqual(list(bitmap_to_indexes('AIA=')), [9])
+        self.assertEqual(list(bitmap_to_indexes('AAE=')), [16])
+        self.assertEqual(list(bitmap_to_indexes('')), [])
+        self.assertEqual(list(bitmap_to_indexes(None)), [])
+
+    def test_indexes_to_bitmap(self):
+        self.assertEqual(indexes_to_bitmap([1, 5]), 'iA==')
+        self.assertEqual(indexes_to_bitmap(['5', '1']), 'iA==')
+        self.assertEqual(indexes_to_bitmap([9]), 'AIA=')
+        self.assertEqual(indexes_to_bitmap([1, 5], length=2), 'iAA=')
+        self.assertEqual(indexes_to_bitmap([]), '')
+
+        with self.assertRaises(ValueError):
+            indexes_to_bitmap([0])
+
+    def test_round_trip(self):
+        indexes = [1, 2, 8, 9, 64, 65, 1000, 33736]
+        bitmap = indexes_to_bitmap(indexes)
+        self.assertEqual(list(bitmap_to_indexes(bitmap)), indexes)
+
+    def test_set_operations(self):
+        bitmap1 = indexes_to_bitmap([1, 5, 9])
+        bitmap2 = indexes_to_bitmap([5, 17])
+
+        self.assertEqual(list(bitmap_to_indexes(bitmap_union(bitmap1, bitmap2))), [1, 5, 9, 17])
+        self.assertEqual(list(bitmap_to_indexes(bitmap_intersection(bitmap1, bitmap2))), [5])
+        self.assertEqual(list(bitmap_to_indexes(bitmap_difference(bitmap1, bitmap2))), [1, 9])
+        self.assertEqual(list(bitmap_to_indexes(bitmap_difference(bitmap2, bitmap1))), [17])
+
+
+if __name__ == '__main__':
+    unittest.main()
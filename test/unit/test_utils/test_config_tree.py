@@ -0,0 +1,165 @@
+import unittest
+
+from pyhpecw7.utils.config_tree import parse_config, diff_config
+
+CONFIG = """<HP1>display current-configuration
+#
+ sysname HP1
+#
+ mad exclude interface FortyGigE1/0/9
+ mad exclude interface FortyGigE1/0/10
+#
+vlan 100
+ name servers
+#
+interface Vlan-interface100
+ ip address 100.100.100.2 255.255.255.0
+ vrrp vrid 100 virtual-ip 100.100.100.1
+#
+interface Tunnel20 mode vxlan
+ source 10.1.1.1
+#
+interface FortyGigE1/0/1
+ port link-mode bridge
+#
+bgp 100
+ peer 10.1.1.2 as-number 200
+ #
+ address-family ipv4 unicast
+  peer 10.1.1.2 enable
+ #
+ address-family l2vpn evpn
+  peer 10.1.1.2 enable
+#
+return
+"""
+
+
+class ConfigTreeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = parse_config(CONFIG)
+
+    def test_top_level(self):
+        top = [line.text for line in self.tree.children]
+        self.assertEqual(top, ['sysname HP1',
+                               'mad exclude interface FortyGigE1/0/9',
+                               'mad exclude interface FortyGigE1/0/10',
+                               'vlan 100',
+                               'interface Vlan-interface100',
+                               'interface Tunnel20 mode vxlan',
+                               'interface FortyGigE1/0/1',
+                               'bgp 100'])
+
+    def test_section(self):
+        vlan = self.tree.section('vlan 100')
+        self.assertEqual([line.text for line in vlan.children], ['name servers'])
+        self.assertIs(vlan.parent, self.tree)
+        self.assertIsNone(self.tree.section('vlan 200'))
+
+    def test_nested_sections(self):
+        bgp = self.tree.section('bgp 100')
+        self.assertEqual([line.text for line in bgp.children],
+                         ['peer 10.1.1.2 as-number 200',
+                          'address-family ipv4 unicast',
+                          'address-family l2vpn evpn'])
+        evpn = bgp.find('address-family l2vpn')
+        self.assertEqual([line.text for line in evpn.children], ['peer 10.1.1.2 enable'])
+        self.assertEqual(len(list(bgp.walk())), 5)
+
+    def test_interface(self):
+        vlan_iface = self.tree.section('interface Vlan-interface100')
+        self.assertIs(self.tree.interface('Vlan-interface100'), vlan_iface)
+        self.assertIs(self.tree.interface('vlan100'), vlan_iface)
+        self.assertIs(self.tree.interface('Tunnel 20'), self.tree.section('interface Tunnel20 mode vxlan'))
+        self.assertIs(self.tree.section('interface Tunnel20'), self.tree.interface('tunnel20'))
+        self.assertIs(self.tree.interface('fo1/0/1'), self.tree.section('interface FortyGigE1/0/1'))
+        self.assertIsNone(self.tree.interface('FortyGigE1/0/2'))
+        self.assertIsNone(self.tree.interface('Ten-GigabitEthernet1/0/1'))
+
+    def test_interfaces(self):
+        self.assertEqual([line.text for line in self.tree.interfaces('Tunnel')],
+                         ['interface Tunnel20 mode vxlan'])
+        self.assertEqual(len(self.tree.interfaces()), 3)
+
+    def test_find_global(self):
+        mad = self.tree.find_global('mad exclude interface')
+        self.assertEqual([line.text for line in mad],
+                         ['mad exclude interface FortyGigE1/0/9',
+                          'mad exclude interface FortyGigE1/0/10'])
+        self.assertEqual(self.tree.find_global('vlan'), [])
+
+    def test_to_text(self):
+        self.assertEqual(self.tree.section('bgp 100').to_text(),
+                         'bgp 100\n'
+                         ' peer 10.1.1.2 as-number 200\n'
+                         ' address-family ipv4 unicast\n'
+                         '  peer 10.1.1.2 enable\n'
+                         ' address-family l2vpn evpn\n'
+                         '  peer 10.1.1.2 enable\n')
+
+    def test_empty(self):
+        tree = parse_config('')
+        self.assertEqual(tree.children, [])
+        self.assertIsNone(tree.interface('vlan1'))
+
+
+class DiffConfigTestCase(unittest.TestCase):
+
+    def test_no_changes(self):
+        self.assertEqual(diff_config(parse_config(CONFIG), parse_config(CONFIG)), [])
+
+    def test_nested_changes(self):
+        candidate = CONFIG.replace("""  peer 10.1.1.2 enable
+#
+return""", """  peer 10.1.1.3 enable
+ #
+ address-family vpnv4
+  peer 10.1.1.2 enable
+#
+return""").replace(""" #
+ address-family ipv4 unicast
+  peer 10.1.1.2 enable
+""", "")
+
+        result = diff_config(parse_config(CONFIG), parse_config(candidate))
+        expected = [{'section': 'bgp 100',
+                     'add': ['address-family l2vpn evpn',
+                             ' peer 10.1.1.3 enable',
+                             'address-family vpnv4',
+                             ' peer 10.1.1.2 enable'],
+                     'remove': ['address-family l2vpn evpn',
+                                ' peer 10.1.1.2 enable',
+                                'address-family ipv4 unicast']}]
+
+        self.assertEqual(result, expected)
+
+    def test_removed_section(self):
+        candidate = CONFIG.replace("""interface Vlan-interface100
+ ip address 100.100.100.2 255.255.255.0
+ vrrp vrid 100 virtual-ip 100.100.100.1
+#
+""", "")
+
+        result = diff_config(parse_config(CONFIG), parse_config(candidate))
+
+        self.assertEqual(result, [{'section': None, 'add': [],
+                                   'remove': ['interface Vlan-interface100']}])
+
+    def test_large_config(self):
+        lines = []
+        for index in range(20000):
+            lines.extend(['#', 'interface Vlan-interface{0}'.format(index),
+                          ' ip address 10.0.0.1 255.255.255.0', ' shutdown'])
+        current = parse_config('\n'.join(lines))
+        candidate = parse_config('\n'.join(lines).replace(' shutdown', ' undo shutdown'))
+
+        result = diff_config(current, candidate)
+
+        self.assertEqual(len(result), 20000)
+        self.assertEqual(result[-1], {'section': 'interface Vlan-interface19999',
+                                      'add': ['undo shutdown'], 'remove': ['shutdown']})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import mock
+import os
+import json
+import shutil
+import tempfile
+
+from pyhpecw7.utils import md5cache
+from pyhpecw7.utils.md5cache import file_md5, clear_cache
+
+CONTENT_MD5 = 'bcb898f62d9e1ac765c77e6804cbd872'
+
+
+class Md5CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        clear_cache()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'image.ipe')
+        with open(self.path, 'wb') as f:
+            f.write('Test content.')
+
+    def tearDown(self):
+        clear_cache()
+        shutil.rmtree(self.tmpdir)
+
+    def test_file_md5(self):
+        self.assertEqual(file_md5(self.path), CONTENT_MD5)
+        self.assertEqual(file_md5(self.path, blocksize=3), CONTENT_MD5)
+
+    def test_empty_file(self):
+        path = os.path.join(self.tmpdir, 'empty')
+        open(path, 'wb').close()
+
+        self.assertEqual(file_md5(path), 'd41d8cd98f00b204e9800998ecf8427e')
+
+    @mock.patch.object(md5cache, '_hash_file', wraps=md5cache._hash_file)
+    def test_hashed_once(self, mock_hash):
+        for _ in range(3):
+            self.assertEqual(file_md5(self.path), CONTENT_MD5)
+
+        self.assertEqual(mock_hash.call_count, 1)
+
+    @mock.patch.object(md5cache, '_hash_file', wraps=md5cache._hash_file)
+    def test_sidecar(self, mock_hash):
+        file_md5(self.path)
+        with open(self.path + '.md5') as f:
+            record = json.load(f)
+        self.assertEqual(record['md5'], CONTENT_MD5)
+        self.assertEqual(record['size'], 13)
+
+        clear_cache()
+        self.assertEqual(file_md5(self.path), CONTENT_MD5)
+        self.assertEqual(mock_hash.call_count, 1)
+
+    @mock.patch.object(md5cache, '_hash_file', wraps=md5cache._hash_file)
+    def test_sidecar_cache_dir(self, mock_hash):
+        cache_dir = os.path.join(self.tmpdir, 'cache')
+        file_md5(self.path, cache_dir=cache_dir)
+        self.assertFalse(os.path.exists(self.path + '.md5'))
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        clear_cache()
+        self.assertEqual(file_md5(self.path, cache_dir=cache_dir), CONTENT_MD5)
+        self.assertEqual(mock_hash.call_count, 1)
+
+    @mock.patch.object(md5cache, '_hash_file', wraps=md5cache._hash_file)
+    def test_no_sidecar(self, mock_hash):
+        file_md5(self.path, sidecar=False)
+        self.assertFalse(os.path.exists(self.path + '.md5'))
+
+        clear_cache()
+        file_md5(self.path, sidecar=False)
+        self.assertEqual(mock_hash.call_count, 2)
+
+    def test_changed_file(self):
+        file_md5(self.path)
+        with open(self.path, 'wb') as f:
+            f.write('Other content.')
+
+        self.assertNotEqual(file_md5(self.path), CONTENT_MD5)
+
+    def test_missing_file(self):
+        with self.assertRaises(OSError):
+            file_md5(os.path.join(self.tmpdir, 'missing'))
+
+
+if __name__ == '__main__':
+    unittest.main()